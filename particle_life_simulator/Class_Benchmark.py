@@ -0,0 +1,281 @@
+import itertools
+import math
+import os
+import platform
+import time
+
+import numba
+import numpy as np
+
+from particle_life_simulator.Class_Particle import (
+    CreateParticle,
+    compute_influence_map,
+    compute_neighbors_grid,
+    apply_influence,
+    fused_step,
+    update_positions_numba,
+)
+
+# Kernels timed by `benchmark_kernels`, in the order of a classic update step
+KERNELS = (
+    "compute_neighbors_grid",
+    "compute_influence_map",
+    "apply_influence",
+    "update_positions_numba",
+    "fused_step",
+    "process_positions_and_colors",
+)
+
+# Particles per unit area of the default 1920x1080 world with 100000 particles
+DEFAULT_DENSITY = 100000 / (1920 * 1080)
+
+# Entries that identify one measurement when comparing result files
+RESULT_KEYS = ("kernel", "num_particles", "density", "num_colors", "threads")
+
+
+def make_world(num_particles: int, density: float = DEFAULT_DENSITY, num_colors: int = 5,
+               seed: int = 0, radius: float = 3.0) -> CreateParticle:
+    """
+    Creates a reproducible particle system for benchmarking.
+
+    The domain has a 16:9 aspect ratio and is sized so that it holds
+    `density` particles per unit area. Positions, velocities, colors and
+    the interaction matrix are drawn from a NumPy generator seeded with
+    `seed`, so the same arguments always give the same initial state.
+
+    Args:
+        num_particles (int): Number of particles.
+        density (float, optional): Particles per unit area.
+        num_colors (int, optional): Number of distinct colors.
+        seed (int, optional): Seed of the initial state.
+        radius (float, optional): Interaction radius passed to `CreateParticle`.
+
+    Returns:
+        CreateParticle: The particle system.
+
+    Raises:
+        ValueError: If `num_particles`, `density` or `num_colors` is not positive.
+    """
+    if num_particles <= 0 or density <= 0 or num_colors <= 0:
+        raise ValueError("num_particles, density and num_colors must be positive.")
+
+    area = num_particles / density
+    x_max = max(1, int(round(math.sqrt(area * 16 / 9))))
+    y_max = max(1, int(round(area / x_max)))
+
+    particle_creator = CreateParticle(
+        num_particles=num_particles,
+        x_max=x_max,
+        y_max=y_max,
+        speed_range=(-1, 1),
+        max_speed=1.0,
+        radius=radius,
+        num_colors=num_colors,
+        interaction_strength=0.5,
+    )
+    rng = np.random.default_rng(seed)
+    particle_creator.state[0] = rng.uniform(0, x_max, num_particles)
+    particle_creator.state[1] = rng.uniform(0, y_max, num_particles)
+    particle_creator.state[2:] = rng.uniform(-1, 1, (2, num_particles))
+    particle_creator.colors[:] = rng.integers(0, num_colors, num_particles)
+    particle_creator.set_interaction_matrix(rng.uniform(-1, 1, (num_colors, num_colors)).astype(np.float32))
+    return particle_creator
+
+
+def time_call(func, repeats: int = 5) -> dict:
+    """
+    Times a function call.
+
+    The function is called once before timing, so JIT compilation is not
+    part of the numbers.
+
+    Args:
+        func (callable): Function without arguments.
+        repeats (int, optional): Number of timed calls.
+
+    Returns:
+        dict: The keys `min`, `median` and `mean` (seconds per call) and `repeats`.
+    """
+    func()
+    times = np.empty(repeats)
+    for k in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        times[k] = time.perf_counter() - start_time
+    return {
+        "min": float(times.min()),
+        "median": float(np.median(times)),
+        "mean": float(times.mean()),
+        "repeats": repeats,
+    }
+
+
+def benchmark_kernels(particle_creator, repeats: int = 5, kernels=KERNELS) -> dict:
+    """
+    Times every kernel of an update step separately on the same input.
+
+    Each kernel gets the input it sees in `CreateParticle.update_positions`.
+    Outputs are written into scratch copies, so all repeats start from the
+    same state and the particle system is not modified.
+
+    Args:
+        particle_creator (CreateParticle): The particle system to run the kernels on.
+        repeats (int, optional): Timed calls per kernel.
+        kernels (tuple, optional): Names of the kernels to time, see `KERNELS`.
+
+    Returns:
+        dict: Timing statistics (see `time_call`) per kernel name.
+
+    Raises:
+        ValueError: If a kernel name is unknown.
+    """
+    unknown = [kernel for kernel in kernels if kernel not in KERNELS]
+    if unknown:
+        raise ValueError(f"Unknown kernels: {', '.join(unknown)}")
+
+    pc = particle_creator
+    state = pc.state.copy()
+    colors = pc.colors
+    x = state[0]
+    y = state[1]
+    vx = state[2].copy()
+    vy = state[3].copy()
+    out = np.empty_like(state)
+    neighbor_lists = compute_neighbors_grid(x, y, pc.x_max, pc.y_max, pc.radius)
+    influence_map = compute_influence_map(
+        x, y, colors, pc.pair_influence, neighbor_lists, pc.radius, pc.x_max, pc.y_max
+    )
+
+    calls = {
+        "compute_neighbors_grid": lambda: compute_neighbors_grid(x, y, pc.x_max, pc.y_max, pc.radius),
+        "compute_influence_map": lambda: compute_influence_map(
+            x, y, colors, pc.pair_influence, neighbor_lists, pc.radius, pc.x_max, pc.y_max
+        ),
+        "apply_influence": lambda: apply_influence(x, y, vx, vy, influence_map, pc.radius, pc.max_speed),
+        "update_positions_numba": lambda: update_positions_numba(
+            state, colors, pc.num_particles, pc.x_max, pc.y_max, pc.radius, pc.radius_sq,
+            pc.color_interaction, pc.interaction_strength, pc.max_speed, pc.min_speed,
+            neighbor_lists, out
+        ),
+        "fused_step": lambda: fused_step(
+            state, colors, pc.x_max, pc.y_max, pc.radius, pc.radius_sq, pc.color_interaction,
+            pc.pair_influence, pc.interaction_strength, pc.max_speed, pc.min_speed, out
+        ),
+    }
+    if "process_positions_and_colors" in kernels:
+        # Imported here because the GUI module pulls in VisPy
+        from particle_life_simulator.Class_GUI import create_numba_dict, process_positions_and_colors
+
+        color_lookup = create_numba_dict(
+            {np.int32(c): ((c * 0.37) % 1.0, (c * 0.61) % 1.0, (c * 0.83) % 1.0) for c in range(pc.num_colors)}
+        )
+        calls["process_positions_and_colors"] = lambda: process_positions_and_colors(
+            x, y, colors, color_lookup, pc.num_particles
+        )
+
+    return {kernel: time_call(calls[kernel], repeats) for kernel in kernels}
+
+
+def run_suite(particle_counts, densities=(DEFAULT_DENSITY,), color_counts=(5,), thread_counts=None,
+              repeats: int = 5, seed: int = 0, kernels=KERNELS, progress=None) -> dict:
+    """
+    Runs `benchmark_kernels` for every combination of the sweep parameters.
+
+    Args:
+        particle_counts (iterable): Particle counts to sweep.
+        densities (iterable, optional): Particle densities (particles per unit area) to sweep.
+        color_counts (iterable, optional): Numbers of colors to sweep.
+        thread_counts (iterable, optional): Numba thread counts to sweep. Defaults
+            to the current thread count.
+        repeats (int, optional): Timed calls per kernel.
+        seed (int, optional): Seed of the initial states.
+        kernels (tuple, optional): Names of the kernels to time, see `KERNELS`.
+        progress (callable, optional): Called with every new result entry.
+
+    Returns:
+        dict: `{"metadata": {...}, "results": [...]}`, where every result
+            holds the sweep parameters, the kernel name and its timing
+            statistics. The metadata describes the machine and the run.
+
+    Raises:
+        ValueError: If a thread count is not between 1 and `numba.config.NUMBA_NUM_THREADS`.
+    """
+    if thread_counts is None:
+        thread_counts = (numba.get_num_threads(),)
+    for threads in thread_counts:
+        if not 1 <= threads <= numba.config.NUMBA_NUM_THREADS:
+            raise ValueError(f"Thread counts must be between 1 and {numba.config.NUMBA_NUM_THREADS}.")
+
+    metadata = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba.__version__,
+        "seed": seed,
+        "repeats": repeats,
+    }
+
+    results = []
+    previous_threads = numba.get_num_threads()
+    try:
+        for num_particles, density, num_colors in itertools.product(particle_counts, densities, color_counts):
+            particle_creator = make_world(int(num_particles), float(density), int(num_colors), seed)
+            for threads in thread_counts:
+                numba.set_num_threads(threads)
+                timings = benchmark_kernels(particle_creator, repeats, kernels)
+                for kernel, stats in timings.items():
+                    entry = {
+                        "kernel": kernel,
+                        "num_particles": int(num_particles),
+                        "density": float(density),
+                        "num_colors": int(num_colors),
+                        "threads": int(threads),
+                        **stats,
+                    }
+                    results.append(entry)
+                    if progress is not None:
+                        progress(entry)
+    finally:
+        numba.set_num_threads(previous_threads)
+
+    return {"metadata": metadata, "results": results}
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.1, statistic: str = "median") -> list:
+    """
+    Compares two result sets of `run_suite` measurement by measurement.
+
+    Measurements are matched on `RESULT_KEYS`; entries present in only
+    one of the sets are skipped.
+
+    Args:
+        baseline (dict): Results of the reference run.
+        current (dict): Results of the run under test.
+        threshold (float, optional): Relative slowdown above which a measurement
+            counts as a regression (0.1 means 10 % slower).
+        statistic (str, optional): Timing statistic to compare ("min", "median" or "mean").
+
+    Returns:
+        list: One dict per matched measurement with the `RESULT_KEYS`, the
+            `baseline` and `current` times, their `ratio` and a `regression` flag.
+    """
+    reference = {tuple(entry[key] for key in RESULT_KEYS): entry for entry in baseline["results"]}
+    comparison = []
+    for entry in current["results"]:
+        key = tuple(entry[k] for k in RESULT_KEYS)
+        if key not in reference:
+            continue
+        before = reference[key][statistic]
+        after = entry[statistic]
+        ratio = after / before if before > 0 else math.inf
+        comparison.append({
+            **dict(zip(RESULT_KEYS, key)),
+            "baseline": before,
+            "current": after,
+            "ratio": ratio,
+            "regression": ratio > 1.0 + threshold,
+        })
+    return comparison
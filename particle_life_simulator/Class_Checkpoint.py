@@ -0,0 +1,207 @@
+import json
+import mmap
+import os
+
+import numba
+import numpy as np
+from numba import types
+
+from particle_life_simulator.Class_Particle import CreateParticle, spec
+
+CHECKPOINT_MAGIC = b"PLCKPT01"
+# Header size and alignment of every array, one page on common systems
+CHECKPOINT_ALIGN = 4096
+
+# Arrays that are derived from the saved ones and are rebuilt after loading
+DERIVED_ARRAYS = ("state_back", "verlet_start", "verlet_index", "verlet_ref")
+
+# Fields holding kernel scratch memory; a loaded system starts with an empty workspace
+SCRATCH_FIELDS = ("workspace",)
+
+
+def save_checkpoint(particle_creator, path):
+    """
+    Writes the complete state of a `CreateParticle` to a checkpoint file.
+
+    The file starts with a `CHECKPOINT_ALIGN` byte header (magic plus JSON
+    metadata) holding every scalar field of the jitclass `spec`, the array
+    table, the NumPy RNG position and the Numba version. It is followed by the raw array
+    buffers (`state`, `colors`, `particle_ids`, `color_interaction`, ...)
+    and the Mersenne Twister states of Numba's and NumPy's global
+    generators, each aligned to `CHECKPOINT_ALIGN` bytes. The file is
+    written next to `path` and renamed into place, so a preempted save
+    never leaves a truncated checkpoint behind.
+
+    Args:
+        particle_creator (CreateParticle): The particle system to save.
+        path (str): Path of the checkpoint file.
+    """
+    scalars = {}
+    arrays = {}
+    for name, field_type in spec:
+        if name in DERIVED_ARRAYS or name in SCRATCH_FIELDS:
+            continue
+        value = getattr(particle_creator, name)
+        if isinstance(field_type, types.Array):
+            arrays[name] = np.ascontiguousarray(value)
+        elif isinstance(value, str):
+            scalars[name] = value
+        else:
+            scalars[name] = value.item() if hasattr(value, "item") else value
+
+    numba_index, numba_key = numba_random_state()
+    arrays["rng_numba"] = np.array([numba_index] + list(numba_key), dtype=np.uint32)
+    _, numpy_key, numpy_pos, has_gauss, cached_gaussian = np.random.get_state()
+    arrays["rng_numpy"] = np.asarray(numpy_key, dtype=np.uint32)
+
+    table = {}
+    offset = CHECKPOINT_ALIGN
+    for name, array in arrays.items():
+        table[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = align(offset + array.nbytes)
+
+    metadata = {
+        "scalars": scalars,
+        "arrays": table,
+        "rng_numpy": {"pos": int(numpy_pos), "has_gauss": int(has_gauss), "cached_gaussian": float(cached_gaussian)},
+        "numba_version": numba.__version__,
+    }
+    header = CHECKPOINT_MAGIC + json.dumps(metadata).encode("utf-8")
+    if len(header) > CHECKPOINT_ALIGN:
+        raise ValueError("Checkpoint metadata does not fit into the header.")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(header.ljust(CHECKPOINT_ALIGN, b"\0"))
+        for name, array in arrays.items():
+            file.seek(table[name]["offset"])
+            file.write(memoryview(array).cast("B"))
+        file.truncate(offset)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, restore_rng: bool = True) -> CreateParticle:
+    """
+    Restores a `CreateParticle` from a checkpoint written by `save_checkpoint`.
+
+    The particle arrays are not parsed or copied: they are views of a
+    private (copy-on-write) memory map of the file, so loading costs a
+    page-in of the data that is actually touched. Derived buffers (the back
+    buffer and the Verlet neighbor list) are recreated; the list is rebuilt
+    on the next step.
+
+    Args:
+        path (str): Path of the checkpoint file.
+        restore_rng (bool, optional): Also restore the global Numba and NumPy
+            random number generators, so later `generate_particles` calls
+            continue the saved random stream. This requires the Numba version
+            the checkpoint was written with.
+
+    Returns:
+        CreateParticle: The restored particle system.
+
+    Raises:
+        ValueError: If the file is not a checkpoint file, or `restore_rng` is set
+            and the checkpoint was written with another Numba version.
+        RuntimeError: If `restore_rng` is set and Numba's random state cannot be restored.
+    """
+    with open(path, "rb") as file:
+        header = file.read(CHECKPOINT_ALIGN)
+        if not header.startswith(CHECKPOINT_MAGIC):
+            raise ValueError(f"{path} is not a checkpoint file.")
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    metadata = json.loads(header[len(CHECKPOINT_MAGIC):].rstrip(b"\0").decode("utf-8"))
+    if restore_rng and metadata.get("numba_version") != numba.__version__:
+        raise ValueError(
+            f"{path} was written with Numba {metadata.get('numba_version')}, not {numba.__version__}; "
+            "load it with restore_rng=False."
+        )
+    arrays = {}
+    for name, entry in metadata["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        if count == 0:
+            arrays[name] = np.empty(entry["shape"], dtype=dtype)
+            continue
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=entry["offset"]
+        ).reshape(entry["shape"])
+
+    scalars = metadata["scalars"]
+    particle_creator = CreateParticle(
+        num_particles=0,
+        num_colors=scalars["num_colors"],
+        reorder_order=scalars["reorder_order"],
+    )
+    for name, value in scalars.items():
+        setattr(particle_creator, name, value)
+    for name, array in arrays.items():
+        if not name.startswith("rng_"):
+            setattr(particle_creator, name, array)
+
+    num_particles = scalars["num_particles"]
+    particle_creator.state_back = np.zeros((4, num_particles), dtype=np.float32)
+    particle_creator.verlet_start = np.zeros(num_particles + 1, dtype=np.int32)
+    particle_creator.verlet_ref = np.zeros((2, num_particles), dtype=np.float32)
+    particle_creator.verlet_valid = False
+
+    if restore_rng:
+        numba_state = arrays["rng_numba"]
+        numba_random_state((int(numba_state[0]), [int(v) for v in numba_state[1:]]))
+        rng = metadata["rng_numpy"]
+        np.random.set_state(
+            ("MT19937", np.array(arrays["rng_numpy"]), rng["pos"], rng["has_gauss"], rng["cached_gaussian"])
+        )
+
+    return particle_creator
+
+
+def numba_random_state(state=None):
+    """
+    Reads or restores the Mersenne Twister state of Numba's global random number generator.
+
+    Numba has no public API for this, so the private `numba._helperlib`
+    functions are used; they are looked up on every call so that a Numba
+    version without them fails here with a clear error.
+
+    Args:
+        state (tuple, optional): (index, key) state to restore, as returned by
+            an earlier call. If omitted, the state is only read.
+
+    Returns:
+        tuple: The (index, key) state before the call.
+
+    Raises:
+        RuntimeError: If this Numba version does not provide the functions.
+    """
+    try:
+        from numba import _helperlib
+
+        state_ptr = _helperlib.rnd_get_np_state_ptr()
+        get_state = _helperlib.rnd_get_state
+        set_state = _helperlib.rnd_set_state
+    except (ImportError, AttributeError) as error:
+        raise RuntimeError(
+            f"Numba {numba.__version__} does not expose the random state of its generator, "
+            "so it cannot be saved or restored."
+        ) from error
+    previous = get_state(state_ptr)
+    if state is not None:
+        set_state(state_ptr, state)
+    return previous
+
+
+def align(offset: int) -> int:
+    """
+    Rounds a byte offset up to the next multiple of `CHECKPOINT_ALIGN`.
+
+    Args:
+        offset (int): Byte offset.
+
+    Returns:
+        int: The aligned offset.
+    """
+    return (offset + CHECKPOINT_ALIGN - 1) // CHECKPOINT_ALIGN * CHECKPOINT_ALIGN
@@ -0,0 +1,699 @@
+import math
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+from numba import config, njit, prange, set_num_threads
+
+from particle_life_simulator.Class_Particle import (
+    MAX_CHUNKS, cell_of, check_layout_arrays, compute_pair_influence, fused_integrate, fused_pair_terms,
+    influence_parts, layout_spread, load_particles, seed_particles
+)
+
+# Width of the halo in influence cells. Pair terms need every particle
+# within the collision diameter (two cells); one more cell absorbs rounding.
+HALO_CELLS = 3
+
+# Capacity of the strip lists per particle: a particle belongs to its own
+# strip and can lie in the halo of both neighbors (strips are at least
+# HALO_CELLS wide, so never in more).
+STRIP_COPIES = 3
+
+
+class DistributedParticle:
+    """
+    Particle system that splits the domain into strips stepped by worker processes.
+
+    The domain is cut along x into one strip per worker. The strip edges
+    lie on influence map cell edges, so every influence cell and every
+    particle in it belongs to exactly one worker, and the influence map
+    needs no exchange between workers. The particle state lives in
+    `multiprocessing.shared_memory` as a front and a back buffer of shape
+    (4, N). At the start of every step the parent sorts all particles into
+    per-strip index lists in shared memory (`assign_strips`), in one
+    parallel pass. Each worker then reads only the particles on its list,
+    its own plus a halo of `HALO_CELLS` cells on either side, from the
+    front buffer and writes the new state of its own particles into the
+    back buffer. Its cell grid and influence map cover just the strip and
+    halo. Ownership is decided by position at the start of each step, so a
+    particle that crossed a strip edge simply migrates to the neighboring
+    worker. Every worker runs `NUMBA_NUM_THREADS // num_workers` threads.
+
+    Physics are those of the fused engine (`fused_step`). The pair terms
+    and the influence map are summed in the same order, so results equal
+    those of `CreateParticle(fused=True)` exactly. Particles keep
+    their slots, so `particle_ids` is the identity and `layout_version`
+    only changes when `particles` is assigned.
+
+    The public API matches `CreateParticle`, so the object can be handed
+    to `Simulation`, the GUI or `HeadlessSimulation` unchanged. Workers are
+    started on the first step; call `close` (or use the object as a
+    context manager) to stop them and release the shared memory.
+
+    Attributes:
+        num_particles (int): Total number of particles.
+        x_max (int): Maximum x-dimension (e.g., screen width).
+        y_max (int): Maximum y-dimension (e.g., screen height).
+        speed_range (np.ndarray): Range from which initial velocities are drawn (min, max).
+        max_speed (float): Maximum allowed speed for any particle.
+        min_speed (float): Minimum speed below which velocities will be corrected upward.
+        radius (float): Radius used to determine the interaction neighborhood.
+        radius_sq (float): The square of the collision interaction diameter.
+        num_colors (int): Number of distinct colors in the system.
+        interaction_strength (float): Scaling factor for inter-particle color-based forces.
+        num_workers (int): Number of worker processes (strips).
+        step_count (int): Number of update steps performed.
+        layout_version (int): Incremented whenever `particles` is assigned.
+    """
+
+    def __init__(
+        self,
+        num_particles: int = 1000,
+        x_max: int = 1920,
+        y_max: int = 1080,
+        speed_range: tuple = (-2.0, 2.0),
+        max_speed: float = 2.0,
+        min_speed: float = 0.1,
+        radius: float = 5.0,
+        num_colors: int = 5,
+        interaction_strength: float = 0.1,
+        radius_factor: float = 0.75,
+        num_workers: int = None,
+    ):
+        """
+        Initializes the system and allocates the shared particle buffers.
+
+        Args:
+            num_particles (int, optional): Number of particles to create.
+            x_max (int, optional): Maximum x-dimension.
+            y_max (int, optional): Maximum y-dimension.
+            speed_range (tuple, optional): Range for initial random velocities (min, max).
+            max_speed (float, optional): Maximum allowed speed.
+            min_speed (float, optional): Minimum allowed speed.
+            radius (float, optional): Base radius for interaction neighborhoods.
+            num_colors (int, optional): Number of distinct colors.
+            interaction_strength (float, optional): Scaling factor for color-based forces.
+            radius_factor (float, optional): Factor to scale the interaction radius.
+            num_workers (int, optional): Number of worker processes. Defaults to the
+                number of CPUs. Capped so every strip is at least `HALO_CELLS` cells wide.
+
+        Raises:
+            ValueError: If `num_workers` is smaller than 1.
+        """
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1.")
+
+        self.x_max = x_max
+        self.y_max = y_max
+        self.speed_range = np.array(speed_range, dtype=np.float32)
+        self.max_speed = max_speed
+        self.min_speed = min_speed
+        self.radius = np.float32(max(radius * radius_factor, 0.01))
+        self.radius_sq = np.float32((2.0 * self.radius) * (2.0 * self.radius))
+        self.num_colors = num_colors
+        self.interaction_strength = interaction_strength
+
+        map_x = int(x_max / self.radius) + 1
+        self.num_workers = max(1, min(num_workers, map_x // HALO_CELLS))
+        self.cell_bounds = np.array(
+            [map_x * k // self.num_workers for k in range(self.num_workers + 1)], dtype=np.int64
+        )
+        self.strip_start = np.zeros(self.num_workers + 1, dtype=np.int64)
+
+        self.step_count = 0
+        self.layout_version = 0
+        self.front = 0
+        self.workers = []
+        self.connections = []
+        self.shm = None
+        self.allocate(num_particles)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def allocate(self, num_particles: int):
+        """
+        Allocates the shared memory for `num_particles` particles.
+
+        Running workers are stopped; they are restarted on the next step.
+
+        Args:
+            num_particles (int): Number of particles.
+        """
+        self.stop_workers()
+        self.release_memory()
+
+        self.num_particles = num_particles
+        layout = shared_layout(num_particles, self.num_colors)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(layout["size"], 1))
+        self.states, self.colors, self.matrices, self.strip_index = shared_views(self.shm.buf, layout)
+        self.states[:] = 0.0
+        self.colors[:] = 0
+        self.matrices[:] = 0.0
+        self.particle_ids = np.arange(num_particles, dtype=np.int32)
+        self.particle_columns = np.empty(num_particles, dtype=np.int32)
+        self.front = 0
+
+    @property
+    def state(self) -> np.ndarray:
+        """np.ndarray: The current state of shape (4, N) with rows x, y, vx and vy."""
+        return self.states[self.front]
+
+    @property
+    def state_back(self) -> np.ndarray:
+        """np.ndarray: The buffer the next step writes into."""
+        return self.states[1 - self.front]
+
+    @property
+    def color_interaction(self) -> np.ndarray:
+        """np.ndarray: The color interaction matrix."""
+        return self.matrices[0]
+
+    @property
+    def pair_influence(self) -> np.ndarray:
+        """np.ndarray: The cached influence coefficient of every color pair."""
+        return self.matrices[1]
+
+    @property
+    def particles(self) -> np.ndarray:
+        """
+        The particle data in the legacy array-of-structs layout.
+
+        Returns:
+            np.ndarray: A new read-only float32 array of shape (num_particles, 5) with
+                columns x, y, vx, vy and color index, see `CreateParticle.particles`.
+        """
+        particles = np.empty((self.num_particles, 5), dtype=np.float32)
+        particles[:, :4] = self.state.T
+        particles[:, 4] = self.colors
+        particles.setflags(write=False)
+        return particles
+
+    @particles.setter
+    def particles(self, particles: np.ndarray):
+        """
+        Loads particle data given in the legacy (N, 5) layout.
+
+        Args:
+            particles (np.ndarray): Array of shape (N, 5) with columns x, y, vx, vy and color.
+        """
+        if particles.shape[0] != self.num_particles:
+            matrices = self.matrices.copy()
+            self.allocate(particles.shape[0])
+            self.matrices[:] = matrices
+        self.state[:] = particles[:, :4].T
+        self.colors[:] = particles[:, 4].astype(np.int16)
+        self.layout_version += 1
+
+    def set_interaction_matrix(self, matrix: np.ndarray):
+        """
+        Sets a custom color interaction matrix.
+
+        Args:
+            matrix (np.ndarray): A 2D matrix of shape (num_colors, num_colors)
+                that specifies color interaction coefficients.
+
+        Raises:
+            ValueError: If the provided matrix does not have the shape (num_colors, num_colors).
+        """
+        if matrix.shape != (self.num_colors, self.num_colors):
+            raise ValueError("Matrix has incorrect dimensions.")
+        self.matrices[0] = matrix
+        self.matrices[1] = compute_pair_influence(self.matrices[0])
+
+    def generate_particles(self) -> None:
+        """
+        Initializes each particle with random positions, velocities, and colors.
+        """
+        state = self.state
+        state[0] = np.random.randint(0, self.x_max, self.num_particles)
+        state[1] = np.random.randint(0, self.y_max, self.num_particles)
+        state[2] = np.random.uniform(self.speed_range[0], self.speed_range[1], self.num_particles)
+        state[3] = np.random.uniform(self.speed_range[0], self.speed_range[1], self.num_particles)
+        self.colors[:] = np.random.randint(0, self.num_colors, self.num_particles)
+        self.layout_version += 1
+
+    def generate_seeded(self, seed: int, layout: str = "uniform", cluster_spread: float = 0.05) -> None:
+        """
+        Initializes the particles in parallel from a seed, see `CreateParticle.generate_seeded`.
+
+        The same seed gives the same world as `CreateParticle.generate_seeded`.
+
+        Args:
+            seed (int): Seed of the world.
+            layout (str, optional): One of `LAYOUTS`.
+            cluster_spread (float, optional): Cluster size relative to the domain.
+
+        Raises:
+            ValueError: If `layout` is unknown or `cluster_spread` is negative.
+        """
+        spread = layout_spread(layout, cluster_spread, self.x_max, self.y_max)
+        seed_particles(
+            self.state, self.colors, seed, layout == "clusters", self.x_max, self.y_max,
+            self.speed_range[0], self.speed_range[1], self.num_colors, spread
+        )
+        self.layout_version += 1
+
+    def load_layout(self, positions: np.ndarray, colors: np.ndarray, seed: int = 0) -> None:
+        """
+        Initializes the particles from given positions and colors, see `CreateParticle.load_layout`.
+
+        Args:
+            positions (np.ndarray): Positions of shape (2, N) (x row, y row).
+            colors (np.ndarray): Integer color index of every particle, shape (N,).
+            seed (int, optional): Seed of the velocities.
+
+        Raises:
+            ValueError: If the shapes do not match or a color is outside [0, num_colors).
+        """
+        check_layout_arrays(positions, colors, self.num_colors)
+        num_particles = colors.shape[0]
+        if num_particles != self.num_particles:
+            matrices = self.matrices.copy()
+            self.allocate(num_particles)
+            self.matrices[:] = matrices
+        load_particles(
+            self.state, self.colors, positions, colors, seed, self.x_max, self.y_max,
+            self.speed_range[0], self.speed_range[1]
+        )
+        self.layout_version += 1
+
+    def update_positions(self):
+        """
+        Performs a single update step on all particles.
+
+        The particles are sorted into the strip lists, every worker steps its
+        strip from the front into the back buffer, then the buffers are swapped.
+
+        Raises:
+            RuntimeError: If a worker fails.
+        """
+        if not self.workers:
+            self.start_workers()
+
+        halo = max(HALO_CELLS, int(math.ceil(math.sqrt(self.radius_sq) / self.radius)) + 1)
+        assign_strips(
+            self.state, self.radius, self.x_max, self.y_max, self.cell_bounds, halo,
+            self.particle_columns, self.strip_index, self.strip_start
+        )
+        params = (
+            self.front,
+            halo,
+            float(self.radius),
+            float(self.radius_sq),
+            float(self.interaction_strength),
+            float(self.max_speed),
+            float(self.min_speed),
+        )
+        for k, conn in enumerate(self.connections):
+            conn.send((int(self.strip_start[k]), int(self.strip_start[k + 1])) + params)
+        errors = [reply for reply in (conn.recv() for conn in self.connections) if reply is not None]
+        if errors:
+            raise RuntimeError(f"Worker failed: {errors[0]}")
+
+        self.front = 1 - self.front
+        self.step_count += 1
+
+    def warmup(self):
+        """
+        Starts the workers and lets them compile `strip_step`.
+
+        Every worker steps a one-particle dummy strip, so the first real step
+        does not pay for JIT compilation (or for loading the kernel from
+        Numba's on-disk cache) in each worker process.
+
+        Raises:
+            RuntimeError: If a worker fails.
+        """
+        if not self.workers:
+            self.start_workers()
+        for conn in self.connections:
+            conn.send("warmup")
+        errors = [reply for reply in (conn.recv() for conn in self.connections) if reply is not None]
+        if errors:
+            raise RuntimeError(f"Worker failed: {errors[0]}")
+
+    def get_positions_and_colors(self) -> np.ndarray:
+        """
+        Returns each particle's (x, y) position and color.
+
+        Returns:
+            np.ndarray: An array of shape (num_particles, 3) where each row is (x, y, color).
+        """
+        return np.column_stack((self.state[0], self.state[1], self.colors.astype(np.float32)))
+
+    def start_workers(self):
+        """
+        Starts one worker process per strip.
+        """
+        ctx = mp.get_context("spawn")
+        for k in range(self.num_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            worker = ctx.Process(
+                target=worker_main,
+                args=(
+                    child_conn,
+                    self.shm.name,
+                    self.num_particles,
+                    self.num_colors,
+                    self.x_max,
+                    self.y_max,
+                    int(self.cell_bounds[k]),
+                    int(self.cell_bounds[k + 1]),
+                    self.num_workers,
+                ),
+                daemon=True,
+            )
+            worker.start()
+            child_conn.close()
+            self.workers.append(worker)
+            self.connections.append(parent_conn)
+
+    def stop_workers(self):
+        """
+        Stops all worker processes.
+        """
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
+        self.connections = []
+
+    def release_memory(self):
+        """
+        Releases the shared memory block.
+        """
+        if self.shm is not None:
+            self.states = self.colors = self.matrices = self.strip_index = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        """
+        Stops the workers and releases the shared memory.
+
+        The particle data is lost; read it (e.g. via `particles`) before closing.
+        """
+        if getattr(self, "shm", None) is None:
+            return
+        self.stop_workers()
+        self.release_memory()
+
+
+def shared_layout(num_particles, num_colors):
+    """
+    Computes the byte offsets of the arrays in the shared memory block.
+
+    Args:
+        num_particles (int): Number of particles.
+        num_colors (int): Number of distinct colors.
+
+    Returns:
+        dict: Offsets ("states", "colors", "matrices", "strip_index"), shapes and
+            total "size" in bytes.
+    """
+    states = 2 * 4 * num_particles * 4
+    colors = num_particles * 2
+    colors_end = states + colors
+    matrices_offset = (colors_end + 7) // 8 * 8
+    strip_index_offset = matrices_offset + 2 * num_colors * num_colors * 4
+    return {
+        "num_particles": num_particles,
+        "num_colors": num_colors,
+        "states": 0,
+        "colors": states,
+        "matrices": matrices_offset,
+        "strip_index": strip_index_offset,
+        "size": strip_index_offset + STRIP_COPIES * num_particles * 4,
+    }
+
+
+def shared_views(buffer, layout):
+    """
+    Creates the numpy views of the shared memory block.
+
+    Args:
+        buffer: The buffer of a `SharedMemory` block.
+        layout (dict): Offsets and shapes, see `shared_layout`.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: States (2, 4, N) float32,
+            colors (N,) int16, matrices (2, C, C) float32 (interaction and pair influence)
+            and the strip lists (STRIP_COPIES * N,) int32, see `assign_strips`.
+    """
+    n = layout["num_particles"]
+    c = layout["num_colors"]
+    states = np.ndarray((2, 4, n), dtype=np.float32, buffer=buffer, offset=layout["states"])
+    colors = np.ndarray((n,), dtype=np.int16, buffer=buffer, offset=layout["colors"])
+    matrices = np.ndarray((2, c, c), dtype=np.float32, buffer=buffer, offset=layout["matrices"])
+    strip_index = np.ndarray((STRIP_COPIES * n,), dtype=np.int32, buffer=buffer, offset=layout["strip_index"])
+    return states, colors, matrices, strip_index
+
+
+def worker_main(conn, shm_name, num_particles, num_colors, x_max, y_max, cell_lo, cell_hi, num_workers):
+    """
+    Runs a strip worker until it receives `None`.
+
+    Each message is a tuple `(start, end, front, halo, radius, radius_sq,
+    interaction_strength, max_speed, min_speed)`; the worker steps the
+    particles in `strip_index[start:end]` from buffer `front` into the other
+    buffer and replies with `None`, or with an error message. The message
+    `"warmup"` steps a dummy strip instead, to compile `strip_step`.
+
+    The workers share the cores, so each runs `NUMBA_NUM_THREADS // num_workers`
+    Numba threads instead of one per core.
+
+    Args:
+        conn: Pipe connection to the parent process.
+        shm_name (str): Name of the shared memory block.
+        num_particles (int): Number of particles.
+        num_colors (int): Number of distinct colors.
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        cell_lo (int): First influence cell column owned by this worker.
+        cell_hi (int): One past the last influence cell column owned by this worker.
+        num_workers (int): Number of workers sharing the cores.
+    """
+    set_num_threads(max(1, config.NUMBA_NUM_THREADS // num_workers))
+    shm = shared_memory.SharedMemory(name=shm_name)
+    states, colors, matrices, strip_index = shared_views(shm.buf, shared_layout(num_particles, num_colors))
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            try:
+                if message == "warmup":
+                    dummy_states = np.zeros((2, 4, 1), dtype=np.float32)
+                    dummy_colors = np.zeros(1, dtype=colors.dtype)
+                    dummy_matrices = np.zeros_like(matrices)
+                    strip_step(
+                        dummy_states[0], dummy_colors, dummy_states[1], np.zeros(1, dtype=np.int32),
+                        cell_lo, cell_hi, HALO_CELLS, x_max, y_max, np.float32(1.0), np.float32(4.0),
+                        dummy_matrices[0], dummy_matrices[1], np.float32(0.0), np.float32(1.0), np.float32(0.0)
+                    )
+                    conn.send(None)
+                    continue
+                start, end, front, halo, radius, radius_sq, strength, max_speed, min_speed = message
+                strip_step(
+                    states[front], colors, states[1 - front], strip_index[start:end],
+                    cell_lo, cell_hi, halo, x_max, y_max, np.float32(radius), np.float32(radius_sq),
+                    matrices[0], matrices[1], np.float32(strength), np.float32(max_speed), np.float32(min_speed)
+                )
+                conn.send(None)
+            except Exception as exc:
+                conn.send(repr(exc))
+    except EOFError:
+        pass
+    finally:
+        states = colors = matrices = strip_index = None
+        shm.close()
+
+
+@njit(parallel=True, cache=True)
+def assign_strips(state, radius, x_max, y_max, cell_bounds, halo, columns, strip_index, strip_start):
+    """
+    Lists the particles every strip needs, in one parallel pass over all particles.
+
+    Strip `k` needs the particles in influence cell columns
+    `[cell_bounds[k] - halo, cell_bounds[k + 1] + halo)`. A stable counting
+    sort writes their indices in ascending order to
+    `strip_index[strip_start[k]:strip_start[k + 1]]`, so every worker sums
+    the pair terms in the same order as the single-process engine.
+
+    Args:
+        state (np.ndarray): Particle state of shape (4, N) with rows x, y, vx and vy.
+        radius (float): Interaction radius; also the influence map cell size.
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        cell_bounds (np.ndarray): int64 first column of every strip, plus the end, shape (S + 1,).
+        halo (int): Halo width in influence cells; at most the narrowest strip.
+        columns (np.ndarray): int32 scratch array of shape (N,) for the particle columns.
+        strip_index (np.ndarray): int32 array of shape (STRIP_COPIES * N,) that receives the lists.
+        strip_start (np.ndarray): int64 array of shape (S + 1,) that receives the list offsets.
+    """
+    num_particles = state.shape[1]
+    num_strips = cell_bounds.shape[0] - 1
+    map_x = int(x_max / radius) + 1
+    map_y = int(y_max / radius) + 1
+    strip_of = np.empty(map_x, dtype=np.int64)
+    for k in range(num_strips):
+        for col in range(cell_bounds[k], cell_bounds[k + 1]):
+            strip_of[col] = k
+
+    num_chunks = max(1, min(MAX_CHUNKS, num_particles))
+    chunk_len = (num_particles + num_chunks - 1) // num_chunks
+    counts = np.zeros((num_strips, num_chunks), dtype=np.int64)
+
+    # Phase 1: every chunk counts its particles per strip
+    for c in prange(num_chunks):
+        for i in range(c * chunk_len, min((c + 1) * chunk_len, num_particles)):
+            col, _ = cell_of(state[0, i], state[1, i], radius, map_x, map_y)
+            columns[i] = col
+            s = strip_of[col]
+            for k in range(max(0, s - 1), min(num_strips, s + 2)):
+                if cell_bounds[k] - halo <= col < cell_bounds[k + 1] + halo:
+                    counts[k, c] += 1
+
+    # Phase 2: exclusive prefix sum in (strip, chunk) order
+    total = 0
+    for k in range(num_strips):
+        strip_start[k] = total
+        for c in range(num_chunks):
+            count = counts[k, c]
+            counts[k, c] = total
+            total += count
+    strip_start[num_strips] = total
+
+    # Phase 3: stable scatter, every chunk owns disjoint output slots
+    for c in prange(num_chunks):
+        for i in range(c * chunk_len, min((c + 1) * chunk_len, num_particles)):
+            col = columns[i]
+            s = strip_of[col]
+            for k in range(max(0, s - 1), min(num_strips, s + 2)):
+                if cell_bounds[k] - halo <= col < cell_bounds[k + 1] + halo:
+                    strip_index[counts[k, c]] = i
+                    counts[k, c] += 1
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def strip_step(
+    state,
+    colors,
+    out,
+    local,
+    cell_lo,
+    cell_hi,
+    halo,
+    x_max,
+    y_max,
+    radius,
+    radius_sq,
+    interaction_matrix,
+    pair_influence,
+    interaction_strength,
+    max_speed,
+    min_speed,
+):
+    """
+    Performs a fused update step for the particles of one strip.
+
+    Gathers the listed particles (influence cell columns `[cell_lo - halo,
+    cell_hi + halo)`, see `assign_strips`), computes their pair terms on a
+    cell grid that covers only those columns, integrates the ones in
+    `[cell_lo, cell_hi)` with an influence map of the strip and scatters
+    their new state into `out`. The work is proportional to the particles
+    of the strip and its halo, not to N or the domain size.
+
+    The partial influence maps follow the split of all N particles that
+    `accumulate_influence_map` uses, so every map entry is summed in the
+    same order as in the single-process engine.
+
+    Args:
+        state (np.ndarray): Particle state of shape (4, N) with rows x, y, vx and vy.
+        colors (np.ndarray): Integer color indices of shape (N,).
+        out (np.ndarray): Array of shape (4, N) that receives the new state of the strip.
+        local (np.ndarray): Ascending indices of the strip and halo particles.
+        cell_lo (int): First owned influence cell column.
+        cell_hi (int): One past the last owned influence cell column.
+        halo (int): Halo width in influence cells.
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        radius (float): Interaction radius; also the influence map cell size.
+        radius_sq (float): Square of the collision interaction diameter.
+        interaction_matrix (np.ndarray): Color interaction coefficients.
+        pair_influence (np.ndarray): Influence coefficient of every color pair.
+        interaction_strength (float): Global scaling for interaction forces.
+        max_speed (float): Maximum velocity magnitude.
+        min_speed (float): Minimum velocity magnitude.
+    """
+    map_x = int(x_max / radius) + 1
+    map_y = int(y_max / radius) + 1
+
+    num_local = local.shape[0]
+    x = np.empty(num_local, dtype=np.float32)
+    y = np.empty(num_local, dtype=np.float32)
+    local_colors = np.empty(num_local, dtype=colors.dtype)
+    column = np.empty(num_local, dtype=np.int32)
+    for k in prange(num_local):
+        x[k] = state[0, local[k]]
+        y[k] = state[1, local[k]]
+        local_colors[k] = colors[local[k]]
+        column[k], _ = cell_of(x[k], y[k], radius, map_x, map_y)
+
+    # Cell grid over the strip and halo, with one spare cell column on either side
+    cell_size = max(2.0 * radius, 1.0)
+    grid_lo = int(max(cell_lo - halo - 1, 0) * radius / cell_size)
+    grid_hi = int(min((cell_hi + halo + 1) * radius, x_max) / cell_size) + 1
+    terms = fused_pair_terms(
+        x, y, local_colors, x_max, y_max, radius, radius_sq,
+        interaction_matrix, pair_influence, interaction_strength, True,
+        None, None, None, None, None, grid_lo, grid_hi
+    )
+
+    owned = np.nonzero((column >= cell_lo) & (column < cell_hi))[0]
+    num_owned = owned.shape[0]
+    owned_state = np.empty((4, num_owned), dtype=np.float32)
+    owned_terms = np.empty((6, num_owned), dtype=np.float32)
+    for k in prange(num_owned):
+        for r in range(4):
+            owned_state[r, k] = state[r, local[owned[k]]]
+        for r in range(6):
+            owned_terms[r, k] = terms[r, owned[k]]
+
+    # Owned particles are in ascending index order, so every part of the
+    # global split is a contiguous range of them
+    num_particles = state.shape[1]
+    num_parts = influence_parts(num_particles)
+    part_len = (num_particles + num_parts - 1) // num_parts
+    owned_ids = local[owned]
+    part_bounds = np.empty(num_parts + 1, dtype=np.int64)
+    for p in range(num_parts + 1):
+        part_bounds[p] = np.searchsorted(owned_ids, p * part_len)
+
+    owned_out = np.empty_like(owned_state)
+    fused_integrate(
+        owned_state, owned_terms, x_max, y_max, radius, max_speed, min_speed, owned_out, None,
+        cell_lo, cell_hi, part_bounds
+    )
+
+    for k in prange(num_owned):
+        for r in range(4):
+            out[r, local[owned[k]]] = owned_out[r, k]
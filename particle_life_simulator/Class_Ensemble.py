@@ -0,0 +1,371 @@
+import math
+
+import numpy as np
+from numba import njit, prange
+
+from particle_life_simulator.Class_Particle import (
+    cell_of, compute_pair_influence, influence_parts, integrate_particle, pair_terms
+)
+
+
+class ParticleEnsemble:
+    """
+    Holds B independent worlds that share their parameters but not their interaction matrix.
+
+    All worlds are stored in one structure-of-arrays block: `states` has the
+    shape (B, 4, N) with rows x, y, vx and vy per world, `colors` has the
+    shape (B, N) and `color_interaction` has the shape (B, C, C). A single
+    call of `ensemble_step` advances every world, parallelised over
+    world x particle, so sweeping many small worlds costs one compiled call
+    per step instead of one jitclass call per world.
+
+    Every world evolves exactly like a `CreateParticle` with `fused=True`
+    that is given the same particles and matrix.
+
+    Attributes:
+        num_worlds (int): Number of worlds B.
+        num_particles (int): Number of particles N per world.
+        x_max (int): Maximum x-dimension (e.g., screen width).
+        y_max (int): Maximum y-dimension (e.g., screen height).
+        speed_range (np.ndarray): Range from which initial velocities are drawn (min, max).
+        max_speed (float): Maximum allowed speed for any particle.
+        min_speed (float): Minimum speed below which velocities will be corrected upward.
+        radius (float): Radius used to determine the interaction neighborhood.
+        radius_sq (float): The square of the collision interaction diameter.
+        num_colors (int): Number of distinct colors C.
+        interaction_strength (float): Scaling factor for inter-particle color-based forces.
+        states (np.ndarray): float32 state of all worlds, shape (B, 4, N).
+        states_back (np.ndarray): Back buffer with the shape of `states`.
+        colors (np.ndarray): int16 color indices, shape (B, N).
+        color_interaction (np.ndarray): float32 interaction matrices, shape (B, C, C).
+        pair_influence (np.ndarray): Cached influence coefficients per world, shape (B, C, C).
+        step_count (int): Number of update steps performed.
+    """
+
+    def __init__(
+        self,
+        num_worlds: int = 16,
+        num_particles: int = 1000,
+        x_max: int = 1920,
+        y_max: int = 1080,
+        speed_range: tuple = (-2.0, 2.0),
+        max_speed: float = 2.0,
+        min_speed: float = 0.1,
+        radius: float = 5.0,
+        num_colors: int = 5,
+        interaction_strength: float = 0.1,
+        radius_factor: float = 0.75,
+    ):
+        """
+        Initializes the ensemble and allocates memory for all worlds.
+
+        Args:
+            num_worlds (int, optional): Number of worlds.
+            num_particles (int, optional): Number of particles per world.
+            x_max (int, optional): Maximum x-dimension.
+            y_max (int, optional): Maximum y-dimension.
+            speed_range (tuple, optional): Range for initial random velocities (min, max).
+            max_speed (float, optional): Maximum allowed speed.
+            min_speed (float, optional): Minimum allowed speed.
+            radius (float, optional): Base radius for interaction neighborhoods.
+            num_colors (int, optional): Number of distinct colors.
+            interaction_strength (float, optional): Scaling factor for color-based forces.
+            radius_factor (float, optional): Factor to scale the interaction radius.
+        """
+        self.num_worlds = num_worlds
+        self.num_particles = num_particles
+        self.x_max = x_max
+        self.y_max = y_max
+        self.speed_range = np.array(speed_range, dtype=np.float32)
+        self.max_speed = max_speed
+        self.min_speed = min_speed
+        self.radius = np.float32(max(radius * radius_factor, 0.01))
+        self.radius_sq = np.float32((2.0 * self.radius) * (2.0 * self.radius))
+        self.num_colors = num_colors
+        self.interaction_strength = interaction_strength
+
+        self.states = np.zeros((num_worlds, 4, num_particles), dtype=np.float32)
+        self.states_back = np.zeros_like(self.states)
+        self.colors = np.zeros((num_worlds, num_particles), dtype=np.int16)
+        self.color_interaction = np.zeros((num_worlds, num_colors, num_colors), dtype=np.float32)
+        self.pair_influence = np.zeros_like(self.color_interaction)
+        self.step_count = 0
+
+    def generate_particles(self) -> None:
+        """
+        Initializes every world with random positions, velocities, and colors.
+        """
+        shape = (self.num_worlds, self.num_particles)
+        self.states[:, 0] = np.random.randint(0, self.x_max, shape)
+        self.states[:, 1] = np.random.randint(0, self.y_max, shape)
+        self.states[:, 2] = np.random.uniform(self.speed_range[0], self.speed_range[1], shape)
+        self.states[:, 3] = np.random.uniform(self.speed_range[0], self.speed_range[1], shape)
+        self.colors[:] = np.random.randint(0, self.num_colors, shape)
+
+    def set_interaction_matrices(self, matrices: np.ndarray):
+        """
+        Sets the interaction matrix of every world.
+
+        Args:
+            matrices (np.ndarray): Array of shape (B, C, C), or a single (C, C)
+                matrix that is used for all worlds.
+
+        Raises:
+            ValueError: If the matrices have an incorrect shape.
+        """
+        matrices = np.asarray(matrices, dtype=np.float32)
+        if matrices.shape == (self.num_colors, self.num_colors):
+            matrices = np.broadcast_to(matrices, self.color_interaction.shape)
+        if matrices.shape != self.color_interaction.shape:
+            raise ValueError("Matrices have incorrect dimensions.")
+        for b in range(self.num_worlds):
+            self.set_interaction_matrix(b, matrices[b])
+
+    def set_interaction_matrix(self, world: int, matrix: np.ndarray):
+        """
+        Sets the interaction matrix of a single world.
+
+        Args:
+            world (int): Index of the world.
+            matrix (np.ndarray): A 2D matrix of shape (num_colors, num_colors).
+
+        Raises:
+            ValueError: If the provided matrix does not have the shape (num_colors, num_colors).
+        """
+        if matrix.shape != (self.num_colors, self.num_colors):
+            raise ValueError("Matrix has incorrect dimensions.")
+        self.color_interaction[world] = matrix
+        self.pair_influence[world] = compute_pair_influence(self.color_interaction[world])
+
+    def get_particles(self, world: int) -> np.ndarray:
+        """
+        Returns the particles of one world in the legacy (N, 5) layout.
+
+        Args:
+            world (int): Index of the world.
+
+        Returns:
+            np.ndarray: A new float32 array with columns x, y, vx, vy and color index.
+        """
+        particles = np.empty((self.num_particles, 5), dtype=np.float32)
+        particles[:, :4] = self.states[world].T
+        particles[:, 4] = self.colors[world]
+        return particles
+
+    def set_particles(self, world: int, particles: np.ndarray):
+        """
+        Loads the particles of one world given in the legacy (N, 5) layout.
+
+        Args:
+            world (int): Index of the world.
+            particles (np.ndarray): Array of shape (num_particles, 5).
+
+        Raises:
+            ValueError: If the number of particles does not match.
+        """
+        if particles.shape[0] != self.num_particles:
+            raise ValueError("All worlds must have num_particles particles.")
+        self.states[world] = particles[:, :4].T
+        self.colors[world] = particles[:, 4].astype(np.int16)
+
+    def update_positions(self):
+        """
+        Advances every world by one step with a single call of `ensemble_step`.
+        """
+        ensemble_step(
+            self.states,
+            self.colors,
+            self.x_max,
+            self.y_max,
+            self.radius,
+            self.radius_sq,
+            self.color_interaction,
+            self.pair_influence,
+            np.float32(self.interaction_strength),
+            np.float32(self.max_speed),
+            np.float32(self.min_speed),
+            self.states_back,
+        )
+        self.states, self.states_back = self.states_back, self.states
+        self.step_count += 1
+
+
+@njit(parallel=True, cache=True)
+def build_ensemble_cell_lists(states, x_max, y_max, cell_size):
+    """
+    Sorts the particles of every world into grid cells.
+
+    Each world is sorted serially with a stable counting sort, and the
+    worlds are processed in parallel. The result equals `build_cell_list`
+    applied to each world.
+
+    Args:
+        states (np.ndarray): Particle states of shape (B, 4, N).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        cell_size (float): Edge length of a grid cell.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, int, int]: (cell_start, cell_particles, grid_x, grid_y)
+            with shapes (B, grid_x * grid_y + 1) and (B, N).
+    """
+    num_worlds = states.shape[0]
+    num_particles = states.shape[2]
+    grid_x = int(x_max / cell_size) + 1
+    grid_y = int(y_max / cell_size) + 1
+    num_cells = grid_x * grid_y
+
+    cell_start = np.zeros((num_worlds, num_cells + 1), dtype=np.int32)
+    cell_particles = np.empty((num_worlds, num_particles), dtype=np.int32)
+    for b in prange(num_worlds):
+        particle_cells = np.empty(num_particles, dtype=np.int32)
+        for i in range(num_particles):
+            cx, cy = cell_of(states[b, 0, i], states[b, 1, i], cell_size, grid_x, grid_y)
+            particle_cells[i] = cx * grid_y + cy
+            cell_start[b, particle_cells[i] + 1] += 1
+        for c in range(num_cells):
+            cell_start[b, c + 1] += cell_start[b, c]
+        fill = cell_start[b, :num_cells].copy()
+        for i in range(num_particles):
+            c = particle_cells[i]
+            cell_particles[b, fill[c]] = i
+            fill[c] += 1
+
+    return cell_start, cell_particles, grid_x, grid_y
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def ensemble_step(
+    states,
+    colors,
+    x_max,
+    y_max,
+    radius,
+    radius_sq,
+    interaction_matrices,
+    pair_influences,
+    interaction_strength,
+    max_speed,
+    min_speed,
+    out,
+):
+    """
+    Performs one fused update step for every world of an ensemble.
+
+    The pair pass and the integration pass each run as one parallel loop
+    over all (world, particle) pairs. Per world, the pair terms, the
+    influence map (summed in the same partial-map order as
+    `accumulate_influence_map`) and the integration are those of
+    `fused_step`.
+
+    Args:
+        states (np.ndarray): Particle states of shape (B, 4, N).
+        colors (np.ndarray): Integer color indices of shape (B, N).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        radius (float): Interaction radius; also the influence map cell size.
+        radius_sq (float): Square of the collision interaction diameter.
+        interaction_matrices (np.ndarray): Color interaction coefficients of shape (B, C, C).
+        pair_influences (np.ndarray): Influence coefficients of shape (B, C, C).
+        interaction_strength (float): Global scaling for interaction forces.
+        max_speed (float): Maximum velocity magnitude.
+        min_speed (float): Minimum velocity magnitude.
+        out (np.ndarray): Array of shape (B, 4, N) that receives the new states.
+    """
+    num_worlds = states.shape[0]
+    num_particles = states.shape[2]
+    total = num_worlds * num_particles
+
+    cell_size = max(2.0 * radius, 1.0)
+    cell_start, cell_particles, grid_x, grid_y = build_ensemble_cell_lists(
+        states, x_max, y_max, cell_size
+    )
+
+    influence_sq = radius * radius
+    diameter = math.sqrt(radius_sq)
+
+    # Per-particle influence (0:2), force (2:4) and collision push (4:6)
+    terms = np.empty((num_worlds, 6, num_particles), dtype=np.float32)
+    for t in prange(total):
+        b = t // num_particles
+        i = t - b * num_particles
+        x = states[b, 0]
+        y = states[b, 1]
+        xi = x[i]
+        yi = y[i]
+        color = colors[b, i]
+
+        ix, iy = 0.0, 0.0
+        fx, fy = 0.0, 0.0
+        px, py = 0.0, 0.0
+
+        cx, cy = cell_of(xi, yi, cell_size, grid_x, grid_y)
+        for gx in range(max(0, cx - 1), min(cx + 2, grid_x)):
+            for gy in range(max(0, cy - 1), min(cy + 2, grid_y)):
+                c = gx * grid_y + gy
+                for cidx in range(cell_start[b, c], cell_start[b, c + 1]):
+                    j = cell_particles[b, cidx]
+                    if j == i:
+                        continue
+                    dx = x[j] - xi
+                    dy = y[j] - yi
+                    dist_sq = dx * dx + dy * dy
+                    if dist_sq >= radius_sq:
+                        continue
+
+                    tix, tiy, tfx, tfy, tpx, tpy = pair_terms(
+                        dx, dy, dist_sq, color, colors[b, j], interaction_matrices[b],
+                        pair_influences[b], interaction_strength, influence_sq, diameter
+                    )
+                    ix += tix
+                    iy += tiy
+                    fx += tfx
+                    fy += tfy
+                    px += tpx
+                    py += tpy
+
+        terms[b, 0, i] = ix
+        terms[b, 1, i] = iy
+        terms[b, 2, i] = fx
+        terms[b, 3, i] = fy
+        terms[b, 4, i] = px
+        terms[b, 5, i] = py
+
+    # Influence maps, summed in the same order as accumulate_influence_map
+    map_x = int(x_max / radius) + 1
+    map_y = int(y_max / radius) + 1
+    num_parts = influence_parts(num_particles)
+    part_len = (num_particles + num_parts - 1) // num_parts
+    partial_maps = np.zeros((num_worlds, num_parts, map_x, map_y, 2), dtype=np.float32)
+    for t in prange(num_worlds * num_parts):
+        b = t // num_parts
+        p = t - b * num_parts
+        for i in range(p * part_len, min((p + 1) * part_len, num_particles)):
+            gx, gy = cell_of(states[b, 0, i], states[b, 1, i], radius, map_x, map_y)
+            partial_maps[b, p, gx, gy, 0] += terms[b, 0, i]
+            partial_maps[b, p, gx, gy, 1] += terms[b, 1, i]
+
+    influence_maps = np.empty((num_worlds, map_x, map_y, 2), dtype=np.float32)
+    for t in prange(num_worlds * map_x):
+        b = t // map_x
+        gx = t - b * map_x
+        for gy in range(map_y):
+            sx = np.float32(0.0)
+            sy = np.float32(0.0)
+            for p in range(num_parts):
+                sx += partial_maps[b, p, gx, gy, 0]
+                sy += partial_maps[b, p, gx, gy, 1]
+            influence_maps[b, gx, gy, 0] = sx
+            influence_maps[b, gx, gy, 1] = sy
+
+    for t in prange(total):
+        b = t // num_particles
+        i = t - b * num_particles
+        xi = states[b, 0, i]
+        yi = states[b, 1, i]
+
+        gx, gy = cell_of(xi, yi, radius, map_x, map_y)
+        out[b, 0, i], out[b, 1, i], out[b, 2, i], out[b, 3, i] = integrate_particle(
+            xi, yi, states[b, 2, i], states[b, 3, i], influence_maps[b, gx, gy, 0], influence_maps[b, gx, gy, 1],
+            terms[b, 2, i], terms[b, 3, i], terms[b, 4, i], terms[b, 5, i], x_max, y_max, max_speed, min_speed
+        )
@@ -1,10 +1,20 @@
-from vispy import app, scene
-from vispy.visuals import transforms
+import math
+from types import FunctionType
+from vispy import app, gloo, scene
+from vispy.visuals import Visual, transforms
 import numpy as np
 from numba import prange
 from numba import njit, typed, types
 import tkinter as tk
 
+from particle_life_simulator.Class_Particle import bin_by_key
+from particle_life_simulator.Class_Render import DEFAULT_COLOR_LOOKUP, create_palette
+from particle_life_simulator.Class_Timing import StageTimer, summarize_stage_times
+
+# Stages of drawing a frame timed by `GUI.draw_timer`: converting the
+# particle data for the GPU and handing it to VisPy.
+DRAW_STAGES = ("prepare", "upload")
+
 
 class GUI:
     
@@ -14,6 +24,8 @@ class GUI:
         window_height: int = None,
         particle_size: int = 10,
         color_lookup: dict = None,
+        lod_threshold: int = 2_000_000,
+        lod_zoom: float = 4.0,
     ):
         self.win = tk.Tk()
         self.win.geometry("650x250")
@@ -24,35 +36,50 @@ class GUI:
         self.window_width = window_width if window_width else screen_width
         self.window_height = window_height if window_height else screen_height
         self.particle_size = particle_size
+        # Above lod_threshold particles, or when a screen pixel covers more than
+        # lod_zoom world units, particles are drawn as a density image
+        self.lod_threshold = lod_threshold
+        self.lod_zoom = lod_zoom
 
-        self.color_lookup = (
-            color_lookup
-            if color_lookup
-            else {
-                0: (1.0, 0.0, 0.0),  # Red
-                1: (0.0, 0.0, 1.0),  # Blue
-                2: (0.0, 1.0, 0.0),  # Green
-                3: (1.0, 1.0, 0.0),  # Yellow
-                4: (1.0, 0.0, 1.0),  # Magenta
-            }
-        )
+        self.color_lookup = color_lookup if color_lookup else dict(DEFAULT_COLOR_LOOKUP)
 
         self.numba_color_lookup = create_numba_dict(self.color_lookup)
+        self.palette = create_palette(self.color_lookup)
+        self.playback = None
+        self.uploaded_layout = None
+        self.draw_timer = StageTimer(DRAW_STAGES)
+        self.draw_workspace = DrawWorkspace()
+        # Set while another thread may be running parallel kernels on a layer that is not thread-safe
+        self.serial_kernels = False
+        # Called with the new state when timing is toggled with the T key
+        self.timing_handler = None
 
         # VisPy Setup
         self.canvas = scene.SceneCanvas(
-            keys="interactive", show=True, fullscreen=True, size=(window_width, window_height)
+            keys="interactive", show=True, fullscreen=True, size=(self.window_width, self.window_height)
         )
         self.view = self.canvas.central_widget.add_view()
         self.view.camera = scene.cameras.PanZoomCamera(aspect=1)
         self.view.camera.set_range(x=(0, self.window_width), y=(0, self.window_height))
         self.scatter = scene.visuals.Markers(parent=self.view.scene)
+        self.particle_visual = Particles(size=particle_size, parent=self.view.scene)
+        self.density_image = scene.visuals.Image(
+            np.zeros((1, 1, 4), dtype=np.uint8), interpolation="nearest", parent=self.view.scene
+        )
+        self.density_image.visible = False
 
         # FPS Label
         self.fps_label = scene.Label("FPS: 0", color="white", font_size=14, anchor_x="right", anchor_y="top")
         self.fps_label.transform = transforms.STTransform(translate=(self.window_width * 0.124, self.window_height * 0.86))
         self.view.add(self.fps_label)
 
+        # Stage timing overlay, shown while timing is enabled
+        self.stage_label = scene.Label("", color="white", font_size=10, anchor_x="right", anchor_y="top")
+        self.stage_label.transform = transforms.STTransform(translate=(self.window_width * 0.124, self.window_height * 0.83))
+        self.stage_label.visible = False
+        self.view.add(self.stage_label)
+
+        self.canvas.events.key_press.connect(self.on_key_press)
         self.add_buttons()
 
 
@@ -99,14 +126,64 @@ class GUI:
                 self.stop_simulation()
 
 
+    def connect_playback(self, player):
+        """
+        Routes key presses to a `TrajectoryPlayer` (see `TrajectoryPlayer.handle_key`).
+        """
+        self.playback = player
+
+
+    def on_key_press(self, event):
+        if event.key is None:
+            return
+        if event.key.name == "T":
+            enabled = not self.draw_timer.enabled
+            if self.timing_handler is not None:
+                self.timing_handler(enabled)
+            else:
+                self.set_timing(enabled)
+        elif self.playback is not None:
+            self.playback.handle_key(event.key.name)
+
+
+    def set_timing(self, enabled: bool) -> None:
+        """
+        Turns the draw stage timers and the timing overlay on or off.
+
+        Args:
+            enabled (bool): Whether to record and show stage times.
+        """
+        self.draw_timer.enabled = enabled
+        self.stage_label.visible = enabled
+
+
+    def update_stage_overlay(self, physics_times: np.ndarray = None, physics_stages: tuple = ()) -> None:
+        """
+        Shows the mean stage times of the recent frames next to the FPS label.
+
+        Args:
+            physics_times (np.ndarray, optional): Stage times of the simulation steps,
+                shape (steps, len(physics_stages)), oldest first.
+            physics_stages (tuple, optional): Names of the simulation stages.
+        """
+        summary = {}
+        if physics_times is not None:
+            summary.update(summarize_stage_times(physics_times, physics_stages))
+        summary.update(summarize_stage_times(self.draw_timer.get_times(), DRAW_STAGES))
+        self.stage_label.text = " | ".join(f"{stage} {ms:.2f}" for stage, ms in summary.items()) + " ms"
+
+
     def stop_simulation(self):
         print("Simulation stopped.")
         self.canvas.close()
         app.quit()
 
 
-    def update_fps(self, fps: float) -> None:
-        self.fps_label.text = f"FPS: {fps:.2f}"
+    def update_fps(self, fps: float, steps_per_second: float = None) -> None:
+        if steps_per_second is None:
+            self.fps_label.text = f"FPS: {fps:.2f}"
+        else:
+            self.fps_label.text = f"FPS: {fps:.2f} | Steps/s: {steps_per_second:.2f}"
         self.fps_label.transform = transforms.STTransform(
             translate=(self.window_width * 0.124, self.window_height * 0.86)
         )
@@ -117,12 +194,245 @@ class GUI:
         Draws the particles in the drawing area.
 
         Args:
-            particles (np.ndarray): Structured NumPy array with 'x', 'y', and 'color' fields.
+            particles (np.ndarray): Array of shape (N, 3) with the columns x, y and color index,
+                as returned by `CreateParticle.get_positions_and_colors`. If the color
+                column is missing, all particles are drawn in the fallback color.
+            num_particles (int): Number of particles to draw.
         """
-        positions, colors = process_positions_and_colors(particles, self.numba_color_lookup, num_particles)
+        self.draw_timer.start_frame()
+        x = np.ascontiguousarray(particles[:num_particles, 0], dtype=np.float32)
+        y = np.ascontiguousarray(particles[:num_particles, 1], dtype=np.float32)
+        if particles.shape[1] > 2:
+            color_indices = particles[:num_particles, 2].astype(np.int16)
+        else:
+            color_indices = np.full(num_particles, -1, dtype=np.int16)
+
+        if self.use_lod(num_particles):
+            self.draw_density(x, y, color_indices)
+            return
+
+        positions, colors = self.draw_workspace.buffers(num_particles)
+        kernel = process_positions_and_colors_serial if self.serial_kernels else process_positions_and_colors
+        kernel(
+            x, y, color_indices, self.numba_color_lookup, num_particles, positions, colors
+        )
+        self.draw_timer.mark(0)
 
+        self.show_visual(self.scatter)
         self.scatter.set_data(positions, face_color=colors, size=self.particle_size)
+        self.draw_timer.mark(1)
+
+
+    def draw_state(self, x: np.ndarray, y: np.ndarray, color_indices: np.ndarray, layout_version: int) -> None:
+        """
+        Draws the particles straight from the simulation state.
+
+        Only the positions are uploaded every frame, directly from the given
+        arrays, which should be the contiguous x and y rows of the particle
+        state (e.g. `state[0]` and `state[1]` of `CreateParticle`). The
+        per-particle colors are converted and uploaded only when
+        `layout_version` or the particle count changes.
+
+        Args:
+            x (np.ndarray): Contiguous float32 x-positions of shape (N,).
+            y (np.ndarray): Contiguous float32 y-positions of shape (N,).
+            color_indices (np.ndarray): Integer color index of every particle.
+            layout_version (int): Changes whenever the order of the particles changes.
+        """
+        self.draw_timer.start_frame()
+        if self.use_lod(x.shape[0]):
+            self.draw_density(x, y, color_indices)
+            return
+
+        layout = (layout_version, x.shape[0])
+        if layout != self.uploaded_layout:
+            kernel = colors_to_rgb_serial if self.serial_kernels else colors_to_rgb
+            rgb = kernel(color_indices, self.palette)
+            self.draw_timer.mark(0)
+            self.particle_visual.set_colors(rgb)
+            self.uploaded_layout = layout
+        self.show_visual(self.particle_visual)
+        self.particle_visual.set_positions(x, y)
+        self.draw_timer.mark(1)
+
+
+    def visible_region(self):
+        """
+        Returns the visible part of the world and the canvas size in pixels.
+
+        Returns:
+            Tuple[float, float, float, float, int, int]: (left, bottom, width, height)
+                of the camera rectangle and (pixels_x, pixels_y) of the canvas.
+        """
+        try:
+            rect = self.view.camera.rect
+            left, bottom, width, height = float(rect.left), float(rect.bottom), float(rect.width), float(rect.height)
+            pixels_x, pixels_y = (int(v) for v in self.canvas.size)
+        except (AttributeError, TypeError, ValueError):
+            left, bottom, width, height = 0.0, 0.0, float(self.window_width), float(self.window_height)
+            pixels_x, pixels_y = int(self.window_width), int(self.window_height)
+        return left, bottom, width, height, max(pixels_x, 1), max(pixels_y, 1)
+
+
+    def use_lod(self, num_particles: int) -> bool:
+        """
+        Decides whether the particles are drawn as a density image instead of markers.
+
+        Args:
+            num_particles (int): Number of particles to draw.
 
+        Returns:
+            bool: True above `lod_threshold` particles or when zoomed out beyond `lod_zoom`
+                world units per pixel.
+        """
+        if num_particles > self.lod_threshold:
+            return True
+        _, _, width, height, pixels_x, pixels_y = self.visible_region()
+        return max(width / pixels_x, height / pixels_y) > self.lod_zoom
+
+
+    def draw_density(self, x: np.ndarray, y: np.ndarray, color_indices: np.ndarray) -> None:
+        """
+        Draws the particles as a density image at screen resolution.
+
+        The visible part of the world is binned into one pixel per screen
+        pixel by `splat_density`, which is uploaded as a single texture, so
+        the cost per frame no longer grows with the number of markers.
+
+        Args:
+            x (np.ndarray): x-positions of shape (N,).
+            y (np.ndarray): y-positions of shape (N,).
+            color_indices (np.ndarray): Integer color index of every particle.
+        """
+        left, bottom, width, height, pixels_x, pixels_y = self.visible_region()
+        kernel = splat_density_serial if self.serial_kernels else splat_density
+        image = kernel(
+            x, y, color_indices, self.palette, left, bottom, width / pixels_x, height / pixels_y, pixels_x, pixels_y
+        )
+        self.draw_timer.mark(0)
+        self.density_image.set_data(image)
+        self.density_image.transform = transforms.STTransform(
+            scale=(width / pixels_x, height / pixels_y), translate=(left, bottom)
+        )
+        self.show_visual(self.density_image)
+        self.draw_timer.mark(1)
+
+
+    def show_visual(self, visual) -> None:
+        """
+        Shows one of the particle visuals (markers, state points or density image) and hides the others.
+
+        Args:
+            visual: The visual to show.
+        """
+        for candidate in (self.scatter, self.particle_visual, self.density_image):
+            if candidate.visible != (candidate is visual):
+                candidate.visible = candidate is visual
+
+
+PARTICLE_VERTEX_SHADER = """
+attribute float a_x;
+attribute float a_y;
+attribute vec3 a_color;
+uniform float u_size;
+varying vec3 v_color;
+
+void main() {
+    gl_Position = $transform(vec4(a_x, a_y, 0.0, 1.0));
+    gl_PointSize = u_size;
+    v_color = a_color;
+}
+"""
+
+PARTICLE_FRAGMENT_SHADER = """
+varying vec3 v_color;
+
+void main() {
+    vec2 offset = gl_PointCoord - vec2(0.5);
+    if (dot(offset, offset) > 0.25)
+        discard;
+    gl_FragColor = vec4(v_color, 1.0);
+}
+"""
+
+
+class ParticleVisual(Visual):
+    """
+    Draws round points from separate x, y and color vertex buffers.
+
+    Unlike `Markers`, which takes one interleaved array and re-uploads
+    positions, colors and sizes on every `set_data`, the buffers are updated
+    independently, so a frame only uploads the two position arrays.
+    """
+
+    def __init__(self, size: float = 3):
+        Visual.__init__(self, vcode=PARTICLE_VERTEX_SHADER, fcode=PARTICLE_FRAGMENT_SHADER)
+        self.x_buffer = gloo.VertexBuffer(np.zeros(1, dtype=np.float32))
+        self.y_buffer = gloo.VertexBuffer(np.zeros(1, dtype=np.float32))
+        self.color_buffer = gloo.VertexBuffer(np.ones((1, 3), dtype=np.float32))
+        self.num_points = 0
+        self.shared_program["a_x"] = self.x_buffer
+        self.shared_program["a_y"] = self.y_buffer
+        self.shared_program["a_color"] = self.color_buffer
+        self.shared_program["u_size"] = float(size)
+        self.set_gl_state("opaque", depth_test=False)
+        self._draw_mode = "points"
+        self.visible = False
+
+    def set_positions(self, x: np.ndarray, y: np.ndarray) -> None:
+        """Uploads the x and y positions; arrays that are already contiguous float32 are not copied."""
+        self.x_buffer.set_data(np.ascontiguousarray(x, dtype=np.float32), copy=False)
+        self.y_buffer.set_data(np.ascontiguousarray(y, dtype=np.float32), copy=False)
+        self.num_points = x.shape[0]
+        self.update()
+
+    def set_colors(self, colors: np.ndarray) -> None:
+        """Uploads the (N, 3) RGB color of every particle."""
+        self.color_buffer.set_data(np.ascontiguousarray(colors, dtype=np.float32))
+
+    def _prepare_transforms(self, view):
+        view.view_program.vert["transform"] = view.get_transform()
+
+    def _prepare_draw(self, view):
+        return self.num_points > 0
+
+
+Particles = scene.visuals.create_visual_node(ParticleVisual)
+
+
+class DrawWorkspace:
+    """
+    Marker buffers of `GUI.draw_particles`, reused from frame to frame.
+
+    The buffers are only replaced when the particle count changes, so
+    drawing a constant number of particles allocates no new arrays.
+
+    Attributes:
+        positions (np.ndarray): float32 marker positions of shape (N, 2).
+        colors (np.ndarray): float32 marker colors of shape (N, 3).
+        allocations (int): Number of times the buffers were (re)allocated.
+    """
+
+    def __init__(self):
+        self.positions = np.empty((0, 2), dtype=np.float32)
+        self.colors = np.empty((0, 3), dtype=np.float32)
+        self.allocations = 0
+
+    def buffers(self, num_particles: int):
+        """
+        Returns the position and color buffers for `num_particles` particles.
+
+        Args:
+            num_particles (int): Number of particles to draw.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (positions, colors) of shapes (N, 2) and (N, 3).
+        """
+        if self.positions.shape[0] != num_particles:
+            self.positions = np.empty((num_particles, 2), dtype=np.float32)
+            self.colors = np.empty((num_particles, 3), dtype=np.float32)
+            self.allocations += 1
+        return self.positions, self.colors
 
 
 def create_numba_dict(color_lookup):
@@ -143,19 +453,152 @@ def create_numba_dict(color_lookup):
     return color_dict
 
 
-@njit(parallel=True)
-def process_positions_and_colors(particles, color_lookup_dict, num_particles):
-    positions = np.empty((num_particles, 2), dtype=np.float32)
-    colors = np.empty((num_particles, 3), dtype=np.float32)
+@njit(parallel=True, cache=True)
+def process_positions_and_colors(x, y, color_indices, color_lookup_dict, num_particles, positions=None, colors=None):
+    """
+    Builds the position and RGB color arrays expected by the VisPy markers.
 
-    for i in prange(num_particles):
-        x = particles[i][0]
-        y = particles[i][1]
-        color_index = int(particles[i][2])
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        color_indices (np.ndarray): Integer color index of every particle.
+        color_lookup_dict (numba.typed.Dict): Mapping from color index to RGB color.
+        num_particles (int): Number of particles to process.
+        positions (np.ndarray, optional): float32 array of shape (N, 2) that receives the
+            positions. If omitted, a new array is allocated.
+        colors (np.ndarray, optional): float32 array of shape (N, 3) that receives the
+            colors. If omitted, a new array is allocated.
 
-        positions[i, 0] = x
-        positions[i, 1] = y
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (positions, colors) of shapes (N, 2) and (N, 3).
+            Unknown color indices are drawn white.
+    """
+    if positions is None:
+        positions = np.empty((num_particles, 2), dtype=np.float32)
+    if colors is None:
+        colors = np.empty((num_particles, 3), dtype=np.float32)
 
-        colors[i] = color_lookup_dict.get(color_index, np.array([1.0, 1.0, 1.0], dtype=np.float32))
+    for i in prange(num_particles):
+        positions[i, 0] = x[i]
+        positions[i, 1] = y[i]
+
+        key = np.int32(color_indices[i])
+        if key in color_lookup_dict:
+            rgb = color_lookup_dict[key]
+            for k in range(3):
+                colors[i, k] = rgb[k]
+        else:
+            for k in range(3):
+                colors[i, k] = 1.0
 
     return positions, colors
+
+
+@njit(parallel=True, cache=True)
+def colors_to_rgb(color_indices, palette):
+    """
+    Looks up the RGB color of every particle in a palette.
+
+    Args:
+        color_indices (np.ndarray): Integer color index of every particle.
+        palette (np.ndarray): RGB palette of shape (K, 3), see `create_palette`.
+
+    Returns:
+        np.ndarray: float32 array of shape (N, 3). Indices outside the palette are drawn white.
+    """
+    num_particles = color_indices.shape[0]
+    colors = np.ones((num_particles, 3), dtype=np.float32)
+    for i in prange(num_particles):
+        c = color_indices[i]
+        if 0 <= c < palette.shape[0]:
+            for k in range(3):
+                colors[i, k] = palette[c, k]
+    return colors
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def splat_density(x, y, color_indices, palette, left, bottom, pixel_width, pixel_height, pixels_x, pixels_y):
+    """
+    Bins particles into an RGBA density image.
+
+    Particles are first sorted by image row with a counting sort, then
+    every row is accumulated by one thread, so no two threads write the same
+    pixel. A pixel's color is the mean palette color of its particles,
+    and its opacity grows logarithmically with the particle count relative
+    to the densest pixel.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        color_indices (np.ndarray): Integer color index of every particle.
+        palette (np.ndarray): RGB palette of shape (K, 3), see `create_palette`.
+        left (float): World x-coordinate of the left image edge.
+        bottom (float): World y-coordinate of the bottom image edge.
+        pixel_width (float): World width of a pixel.
+        pixel_height (float): World height of a pixel.
+        pixels_x (int): Image width in pixels.
+        pixels_y (int): Image height in pixels.
+
+    Returns:
+        np.ndarray: uint8 image of shape (pixels_y, pixels_x, 4); row 0 is the bottom row.
+    """
+    num_particles = x.shape[0]
+    pixel = np.empty(num_particles, dtype=np.int32)
+    row = np.empty(num_particles, dtype=np.int32)
+    for i in prange(num_particles):
+        px = int(math.floor((x[i] - left) / pixel_width))
+        py = int(math.floor((y[i] - bottom) / pixel_height))
+        if 0 <= px < pixels_x and 0 <= py < pixels_y:
+            pixel[i] = py * pixels_x + px
+            row[i] = py
+        else:
+            pixel[i] = -1
+            row[i] = -1
+
+    # Counting sort of the visible particles by image row
+    row_start, row_particles = bin_by_key(row, pixels_y)
+
+    # Per-pixel particle count and summed color
+    accum = np.zeros((pixels_y, pixels_x, 4), dtype=np.float32)
+    for r in prange(pixels_y):
+        for idx in range(row_start[r], row_start[r + 1]):
+            i = row_particles[idx]
+            px = pixel[i] - r * pixels_x
+            c = color_indices[i]
+            accum[r, px, 3] += 1.0
+            if 0 <= c < palette.shape[0]:
+                for k in range(3):
+                    accum[r, px, k] += palette[c, k]
+            else:
+                for k in range(3):
+                    accum[r, px, k] += 1.0
+
+    max_count = 1.0
+    for r in range(pixels_y):
+        for px in range(pixels_x):
+            max_count = max(max_count, accum[r, px, 3])
+    log_max = math.log1p(max_count)
+
+    image = np.zeros((pixels_y, pixels_x, 4), dtype=np.uint8)
+    for r in prange(pixels_y):
+        for px in range(pixels_x):
+            count = accum[r, px, 3]
+            if count > 0:
+                for k in range(3):
+                    image[r, px, k] = np.uint8(min(255.0, 255.0 * accum[r, px, k] / count))
+                image[r, px, 3] = np.uint8(min(255.0, 64.0 + 191.0 * math.log1p(count) / log_max))
+    return image
+
+
+# Serial builds of the drawing kernels, used in threaded mode when no
+# thread-safe threading layer is available (see `Simulation.start`). They are
+# not cached: the cache index cannot tell them apart from the parallel builds.
+# The serial density splat also calls a serial build of `bin_by_key`.
+process_positions_and_colors_serial = njit(process_positions_and_colors.py_func)
+colors_to_rgb_serial = njit(colors_to_rgb.py_func)
+splat_density_serial = njit(nogil=True)(
+    FunctionType(
+        splat_density.py_func.__code__,
+        dict(splat_density.py_func.__globals__, bin_by_key=njit(nogil=True)(bin_by_key.py_func)),
+    )
+)
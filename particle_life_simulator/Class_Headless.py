@@ -0,0 +1,118 @@
+import time
+
+from particle_life_simulator.Class_Particle import CreateParticle, warmup
+
+class HeadlessSimulation:
+    """
+    Steps a particle system as fast as the CPU allows, without any rendering.
+
+    Unlike `Simulation`, which is a VisPy timer locked to 1/60 s and redraws the
+    GUI every frame, this runner only calls `update_positions` in a tight loop.
+    It imports neither VisPy nor Tk, so it can be used on render-less compute
+    boxes and to drive batch jobs.
+
+    Attributes:
+        particle_creator: Any object exposing `update_positions()` and
+            `num_particles` (usually a `CreateParticle` instance).
+        recorder: Optional object whose `step()` is called after every step
+            (usually a `TrajectoryRecorder`).
+        hooks (list): All objects whose `step()` is called after every step, in
+            order: `recorder` first, if given, then the `hooks` passed in (e.g. a
+            `TrajectoryRecorder`, a `StreamServer` and a `FrameExporter` together).
+        total_steps (int): Number of steps performed over all `run` calls.
+        warmup_time (float): Wall time of the last `warmup` call in seconds.
+    """
+
+    def __init__(self, particle_creator, recorder=None, hooks=()):
+        self.particle_creator = particle_creator
+        self.recorder = recorder
+        self.hooks = ([recorder] if recorder is not None else []) + list(hooks)
+        self.total_steps = 0
+        self.warmup_time = 0.0
+
+    def warmup(self) -> float:
+        """
+        Compiles the code paths of the particle system without stepping it.
+
+        A `CreateParticle` is warmed up through a throwaway copy (see
+        `Class_Particle.warmup`); other particle systems are warmed up by
+        their own `warmup` method, if they have one. The time is not
+        counted by `run`, so benchmark numbers exclude JIT compilation.
+
+        Returns:
+            float: The wall time of the warmup in seconds.
+        """
+        start_time = time.perf_counter()
+        if isinstance(self.particle_creator, CreateParticle):
+            warmup(self.particle_creator)
+        elif callable(getattr(self.particle_creator, "warmup", None)):
+            self.particle_creator.warmup()
+        self.warmup_time = time.perf_counter() - start_time
+        return self.warmup_time
+
+    def run(self, steps: int = None, duration: float = None) -> dict:
+        """
+        Steps the simulation for a fixed number of steps or a fixed wall time.
+
+        If both limits are given, the run stops at whichever is reached first.
+
+        Args:
+            steps (int, optional): Number of steps to perform.
+            duration (float, optional): Wall-clock time budget in seconds.
+
+        Returns:
+            dict: Run statistics with the keys `steps`, `elapsed`,
+                `steps_per_second` and `particle_updates_per_second`.
+
+        Raises:
+            ValueError: If neither `steps` nor `duration` is given, or a limit is negative.
+        """
+        if steps is None and duration is None:
+            raise ValueError("Either steps or duration must be given.")
+        if (steps is not None and steps < 0) or (duration is not None and duration < 0):
+            raise ValueError("Step count and duration must not be negative.")
+
+        hooks = self.hooks
+        if not hooks:
+            update_positions = self.particle_creator.update_positions
+        else:
+            def update_positions():
+                self.particle_creator.update_positions()
+                for hook in hooks:
+                    hook.step()
+
+        done = 0
+        start_time = time.perf_counter()
+
+        if duration is None:
+            for _ in range(steps):
+                update_positions()
+            done = steps
+        else:
+            deadline = start_time + duration
+            while (steps is None or done < steps) and time.perf_counter() < deadline:
+                update_positions()
+                done += 1
+
+        elapsed = time.perf_counter() - start_time
+        self.total_steps += done
+        return self.make_report(done, elapsed)
+
+    def make_report(self, steps: int, elapsed: float) -> dict:
+        """
+        Builds the throughput statistics for a finished run.
+
+        Args:
+            steps (int): Number of steps performed.
+            elapsed (float): Wall time of the run in seconds.
+
+        Returns:
+            dict: Run statistics (see `run`).
+        """
+        steps_per_second = steps / elapsed if elapsed > 0 else 0.0
+        return {
+            "steps": steps,
+            "elapsed": elapsed,
+            "steps_per_second": steps_per_second,
+            "particle_updates_per_second": steps_per_second * self.particle_creator.num_particles,
+        }
@@ -1,8 +1,200 @@
 import math
+import time
 import numpy as np
 from numba.experimental import jitclass
-from numba import int32, float32
-from numba import njit, prange
+from numba import boolean, int16, int32, int64, float32, float64, types
+from numba import get_num_threads, get_thread_id, njit, objmode, prange
+
+from particle_life_simulator.Class_Timing import STAGE_HISTORY
+
+# Number of partial influence maps that are reduced into the final map. It
+# is fixed (rather than tied to the thread count) so that the summation
+# order, and with it the result, does not depend on NUMBA_NUM_THREADS.
+INFLUENCE_PARTS = 8
+
+# Upper bound on the chunks that parallel counting sorts and reductions are
+# split into. A constant is used instead of `get_num_threads()`, whose ctypes
+# call would keep Numba from caching the kernels; the results do not depend on
+# the chunk count.
+MAX_CHUNKS = 16
+
+# Number of chunks the per-particle loops are split into. The chunk bounds
+# are chosen so that every chunk has about the same estimated cost (see
+# `balanced_chunks`); several chunks per thread keep all threads busy.
+LOAD_CHUNKS = 256
+
+# Number of Verlet list lifetimes kept for `get_list_lifetimes`.
+VERLET_HISTORY = 1024
+
+# Initial layouts of `generate_seeded`.
+LAYOUTS = ("uniform", "clusters")
+
+# Independent random numbers drawn per particle by the seeded initialisers:
+# x, y, vx, vy, color and two for the Gaussian cluster offset.
+RANDOM_STREAMS = 8
+
+# Neighbor slots per particle in the classic (N, MAX_NEIGHBORS) neighbor lists.
+MAX_NEIGHBORS = 20
+
+# Phases of `update_positions` timed when `timing` is set, see `get_stage_times`.
+STAGES = ("neighbors", "influence", "integrate", "reorder")
+
+workspace_spec = [
+    ("allocations", int64),
+    ("particle_cells", int32[::1]),
+    ("cell_particles", int32[::1]),
+    ("cell_start", int32[::1]),
+    ("chunk_counts", int32[:, ::1]),
+    ("neighbor_lists", int32[:, ::1]),
+    ("influence", float32[:, ::1]),
+    ("partial_maps", float32[:, :, :, ::1]),
+    ("influence_map", float32[:, :, ::1]),
+    ("terms", float32[:, ::1]),
+    ("cost_prefix", int64[::1]),
+    ("chunk_bounds", int64[::1]),
+    ("uniform_bounds", int64[::1]),
+    ("chunk_threads", int64[::1]),
+    ("thread_loads", float64[::1]),
+]
+
+@jitclass(workspace_spec)
+class Workspace:
+    """
+    Scratch buffers of the update kernels, reused from step to step.
+
+    Every getter returns its buffers with the shape required for the given
+    particle count and domain. A buffer is only replaced when that shape
+    changes, so once a simulation runs with a fixed particle count and
+    domain size, stepping allocates no memory. The contents of the buffers
+    are not meaningful between calls.
+
+    Attributes:
+        allocations (int64): Number of buffers allocated so far.
+        particle_cells (int32[:]): Cell of every particle, see `build_cell_list`.
+        cell_particles (int32[:]): Particle indices sorted by cell.
+        cell_start (int32[:]): Offsets of the cells in `cell_particles`.
+        chunk_counts (int32[:, :]): Per-chunk cell counts of shape (cells, MAX_CHUNKS).
+        neighbor_lists (int32[:, :]): Neighbor lists of shape (N, MAX_NEIGHBORS).
+        influence (float32[:, :]): Per-particle influence of shape (2, N).
+        partial_maps (float32[:, :, :, :]): Partial influence maps of shape
+            (INFLUENCE_PARTS, grid_x, grid_y, 2).
+        influence_map (float32[:, :, :]): Influence map of shape (grid_x, grid_y, 2).
+        terms (float32[:, :]): Pair terms of the fused engines, shape (6, N).
+        cost_prefix (int64[:]): Prefix sum of the per-particle costs, shape (N + 1,).
+        chunk_bounds (int64[:]): Chunk bounds of the per-particle loops, shape (LOAD_CHUNKS + 1,).
+        uniform_bounds (int64[:]): Chunk bounds of equal length, shape (LOAD_CHUNKS + 1,).
+        chunk_threads (int64[:]): Thread that processed every chunk, shape (LOAD_CHUNKS,).
+        thread_loads (float64[:]): Load of every thread.
+    """
+
+    def __init__(self):
+        """
+        Creates an empty workspace; the buffers are sized on first use.
+        """
+        self.allocations = 0
+        self.particle_cells = np.zeros(0, dtype=np.int32)
+        self.cell_particles = np.zeros(0, dtype=np.int32)
+        self.cell_start = np.zeros(0, dtype=np.int32)
+        self.chunk_counts = np.zeros((0, MAX_CHUNKS), dtype=np.int32)
+        self.neighbor_lists = np.zeros((0, MAX_NEIGHBORS), dtype=np.int32)
+        self.influence = np.zeros((2, 0), dtype=np.float32)
+        self.partial_maps = np.zeros((INFLUENCE_PARTS, 0, 0, 2), dtype=np.float32)
+        self.influence_map = np.zeros((0, 0, 2), dtype=np.float32)
+        self.terms = np.zeros((6, 0), dtype=np.float32)
+        self.cost_prefix = np.zeros(0, dtype=np.int64)
+        self.chunk_bounds = np.zeros(LOAD_CHUNKS + 1, dtype=np.int64)
+        self.uniform_bounds = np.zeros(LOAD_CHUNKS + 1, dtype=np.int64)
+        self.chunk_threads = np.zeros(LOAD_CHUNKS, dtype=np.int64)
+        self.thread_loads = np.zeros(0, dtype=np.float64)
+
+    def cell_buffers(self, num_particles, x_max, y_max, cell_size):
+        """
+        Returns the cell list buffers for `build_cell_list`.
+
+        Args:
+            num_particles (int): Number of particles.
+            x_max (int): Maximum x-dimension (width).
+            y_max (int): Maximum y-dimension (height).
+            cell_size (float): Edge length of a grid cell.
+
+        Returns:
+            tuple: (particle_cells, cell_particles, cell_start, chunk_counts).
+        """
+        num_cells = (int(x_max / cell_size) + 1) * (int(y_max / cell_size) + 1)
+        if self.particle_cells.shape[0] != num_particles:
+            self.particle_cells = np.empty(num_particles, dtype=np.int32)
+            self.cell_particles = np.empty(num_particles, dtype=np.int32)
+            self.allocations += 2
+        if self.cell_start.shape[0] != num_cells + 1:
+            self.cell_start = np.empty(num_cells + 1, dtype=np.int32)
+            self.chunk_counts = np.empty((num_cells, MAX_CHUNKS), dtype=np.int32)
+            self.allocations += 2
+        return self.particle_cells, self.cell_particles, self.cell_start, self.chunk_counts
+
+    def neighbor_buffer(self, num_particles):
+        """
+        Returns the (N, MAX_NEIGHBORS) neighbor list buffer.
+        """
+        if self.neighbor_lists.shape[0] != num_particles:
+            self.neighbor_lists = np.empty((num_particles, MAX_NEIGHBORS), dtype=np.int32)
+            self.allocations += 1
+        return self.neighbor_lists
+
+    def influence_buffer(self, num_particles):
+        """
+        Returns the (2, N) per-particle influence buffer.
+        """
+        if self.influence.shape[1] != num_particles:
+            self.influence = np.empty((2, num_particles), dtype=np.float32)
+            self.allocations += 1
+        return self.influence
+
+    def map_buffers(self, x_max, y_max, influence_scale):
+        """
+        Returns the influence map buffers for `accumulate_influence_map`.
+
+        Args:
+            x_max (int): Maximum x-dimension (width).
+            y_max (int): Maximum y-dimension (height).
+            influence_scale (float): Cell size of the influence map.
+
+        Returns:
+            tuple: (partial_maps, influence_map).
+        """
+        grid_x = int(x_max / influence_scale) + 1
+        grid_y = int(y_max / influence_scale) + 1
+        if self.influence_map.shape[0] != grid_x or self.influence_map.shape[1] != grid_y:
+            self.partial_maps = np.empty((INFLUENCE_PARTS, grid_x, grid_y, 2), dtype=np.float32)
+            self.influence_map = np.empty((grid_x, grid_y, 2), dtype=np.float32)
+            self.allocations += 2
+        return self.partial_maps, self.influence_map
+
+    def terms_buffer(self, num_particles):
+        """
+        Returns the (6, N) pair term buffer of the fused engines.
+        """
+        if self.terms.shape[1] != num_particles:
+            self.terms = np.empty((6, num_particles), dtype=np.float32)
+            self.allocations += 1
+        return self.terms
+
+    def cost_buffer(self, num_particles):
+        """
+        Returns the (N + 1,) buffer for the prefix sum of the per-particle costs.
+        """
+        if self.cost_prefix.shape[0] != num_particles + 1:
+            self.cost_prefix = np.empty(num_particles + 1, dtype=np.int64)
+            self.allocations += 1
+        return self.cost_prefix
+
+    def loads_buffer(self, num_threads):
+        """
+        Returns the buffer for the load of every thread.
+        """
+        if self.thread_loads.shape[0] != num_threads:
+            self.thread_loads = np.empty(num_threads, dtype=np.float64)
+            self.allocations += 1
+        return self.thread_loads
 
 spec = [
     ("num_particles", int32),
@@ -16,9 +208,38 @@ spec = [
     ("num_colors", int32),
     ("interaction_strength", float32),
     ("color_interaction", float32[:, :]),
-    ("particles", float32[:, :]),
+    ("pair_influence", float32[:, :]),
+    ("state", float32[:, ::1]),
+    ("colors", int16[::1]),
+    ("fused", boolean),
+    ("double_buffered", boolean),
+    ("state_back", float32[:, ::1]),
+    ("particle_ids", int32[::1]),
+    ("reorder_interval", int32),
+    ("reorder_order", types.unicode_type),
+    ("step_count", int64),
+    ("layout_version", int32),
+    ("skin", float32),
+    ("verlet_start", int32[::1]),
+    ("verlet_index", int32[::1]),
+    ("verlet_ref", float32[:, ::1]),
+    ("verlet_valid", boolean),
+    ("verlet_age", int32),
+    ("verlet_builds", int64),
+    ("verlet_lifetimes", int32[::1]),
+    ("verlet_lifetime_count", int64),
+    ("timing", boolean),
+    ("stage_times", float64[:, ::1]),
+    ("stage_count", int64),
+    ("balance_load", boolean),
+    ("load_imbalance", float64),
+    ("index_imbalance", float64),
+    ("workspace", Workspace.class_type.instance_type),
 ]
 
+# Numba cannot cache jitclasses on disk, so the methods of CreateParticle are
+# compiled on every launch. The kernels they call are cached (`cache=True`);
+# `warmup` moves the remaining compilation out of timed code.
 @jitclass(spec)
 class CreateParticle:
     """
@@ -29,6 +250,10 @@ class CreateParticle:
     are partially determined by an interaction matrix that encodes how
     different colors influence each other.
 
+    Particles are stored as a structure of arrays: every quantity is a
+    contiguous array, so kernels that only touch positions only load
+    positions, and colors are integer indices instead of floats.
+
     Attributes:
         num_particles (int32): Total number of particles.
         x_max (int32): Maximum x-dimension (e.g., screen width).
@@ -41,12 +266,51 @@ class CreateParticle:
         num_colors (int32): Number of distinct colors in the system.
         interaction_strength (float32): Scaling factor for inter-particle color-based forces.
         color_interaction (float32[:, :]): A 2D matrix defining interaction coefficients between colors.
-        particles (float32[:, :]): Array of shape (num_particles, 5) storing particle data:
-            - [:, 0]: x-position
-            - [:, 1]: y-position
-            - [:, 2]: x-velocity
-            - [:, 3]: y-velocity
-            - [:, 4]: color index
+        pair_influence (float32[:, :]): Cached influence coefficient of every color pair
+            (`color_interaction @ color_interaction`), refreshed by `set_interaction_matrix`.
+        state (float32[:, :]): Array of shape (4, num_particles) whose rows are
+            contiguous per-particle arrays:
+            - [0]: x-position
+            - [1]: y-position
+            - [2]: x-velocity
+            - [3]: y-velocity
+        colors (int16[:]): Color index of every particle.
+        fused (boolean): If True, `update_positions` uses the single-pass `fused_step` engine.
+        double_buffered (boolean): If True, each step reads `state` and writes
+            `state_back`, then swaps the two, so no thread reads state that
+            another thread is writing in the same step.
+        state_back (float32[:, :]): Preallocated back buffer with the shape of `state`.
+        particle_ids (int32[:]): Stable ID of the particle stored in each slot. Reordering
+            permutes the slots, `particle_ids[k]` tells which particle now lives in slot `k`.
+        reorder_interval (int32): Spatially reorder the particles every this many steps
+            (0 disables reordering).
+        reorder_order (unicode): Sort key used for reordering, "morton" (Z-order curve)
+            or "cell" (row-major grid cell).
+        step_count (int64): Number of update steps performed.
+        layout_version (int32): Incremented whenever the particle slots are permuted, so
+            consumers that cache per-slot data (e.g. colors) know when to refresh it.
+        skin (float32): Extra distance added to the collision diameter when building the
+            Verlet neighbor list (0 disables the list and rebuilds neighbors every step).
+        verlet_start (int32[:]): Offsets of each particle's candidates in `verlet_index`.
+        verlet_index (int32[:]): Candidate neighbors of all particles (see `build_verlet_list`).
+        verlet_ref (float32[:, :]): Positions of shape (2, num_particles) at the last list build.
+        verlet_valid (boolean): False if the list must be rebuilt before its next use.
+        verlet_age (int32): Number of steps the current list has been used for.
+        verlet_builds (int64): Number of Verlet list builds.
+        verlet_lifetimes (int32[:]): Ring buffer with the age of the last `VERLET_HISTORY`
+            discarded lists.
+        verlet_lifetime_count (int64): Number of lifetimes recorded so far.
+        timing (boolean): If True, `update_positions` records the wall time of its stages.
+        stage_times (float64[:, :]): Ring buffer of shape (STAGE_HISTORY, len(STAGES)) with
+            the stage times of the last timed steps in seconds.
+        stage_count (int64): Number of timed steps recorded so far.
+        balance_load (boolean): If True, the per-particle loops are split into chunks of
+            equal estimated cost instead of equal length (see `balanced_chunks`).
+        load_imbalance (float64): Ratio of the busiest to the mean thread load in the
+            last step, from the threads that actually ran the chunks (see `get_load_imbalance`).
+        index_imbalance (float64): Estimate of the same ratio for chunks of equal length,
+            for comparison.
+        workspace (Workspace): Scratch buffers of the update kernels, reused across steps.
     """
 
     def __init__(
@@ -61,6 +325,12 @@ class CreateParticle:
         num_colors: int = 5,
         interaction_strength: float = 0.1,
         radius_factor: float = 0.75,
+        fused: bool = False,
+        double_buffered: bool = True,
+        reorder_interval: int = 0,
+        reorder_order: str = "morton",
+        skin: float = 0.0,
+        balance_load: bool = True,
     ):
         """
         Initializes the CreateParticle system and allocates memory for particles.
@@ -76,10 +346,23 @@ class CreateParticle:
             num_colors (int, optional): Number of distinct colors.
             interaction_strength (float, optional): Scaling factor for color-based forces.
             radius_factor (float, optional): Factor to scale the interaction radius.
+            fused (bool, optional): Use the single-pass fused update engine.
+            double_buffered (bool, optional): Integrate into a back buffer instead of in place.
+            reorder_interval (int, optional): Steps between spatial reorderings (0 disables them).
+            reorder_order (str, optional): "morton" or "cell" ordering for the reordering.
+            skin (float, optional): Verlet list skin distance (0 disables the list).
+            balance_load (bool, optional): Balance the parallel loops by estimated cost.
 
         Raises:
             ValueError: If scaled_radius becomes too small (less than 0.01).
+            ValueError: If `reorder_order` is neither "morton" nor "cell".
+            ValueError: If `skin` is negative.
         """
+        if reorder_order != "morton" and reorder_order != "cell":
+            raise ValueError("reorder_order must be 'morton' or 'cell'.")
+        if skin < 0:
+            raise ValueError("skin must not be negative.")
+
         self.num_particles = num_particles
         self.x_max = x_max
         self.y_max = y_max
@@ -99,12 +382,90 @@ class CreateParticle:
         self.interaction_strength = interaction_strength
 
         self.color_interaction = np.zeros((num_colors, num_colors), dtype=np.float32)
-        self.particles = np.zeros((self.num_particles, 5), dtype=np.float32)
+        self.pair_influence = np.zeros((num_colors, num_colors), dtype=np.float32)
+        self.state = np.zeros((4, self.num_particles), dtype=np.float32)
+        self.colors = np.zeros(self.num_particles, dtype=np.int16)
+        self.fused = fused
+        self.double_buffered = double_buffered
+        self.state_back = np.zeros_like(self.state)
+        self.particle_ids = np.arange(self.num_particles).astype(np.int32)
+        self.reorder_interval = reorder_interval
+        self.reorder_order = reorder_order
+        self.step_count = 0
+        self.layout_version = 0
+        self.skin = skin
+        self.verlet_start = np.zeros(self.num_particles + 1, dtype=np.int32)
+        self.verlet_index = np.zeros(0, dtype=np.int32)
+        self.verlet_ref = np.zeros((2, self.num_particles), dtype=np.float32)
+        self.verlet_valid = False
+        self.verlet_age = 0
+        self.verlet_builds = 0
+        self.verlet_lifetimes = np.zeros(VERLET_HISTORY, dtype=np.int32)
+        self.verlet_lifetime_count = 0
+        self.timing = False
+        self.stage_times = np.zeros((STAGE_HISTORY, len(STAGES)), dtype=np.float64)
+        self.stage_count = 0
+        self.balance_load = balance_load
+        self.load_imbalance = 1.0
+        self.index_imbalance = 1.0
+        self.workspace = Workspace()
+
+    @property
+    def particles(self) -> np.ndarray:
+        """
+        The particle data in the legacy array-of-structs layout.
+
+        Positions and velocities (float32) and colors (int16) are stored in
+        separate arrays, so no single array can view them in this layout.
+        The result is therefore a read-only copy: writing to it raises
+        `ValueError` instead of being silently lost. Assign a whole array to
+        `particles` to load modified data.
+
+        Returns:
+            np.ndarray: A new read-only float32 array of shape (num_particles, 5) storing particle data:
+                - [:, 0]: x-position
+                - [:, 1]: y-position
+                - [:, 2]: x-velocity
+                - [:, 3]: y-velocity
+                - [:, 4]: color index
+        """
+        state = self.state
+        colors = self.colors
+        with objmode(particles="float32[:, ::1]"):
+            particles = np.empty((colors.shape[0], 5), dtype=np.float32)
+            particles[:, :4] = state.T
+            particles[:, 4] = colors
+            particles.setflags(write=False)
+        return particles
+
+    @particles.setter
+    def particles(self, particles: np.ndarray):
+        """
+        Loads particle data given in the legacy (N, 5) layout.
+
+        Args:
+            particles (np.ndarray): Array of shape (N, 5) with columns x, y, vx, vy and color.
+        """
+        num_particles = particles.shape[0]
+        if num_particles != self.num_particles:
+            self.num_particles = num_particles
+            self.state = np.zeros((4, num_particles), dtype=np.float32)
+            self.state_back = np.zeros_like(self.state)
+            self.colors = np.zeros(num_particles, dtype=np.int16)
+        self.particle_ids = np.arange(num_particles).astype(np.int32)
+        self.layout_version += 1
+        self.invalidate_neighbor_list()
+        for i in range(num_particles):
+            for k in range(4):
+                self.state[k, i] = particles[i, k]
+            self.colors[i] = np.int16(particles[i, 4])
 
     def set_interaction_matrix(self, matrix: np.ndarray):
         """
         Sets a custom color interaction matrix.
 
+        Also recomputes the cached color-pair influence table.
+
         Args:
             matrix (np.ndarray): A 2D matrix of shape (num_colors, num_colors)
                 that specifies color interaction coefficients.
@@ -115,241 +476,957 @@ class CreateParticle:
         if matrix.shape != (self.num_colors, self.num_colors):
             raise ValueError("Matrix has incorrect dimensions.")
         self.color_interaction[:, :] = matrix
+        self.pair_influence = compute_pair_influence(self.color_interaction)
 
     def generate_particles(self) -> None:
         """
         Initializes each particle with random positions, velocities, and colors.
-        
+
         Notes:
             - Positions are randomly chosen in [0, x_max) for x and in [0, y_max) for y.
             - Velocities are sampled from the provided speed_range.
             - Colors are randomly assigned from 0 to num_colors-1.
+            - All particle data is new, so the layout is reset (see `reset_layout`).
         """
-        self.particles[:, 0] = np.random.randint(
+        self.state[0, :] = np.random.randint(
             0, self.x_max, self.num_particles
         ).astype(np.float32)
-        self.particles[:, 1] = np.random.randint(
+        self.state[1, :] = np.random.randint(
             0, self.y_max, self.num_particles
         ).astype(np.float32)
-        self.particles[:, 2] = np.random.uniform(
+        self.state[2, :] = np.random.uniform(
             self.speed_range[0], self.speed_range[1], self.num_particles
         ).astype(np.float32)
-        self.particles[:, 3] = np.random.uniform(
+        self.state[3, :] = np.random.uniform(
             self.speed_range[0], self.speed_range[1], self.num_particles
         ).astype(np.float32)
-        self.particles[:, 4] = np.random.randint(
+        self.colors[:] = np.random.randint(
             0, self.num_colors, self.num_particles
-        ).astype(np.float32)
+        ).astype(np.int16)
+        self.reset_layout()
+
+    def generate_seeded(self, seed, layout="uniform", cluster_spread=0.05):
+        """
+        Initializes the particles in parallel from a seed, independent of any global RNG state.
+
+        Every random number is a hash of the seed and a counter (particle
+        index and quantity), so particles are filled in place without
+        temporary arrays, and the same seed gives the same world for any
+        thread count. The neighbor list is discarded and the particle slots
+        are reset to ID order.
+
+        Layouts:
+            - "uniform": positions uniform over the domain, colors uniform.
+            - "clusters": every color forms a Gaussian cluster around its own
+              random center, with a standard deviation of `cluster_spread`
+              times the shorter domain side (wrapped around the borders).
+
+        Args:
+            seed (int): Seed of the world.
+            layout (str, optional): One of `LAYOUTS`.
+            cluster_spread (float, optional): Cluster size relative to the domain.
+
+        Raises:
+            ValueError: If `layout` is unknown or `cluster_spread` is negative.
+        """
+        spread = layout_spread(layout, cluster_spread, self.x_max, self.y_max)
+        seed_particles(
+            self.state, self.colors, seed, layout == "clusters", self.x_max, self.y_max,
+            self.speed_range[0], self.speed_range[1], self.num_colors, spread
+        )
+        self.reset_layout()
+
+    def load_layout(self, positions, colors, seed=0):
+        """
+        Initializes the particles from given positions and colors, with seeded random velocities.
+
+        Positions outside the domain are wrapped into it. The particle count
+        follows the arrays.
+
+        Args:
+            positions (np.ndarray): Positions of shape (2, N) (x row, y row).
+            colors (np.ndarray): Integer color index of every particle, shape (N,).
+            seed (int, optional): Seed of the velocities, see `generate_seeded`.
+
+        Raises:
+            ValueError: If the shapes do not match or a color is outside [0, num_colors).
+        """
+        check_layout_arrays(positions, colors, self.num_colors)
+        num_particles = colors.shape[0]
+        if num_particles != self.num_particles:
+            self.num_particles = num_particles
+            self.state = np.zeros((4, num_particles), dtype=np.float32)
+            self.state_back = np.zeros_like(self.state)
+            self.colors = np.zeros(num_particles, dtype=np.int16)
+        load_particles(
+            self.state, self.colors, positions, colors, seed, self.x_max, self.y_max,
+            self.speed_range[0], self.speed_range[1]
+        )
+        self.reset_layout()
+
+    def reset_layout(self):
+        """
+        Marks all particle data as new: slots in ID order, neighbor list discarded, colors re-uploaded.
+        """
+        self.particle_ids = np.arange(self.num_particles).astype(np.int32)
+        self.layout_version += 1
+        self.invalidate_neighbor_list()
 
     def update_positions(self):
         """
         Performs a single update step on all particles:
-        
+
         1) Constructs neighbor lists using a grid-based approach.
         2) Computes an influence map over the domain (based on local interactions).
         3) Applies the influence to modify particle velocities.
         4) Updates final positions with collision handling and wrap-around at borders.
+
+        If `fused` is set, all four steps are done by the two halves of
+        `fused_step` (`fused_pair_terms` and `fused_integrate`), which
+        evaluate every particle pair only once per step.
+
+        If `double_buffered` is set, the new state is written to the back
+        buffer, which then becomes the front buffer. The result is then
+        independent of thread scheduling and no memory is allocated for it.
+
+        If `skin` is set, neighbors are taken from a Verlet list that is
+        reused across steps (see `update_neighbor_list`).
+
+        If `reorder_interval` is set, the particles are spatially reordered
+        after every `reorder_interval`-th step (see `reorder_particles`).
+
+        If `timing` is set, the wall time of each of the `STAGES` is recorded
+        (see `get_stage_times`). The fused engines do neighbor search,
+        influence and integration in one pass, which is booked as "integrate".
+
+        If `balance_load` is set, the per-particle loops are split into
+        chunks of equal estimated cost, so clustered states do not leave
+        most threads idle while one works through the dense region. The
+        thread imbalance of every step is recorded (see `get_load_imbalance`).
+
+        All scratch arrays of the kernels come from `workspace`, so apart
+        from Verlet list rebuilds and reorderings a step allocates no memory
+        as long as the particle count and the domain size stay the same.
         """
-        neighbor_lists = compute_neighbors_grid(
-            self.particles, self.x_max, self.y_max, self.radius
-        )
-        influence_map = compute_influence_map(
-            self.particles,
-            self.color_interaction,
-            neighbor_lists,
-            self.radius,
-            self.x_max,
-            self.y_max,
-            grid_size=100
-        )
-        apply_influence(
-            self.particles,
-            influence_map,
-            self.radius,
-            self.max_speed
+        timing = self.timing
+        workspace = self.workspace
+        num_particles = self.num_particles
+        cell_size = max(2.0 * self.radius, 1.0)
+        row = self.stage_count % STAGE_HISTORY
+        mark = 0.0
+        if timing:
+            self.stage_times[row, :] = 0.0
+            mark = stage_clock()
+
+        if self.double_buffered:
+            if self.state_back.shape != self.state.shape:
+                self.state_back = np.zeros_like(self.state)
+            out = self.state_back
+        else:
+            out = self.state
+
+        if self.skin > 0:
+            self.update_neighbor_list()
+            if timing:
+                mark = self.mark_stage(row, 0, mark)
+
+        if self.fused and self.skin > 0:
+            chunk_bounds = self.chunk_bounds(
+                verlet_costs(self.verlet_start, workspace.cost_buffer(num_particles))
+            )
+            fused_step_verlet(
+                self.state,
+                self.colors,
+                self.verlet_start,
+                self.verlet_index,
+                self.x_max,
+                self.y_max,
+                self.radius,
+                self.radius_sq,
+                self.color_interaction,
+                self.pair_influence,
+                self.interaction_strength,
+                self.max_speed,
+                self.min_speed,
+                out,
+                chunk_bounds,
+                workspace.terms_buffer(num_particles),
+                workspace.map_buffers(self.x_max, self.y_max, self.radius),
+                workspace.chunk_threads
+            )
+            self.measure_load(workspace.cost_prefix, chunk_bounds)
+            if timing:
+                mark = self.mark_stage(row, 2, mark)
+        elif self.fused:
+            terms = fused_pair_terms(
+                self.state[0],
+                self.state[1],
+                self.colors,
+                self.x_max,
+                self.y_max,
+                self.radius,
+                self.radius_sq,
+                self.color_interaction,
+                self.pair_influence,
+                self.interaction_strength,
+                self.balance_load,
+                workspace.cell_buffers(num_particles, self.x_max, self.y_max, cell_size),
+                workspace.cost_buffer(num_particles),
+                workspace.chunk_bounds,
+                workspace.terms_buffer(num_particles),
+                workspace.chunk_threads
+            )
+            self.measure_load(exclusive_prefix(workspace.cost_prefix[:num_particles], workspace.cost_prefix),
+                              workspace.chunk_bounds)
+            fused_integrate(
+                self.state,
+                terms,
+                self.x_max,
+                self.y_max,
+                self.radius,
+                self.max_speed,
+                self.min_speed,
+                out,
+                workspace.map_buffers(self.x_max, self.y_max, self.radius)
+            )
+            if timing:
+                mark = self.mark_stage(row, 2, mark)
+        else:
+            x = self.state[0]
+            y = self.state[1]
+            if self.skin > 0:
+                neighbor_lists = neighbors_from_verlet(
+                    x, y, self.x_max, self.y_max, self.verlet_start, self.verlet_index, self.radius,
+                    workspace.neighbor_buffer(num_particles)
+                )
+            else:
+                neighbor_lists = compute_neighbors_grid(
+                    x, y, self.x_max, self.y_max, self.radius,
+                    workspace.neighbor_buffer(num_particles),
+                    workspace.cell_buffers(num_particles, self.x_max, self.y_max, cell_size)
+                )
+            chunk_bounds = self.chunk_bounds(
+                neighbor_costs(neighbor_lists, workspace.cost_buffer(num_particles))
+            )
+            if timing:
+                mark = self.mark_stage(row, 0, mark)
+            influence_map = compute_influence_map(
+                x,
+                y,
+                self.colors,
+                self.pair_influence,
+                neighbor_lists,
+                self.radius,
+                self.x_max,
+                self.y_max,
+                chunk_bounds,
+                workspace.influence_buffer(num_particles),
+                workspace.map_buffers(self.x_max, self.y_max, self.radius)
+            )
+            apply_influence(
+                x,
+                y,
+                self.state[2],
+                self.state[3],
+                influence_map,
+                self.radius,
+                self.max_speed
+            )
+            if timing:
+                mark = self.mark_stage(row, 1, mark)
+            update_positions_numba(
+                self.state,
+                self.colors,
+                self.num_particles,
+                self.x_max,
+                self.y_max,
+                self.radius,
+                self.radius_sq,
+                self.color_interaction,
+                self.interaction_strength,
+                self.max_speed,
+                self.min_speed,
+                neighbor_lists,
+                out,
+                chunk_bounds,
+                workspace.chunk_threads
+            )
+            self.measure_load(workspace.cost_prefix, chunk_bounds)
+            if timing:
+                mark = self.mark_stage(row, 2, mark)
+        self.swap_buffers()
+
+        self.step_count += 1
+        if self.reorder_interval > 0 and self.step_count % self.reorder_interval == 0:
+            self.reorder_particles()
+        if timing:
+            self.mark_stage(row, 3, mark)
+            self.stage_count += 1
+
+    def chunk_bounds(self, cost_prefix):
+        """
+        Chooses the chunks of the per-particle loops.
+
+        Args:
+            cost_prefix (np.ndarray): Exclusive prefix sum of the per-particle costs.
+
+        Returns:
+            np.ndarray: Chunk bounds, balanced by cost if `balance_load` is set.
+        """
+        workspace = self.workspace
+        if not self.balance_load:
+            return uniform_chunks(self.num_particles, LOAD_CHUNKS, workspace.uniform_bounds)
+        return balanced_chunks(cost_prefix, LOAD_CHUNKS, workspace.chunk_bounds)
+
+    def measure_load(self, cost_prefix, chunk_bounds):
+        """
+        Records the thread imbalance of the pair loop that just ran.
+
+        Args:
+            cost_prefix (np.ndarray): Exclusive prefix sum of the per-particle costs.
+            chunk_bounds (np.ndarray): Chunk bounds the loop ran with; the thread of
+                every chunk is read from the workspace.
+        """
+        num_threads = get_num_threads()
+        workspace = self.workspace
+        loads = workspace.loads_buffer(num_threads)
+        self.load_imbalance = load_imbalance(
+            thread_loads(cost_prefix, chunk_bounds, num_threads, workspace.chunk_threads, loads)
         )
-        self.particles = update_positions_numba(
-            self.particles,
-            self.num_particles,
-            self.x_max,
-            self.y_max,
-            self.radius,
-            self.radius_sq,
-            self.color_interaction,
-            self.interaction_strength,
-            self.max_speed,
-            self.min_speed,
-            neighbor_lists
+        uniform = uniform_chunks(self.num_particles, LOAD_CHUNKS, workspace.uniform_bounds)
+        self.index_imbalance = load_imbalance(thread_loads(cost_prefix, uniform, num_threads, None, loads))
+
+    def get_load_imbalance(self):
+        """
+        Returns the thread imbalance of the last step.
+
+        The load of a thread is the number of neighbor candidates it
+        examined in the pair loop: every kernel records which thread ran
+        each chunk, so the first value reflects the actual scheduling, but
+        it counts work rather than wall time. The second value is only an
+        estimate: it assumes chunks of equal length, handed to the threads
+        in contiguous blocks of equal count. All engines update both values.
+
+        Returns:
+            tuple: (measured imbalance, estimated imbalance with chunks of equal length),
+                each the ratio of the busiest to the mean thread load (1.0 is perfect balance).
+        """
+        return self.load_imbalance, self.index_imbalance
+
+    def mark_stage(self, row, stage, since):
+        """
+        Books the time since `since` on a stage of the current timed step.
+
+        Args:
+            row (int): Row of the current step in `stage_times`.
+            stage (int): Index of the stage in `STAGES`.
+            since (float): Clock value at the end of the previous stage.
+
+        Returns:
+            float: The current clock value.
+        """
+        now = stage_clock()
+        self.stage_times[row, stage] += now - since
+        return now
+
+    def set_timing(self, enabled):
+        """
+        Turns the stage timers of `update_positions` on or off.
+
+        Args:
+            enabled (bool): Whether to record stage times.
+        """
+        self.timing = enabled
+
+    def get_stage_times(self) -> np.ndarray:
+        """
+        Returns the recorded stage times of the last timed steps.
+
+        Returns:
+            np.ndarray: float64 array of shape (steps, len(STAGES)) with the wall time
+                of every stage in seconds, for the last (up to `STAGE_HISTORY`) timed
+                steps, oldest first.
+        """
+        count = min(self.stage_count, STAGE_HISTORY)
+        times = np.empty((count, len(STAGES)), dtype=np.float64)
+        first = self.stage_count - count
+        for k in range(count):
+            times[k] = self.stage_times[(first + k) % STAGE_HISTORY]
+        return times
+
+    def reorder_particles(self):
+        """
+        Permutes all particle data so that spatial neighbors get nearby indices.
+
+        Particles are stably sorted by the Morton (Z-order) code or the
+        row-major index of their interaction grid cell, depending on
+        `reorder_order`. Afterwards neighbor gathers in the kernels mostly hit
+        memory that is already cached. `particle_ids` is permuted along with
+        the data and `layout_version` is incremented.
+        """
+        cell_size = max(2.0 * self.radius, 1.0)
+        x = self.state[0]
+        y = self.state[1]
+        if self.reorder_order == "cell":
+            _, order, _, _ = build_cell_list(x, y, self.x_max, self.y_max, cell_size)
+        else:
+            order = np.argsort(
+                morton_keys(x, y, self.x_max, self.y_max, cell_size), kind="mergesort"
+            ).astype(np.int32)
+
+        if self.state_back.shape != self.state.shape:
+            self.state_back = np.zeros_like(self.state)
+        colors = np.empty_like(self.colors)
+        particle_ids = np.empty_like(self.particle_ids)
+        permute_particles(
+            order, self.state, self.colors, self.particle_ids, self.state_back, colors, particle_ids
         )
 
+        front = self.state
+        self.state = self.state_back
+        self.state_back = front
+        self.colors = colors
+        self.particle_ids = particle_ids
+        self.layout_version += 1
+        self.invalidate_neighbor_list()
+
+    def update_neighbor_list(self):
+        """
+        Makes sure the Verlet neighbor list is valid for the current positions.
+
+        The list holds every pair closer than the collision diameter plus
+        `skin`. As long as no particle has moved more than half the skin
+        since the list was built, no pair can have come within the diameter
+        without being listed, so the list is reused. Otherwise it is rebuilt.
+        Displacements are measured without wrap-around, so a particle crossing
+        a periodic border always triggers a rebuild.
+        """
+        x = self.state[0]
+        y = self.state[1]
+        if self.verlet_valid and self.verlet_ref.shape[1] == self.num_particles:
+            half_skin = 0.5 * self.skin
+            if max_displacement_sq(x, y, self.verlet_ref[0], self.verlet_ref[1]) > half_skin * half_skin:
+                self.invalidate_neighbor_list()
+        else:
+            self.verlet_valid = False
+
+        if not self.verlet_valid:
+            cutoff = math.sqrt(self.radius_sq) + self.skin
+            self.verlet_start, self.verlet_index = build_verlet_list(
+                x, y, self.x_max, self.y_max, cutoff
+            )
+            if self.verlet_ref.shape[1] != self.num_particles:
+                self.verlet_ref = np.zeros((2, self.num_particles), dtype=np.float32)
+            self.verlet_ref[0, :] = x
+            self.verlet_ref[1, :] = y
+            self.verlet_valid = True
+            self.verlet_age = 0
+            self.verlet_builds += 1
+        self.verlet_age += 1
+
+    def invalidate_neighbor_list(self):
+        """
+        Discards the Verlet neighbor list and records how many steps it was used for.
+        """
+        if self.verlet_valid:
+            slot = self.verlet_lifetime_count % VERLET_HISTORY
+            self.verlet_lifetimes[slot] = self.verlet_age
+            self.verlet_lifetime_count += 1
+        self.verlet_valid = False
+
+    def get_list_lifetimes(self) -> np.ndarray:
+        """
+        Returns how many steps each discarded Verlet list was used for.
+
+        Useful for tuning `skin`: short lifetimes mean frequent rebuilds, long
+        lifetimes with a large skin mean many wasted candidate pairs.
+
+        Returns:
+            np.ndarray: int32 lifetimes of the last (up to `VERLET_HISTORY`) lists, oldest first.
+        """
+        count = min(self.verlet_lifetime_count, VERLET_HISTORY)
+        lifetimes = np.empty(count, dtype=np.int32)
+        first = self.verlet_lifetime_count - count
+        for k in range(count):
+            lifetimes[k] = self.verlet_lifetimes[(first + k) % VERLET_HISTORY]
+        return lifetimes
+
+    def swap_buffers(self):
+        """
+        Makes the back buffer written by the last step the front buffer.
+
+        Does nothing if double buffering is disabled.
+        """
+        if self.double_buffered:
+            front = self.state
+            self.state = self.state_back
+            self.state_back = front
+
     def get_positions_and_colors(self) -> np.ndarray:
         """
-        Returns a view of each particle's (x, y) position and color.
+        Returns each particle's (x, y) position and color.
 
         Returns:
             np.ndarray: An array of shape (num_particles, 3) where each row is (x, y, color).
         """
         return np.column_stack((
-            self.particles[:, 0],
-            self.particles[:, 1],
-            self.particles[:, 4]
+            self.state[0],
+            self.state[1],
+            self.colors.astype(np.float32)
         ))
 
 
-@njit(parallel=True)
-def compute_neighbors_grid(particles, x_max, y_max, radius):
+@njit(fastmath=True, nogil=True, cache=True)
+def cell_of(x, y, cell_size, grid_x, grid_y, col_lo=0):
     """
-    Generates neighbor lists for each particle based on a grid partition.
+    Returns the grid cell coordinates of a position, clamped to the grid.
+
+    Args:
+        x (float): x-position.
+        y (float): y-position.
+        cell_size (float): Edge length of a grid cell.
+        grid_x (int): Number of cells along x.
+        grid_y (int): Number of cells along y.
+        col_lo (int, optional): Domain column of the first grid column, for grids
+            that only cover part of the domain.
+
+    Returns:
+        Tuple[int, int]: (cx, cy), the cell coordinates.
+    """
+    cx = max(0, min(int(x / cell_size) - col_lo, grid_x - 1))
+    cy = max(0, min(int(y / cell_size), grid_y - 1))
+    return cx, cy
+
+@njit(parallel=True, nogil=True, cache=True)
+def bin_by_key(keys, num_bins, buffers=None):
+    """
+    Sorts item indices by an integer key with a parallel counting sort.
 
-    Cells are sized by 2*radius. Each particle is placed in a cell
-    depending on its (x, y) coordinates. Only nearby cells (in a 3x3 region
-    around each particle's cell) are searched to find potential neighbors.
+    The result is compressed (CSR): the items of bin `b` are
+    `bin_items[bin_start[b]:bin_start[b + 1]]`. Items with a negative key
+    belong to no bin and are left out. The sort is stable, so the items of a
+    bin always appear in ascending index order regardless of thread count.
+
+    The sort runs in three phases: per-chunk bin counts, an exclusive
+    prefix sum over (bin, chunk), and a scatter in which every chunk writes
+    its items to its own precomputed offsets. The number of chunks is
+    bounded so that the per-chunk counts never exceed O(N + bins) memory.
+
+    Args:
+        keys (np.ndarray): Integer bin of every item, of shape (N,); negative keys are skipped.
+        num_bins (int): Number of bins.
+        buffers (tuple, optional): Preallocated (bin_items, bin_start, chunk_counts)
+            int32 arrays of shapes (N,), (num_bins + 1,) and (num_bins, MAX_CHUNKS).
+            If omitted, new arrays are allocated.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (bin_start, bin_items), where `bin_start` has
+            length `num_bins + 1` and the first `bin_start[num_bins]` entries of
+            `bin_items` hold the binned item indices.
+    """
+    num_items = keys.shape[0]
+    num_chunks = min(MAX_CHUNKS, max(1, num_items // max(1, num_bins)), max(1, num_items))
+    chunk_len = (num_items + num_chunks - 1) // num_chunks
+
+    if buffers is None:
+        bin_items = np.empty(num_items, dtype=np.int32)
+        bin_start = np.empty(num_bins + 1, dtype=np.int32)
+        chunk_counts = np.zeros((num_bins, num_chunks), dtype=np.int32)
+    else:
+        # chunk_counts has MAX_CHUNKS columns, of which num_chunks are used
+        bin_items, bin_start, chunk_counts = buffers
+        for b in prange(num_bins):
+            for k in range(num_chunks):
+                chunk_counts[b, k] = 0
+
+    # Phase 1: every chunk counts its own items per bin
+    for k in prange(num_chunks):
+        for i in range(k * chunk_len, min((k + 1) * chunk_len, num_items)):
+            if keys[i] >= 0:
+                chunk_counts[keys[i], k] += 1
+
+    # Phase 2: exclusive prefix sum in (bin, chunk) order
+    total = 0
+    for b in range(num_bins):
+        bin_start[b] = total
+        for k in range(num_chunks):
+            count = chunk_counts[b, k]
+            chunk_counts[b, k] = total
+            total += count
+    bin_start[num_bins] = total
+
+    # Phase 3: stable scatter, every chunk owns disjoint output slots
+    for k in prange(num_chunks):
+        for i in range(k * chunk_len, min((k + 1) * chunk_len, num_items)):
+            b = keys[i]
+            if b >= 0:
+                bin_items[chunk_counts[b, k]] = i
+                chunk_counts[b, k] += 1
+
+    return bin_start, bin_items
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def build_cell_list(x, y, x_max, y_max, cell_size, cell_buffers=None, col_lo=0, col_hi=0):
+    """
+    Sorts particles into grid cells with a parallel counting sort.
+
+    The result is a compressed (CSR) cell list: the particles of cell `c`
+    are `cell_particles[cell_start[c]:cell_start[c + 1]]`, where cells are
+    numbered row-major as `c = cx * grid_y + cy`. Cells have no capacity
+    limit, memory is O(N + cells) and the sort is stable, so particles of a
+    cell always appear in ascending index order regardless of thread count,
+    see `bin_by_key`.
 
     Args:
-        particles (np.ndarray): Particle array of shape (N, 5).
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
         x_max (int): Maximum x-dimension (width).
         y_max (int): Maximum y-dimension (height).
-        radius (float): The neighborhood radius.
+        cell_size (float): Edge length of a grid cell.
+        cell_buffers (tuple, optional): Preallocated (particle_cells, cell_particles,
+            cell_start, chunk_counts) arrays, see `Workspace.cell_buffers`. If
+            omitted, new arrays are allocated.
+        col_lo (int, optional): First domain column covered by the grid.
+        col_hi (int, optional): One past the last covered column; 0 covers the domain
+            up to `x_max`. Particles outside are clamped into the edge columns.
 
     Returns:
-        np.ndarray: A 2D array (N, max_neighbors) that stores the indices of each particle's neighbors.
-                    Unused neighbor slots are filled with -1.
+        Tuple[np.ndarray, np.ndarray, int, int]: (cell_start, cell_particles, grid_x, grid_y),
+            where `cell_start` has length `grid_x * grid_y + 1` and
+            `cell_particles` holds all N particle indices sorted by cell.
     """
-    num_particles = particles.shape[0]
+    num_particles = x.shape[0]
+    grid_x = (col_hi if col_hi > 0 else int(x_max / cell_size) + 1) - col_lo
+    grid_y = int(y_max / cell_size) + 1
+    num_cells = grid_x * grid_y
+
+    if cell_buffers is None:
+        particle_cells = np.empty(num_particles, dtype=np.int32)
+    else:
+        particle_cells = cell_buffers[0]
+
+    for i in prange(num_particles):
+        cx, cy = cell_of(x[i], y[i], cell_size, grid_x, grid_y, col_lo)
+        particle_cells[i] = cx * grid_y + cy
 
-    MAX_NEIGHBORS = 20
-    MAX_PARTICLES_PER_CELL = 20
+    if cell_buffers is None:
+        cell_start, cell_particles = bin_by_key(particle_cells, num_cells)
+    else:
+        cell_start, cell_particles = bin_by_key(particle_cells, num_cells, cell_buffers[1:])
 
-    neighbor_lists = np.full((num_particles, MAX_NEIGHBORS), -1, dtype=np.int32)
+    return cell_start, cell_particles, grid_x, grid_y
 
-    cell_size = int(2.0 * radius)
-    if cell_size < 1:
-        cell_size = 1
-    
-    grid_x = x_max // cell_size + 1
-    grid_y = y_max // cell_size + 1
+@njit(fastmath=True, nogil=True, cache=True)
+def spread_bits(v):
+    """
+    Spreads the lower 16 bits of an integer so that a zero bit follows each of them.
 
-    grid = np.full((grid_x, grid_y, MAX_PARTICLES_PER_CELL), -1, dtype=np.int32)
-    grid_counts = np.zeros((grid_x, grid_y), dtype=np.int32)
+    Args:
+        v (int): Integer in [0, 65535].
 
-    # Place particles in the appropriate grid cell
+    Returns:
+        int: The spread integer, e.g. 0b1011 becomes 0b1000101.
+    """
+    v &= 0x0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+@njit(parallel=True, nogil=True, cache=True)
+def morton_keys(x, y, x_max, y_max, cell_size):
+    """
+    Computes the Morton (Z-order) code of every particle's grid cell.
+
+    Sorting by these keys places particles of nearby cells at nearby
+    indices, both along x and along y.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        cell_size (float): Edge length of a grid cell.
+
+    Returns:
+        np.ndarray: An int64 array of shape (N,) with the Morton codes.
+    """
+    num_particles = x.shape[0]
+    grid_x = int(x_max / cell_size) + 1
+    grid_y = int(y_max / cell_size) + 1
+
+    keys = np.empty(num_particles, dtype=np.int64)
     for i in prange(num_particles):
-        x = particles[i, 0]
-        y = particles[i, 1]
+        cx, cy = cell_of(x[i], y[i], cell_size, grid_x, grid_y)
+        keys[i] = spread_bits(np.int64(cx)) | (spread_bits(np.int64(cy)) << 1)
+    return keys
 
-        cx = max(0, min(int(x // cell_size), grid_x - 1))
-        cy = max(0, min(int(y // cell_size), grid_y - 1))
+@njit(parallel=True, nogil=True, cache=True)
+def permute_particles(order, state, colors, particle_ids, state_out, colors_out, particle_ids_out):
+    """
+    Gathers all particle data into a new slot order.
 
-        ccount = grid_counts[cx, cy]
-        if ccount < MAX_PARTICLES_PER_CELL:
-            grid[cx, cy, ccount] = i
-            grid_counts[cx, cy] = ccount + 1
+    Slot `k` of the outputs receives the particle from slot `order[k]` of the inputs.
+
+    Args:
+        order (np.ndarray): Permutation of shape (N,).
+        state (np.ndarray): Particle state of shape (4, N).
+        colors (np.ndarray): Integer color indices of shape (N,).
+        particle_ids (np.ndarray): Stable particle IDs of shape (N,).
+        state_out (np.ndarray): Output state of shape (4, N).
+        colors_out (np.ndarray): Output colors of shape (N,).
+        particle_ids_out (np.ndarray): Output particle IDs of shape (N,).
+    """
+    for k in prange(order.shape[0]):
+        src = order[k]
+        for row in range(state.shape[0]):
+            state_out[row, k] = state[row, src]
+        colors_out[k] = colors[src]
+        particle_ids_out[k] = particle_ids[src]
+
+@njit(parallel=True, nogil=True, cache=True)
+def compute_neighbors_grid(x, y, x_max, y_max, radius, out=None, cell_buffers=None):
+    """
+    Generates neighbor lists for each particle based on a grid partition.
+
+    Cells are sized by 2*radius. Particles are sorted into cells with
+    `build_cell_list`, and only the 3x3 block of cells around each
+    particle's cell is searched to find potential neighbors. Cells have no
+    capacity limit, so no particle is dropped in dense clusters, and
+    neighbors are found in a fixed order, which makes the result
+    deterministic.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        radius (float): The neighborhood radius.
+        out (np.ndarray, optional): int32 array of shape (N, MAX_NEIGHBORS) that receives
+            the lists. If omitted, a new array is allocated.
+        cell_buffers (tuple, optional): Preallocated cell list arrays, see `build_cell_list`.
+
+    Returns:
+        np.ndarray: A 2D array (N, MAX_NEIGHBORS) that stores the indices of each particle's neighbors.
+                    Unused neighbor slots are filled with -1.
+    """
+    num_particles = x.shape[0]
+
+    if out is None:
+        neighbor_lists = np.empty((num_particles, MAX_NEIGHBORS), dtype=np.int32)
+    else:
+        neighbor_lists = out
+
+    cell_size = max(2.0 * radius, 1.0)
+    cell_start, cell_particles, grid_x, grid_y = build_cell_list(x, y, x_max, y_max, cell_size, cell_buffers)
 
     # Find neighbors in adjacent cells
     max_dist_sq = (2.0 * radius) ** 2
 
     for i in prange(num_particles):
-        x = particles[i, 0]
-        y = particles[i, 1]
+        xi = x[i]
+        yi = y[i]
 
-        cx = max(0, min(int(x // cell_size), grid_x - 1))
-        cy = max(0, min(int(y // cell_size), grid_y - 1))
+        cx, cy = cell_of(xi, yi, cell_size, grid_x, grid_y)
 
         ncount = 0
         for gx in range(max(0, cx - 1), min(cx + 2, grid_x)):
             for gy in range(max(0, cy - 1), min(cy + 2, grid_y)):
-                limit_count = grid_counts[gx, gy]
-                for cidx in range(limit_count):
-                    j = grid[gx, gy, cidx]
-                    if j == -1 or j == i:
+                c = gx * grid_y + gy
+                for cidx in range(cell_start[c], cell_start[c + 1]):
+                    j = cell_particles[cidx]
+                    if j == i:
                         continue
-                    dx = x - particles[j, 0]
-                    dy = y - particles[j, 1]
+                    dx = xi - x[j]
+                    dy = yi - y[j]
                     dist_sq = dx*dx + dy*dy
                     if dist_sq < max_dist_sq:
                         if ncount < MAX_NEIGHBORS:
                             neighbor_lists[i, ncount] = j
                             ncount += 1
+        for k in range(ncount, MAX_NEIGHBORS):
+            neighbor_lists[i, k] = -1
 
     return neighbor_lists
 
-@njit(parallel=True, fastmath=True)
-def compute_influence_map(particles, interaction_matrix, neighbor_lists,
-                          influence_scale, x_max, y_max, grid_size=100):
+@njit(nogil=True, cache=True)
+def influence_parts(num_particles):
+    """
+    Returns the number of partial maps `accumulate_influence_map` reduces for N particles.
     """
-    Computes a coarse "influence map" over a grid of size (grid_size x grid_size).
+    return max(1, min(INFLUENCE_PARTS, num_particles // 4096))
+
+@njit(parallel=True, fastmath=True, nogil=True, cache=True)
+def accumulate_influence_map(x, y, influence_x, influence_y, influence_scale, x_max, y_max, map_buffers=None,
+                             col_lo=0, col_hi=0, part_bounds=None):
+    """
+    Sums per-particle influence contributions into a map covering the whole domain.
+
+    Each of up to `INFLUENCE_PARTS` partial maps accumulates a contiguous
+    range of particles, so no two threads ever write to the same map entry.
+    The partial maps are then reduced cell by cell in parallel. Because the
+    partitioning only depends on the particle count, the summation order
+    and therefore the result are the same for any number of threads.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        influence_x (np.ndarray): x-component of each particle's influence contribution.
+        influence_y (np.ndarray): y-component of each particle's influence contribution.
+        influence_scale (float): Edge length of an influence map cell.
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        map_buffers (tuple, optional): Preallocated (partial_maps, influence_map) arrays of
+            shapes (INFLUENCE_PARTS, grid_x, grid_y, 2) and (grid_x, grid_y, 2), see
+            `Workspace.map_buffers`. If omitted, new arrays are allocated.
+        col_lo (int, optional): First domain column covered by the map.
+        col_hi (int, optional): One past the last covered column; 0 covers the domain
+            up to `x_max`.
+        part_bounds (np.ndarray, optional): Particle ranges of the partial maps, shape
+            (parts + 1,). Defaults to `influence_parts(N)` ranges of equal length. A
+            subset of a larger system passes the split of the full system here, so
+            its map is summed in the same order.
+
+    Returns:
+        np.ndarray: A float32 3D array (grid_x, grid_y, 2) with
+            `grid_x = x_max // influence_scale + 1` and `grid_y = y_max // influence_scale + 1`
+            (or `grid_x = col_hi - col_lo` for a partial map).
+    """
+    num_particles = x.shape[0]
+    grid_x = (col_hi if col_hi > 0 else int(x_max / influence_scale) + 1) - col_lo
+    grid_y = int(y_max / influence_scale) + 1
+
+    if part_bounds is None:
+        num_parts = influence_parts(num_particles)
+    else:
+        num_parts = part_bounds.shape[0] - 1
+    part_len = (num_particles + num_parts - 1) // num_parts
+
+    if map_buffers is None:
+        partial_maps = np.zeros((num_parts, grid_x, grid_y, 2), dtype=np.float32)
+        influence_map = np.empty((grid_x, grid_y, 2), dtype=np.float32)
+    else:
+        partial_maps, influence_map = map_buffers
+        for p in prange(num_parts):
+            partial_maps[p] = 0.0
+    for p in prange(num_parts):
+        lo = p * part_len
+        hi = min((p + 1) * part_len, num_particles)
+        if part_bounds is not None:
+            lo = part_bounds[p]
+            hi = part_bounds[p + 1]
+        for i in range(lo, hi):
+            gx, gy = cell_of(x[i], y[i], influence_scale, grid_x, grid_y, col_lo)
+            partial_maps[p, gx, gy, 0] += influence_x[i]
+            partial_maps[p, gx, gy, 1] += influence_y[i]
+
+    for gx in prange(grid_x):
+        for gy in range(grid_y):
+            ix = np.float32(0.0)
+            iy = np.float32(0.0)
+            for p in range(num_parts):
+                ix += partial_maps[p, gx, gy, 0]
+                iy += partial_maps[p, gx, gy, 1]
+            influence_map[gx, gy, 0] = ix
+            influence_map[gx, gy, 1] = iy
+
+    return influence_map
+
+@njit(parallel=True, fastmath=True, nogil=True, cache=True)
+def compute_influence_map(x, y, colors, pair_influence, neighbor_lists,
+                          influence_scale, x_max, y_max, chunk_bounds=None,
+                          influence=None, map_buffers=None):
+    """
+    Computes a coarse "influence map" over the whole domain.
 
     Influence is calculated by summing interaction forces between each
     particle and its neighbors in a small local region. The map is used to
-    guide velocity adjustments in a subsequent step.
+    guide velocity adjustments in a subsequent step. Its cells have the edge
+    length `influence_scale` and together cover [0, x_max] x [0, y_max].
+
+    Every particle first sums its own contribution, then the contributions
+    are reduced into the map with `accumulate_influence_map`, which is free
+    of write races.
 
     Args:
-        particles (np.ndarray): Array of shape (N, 5) containing particle data.
-        interaction_matrix (np.ndarray): The color interaction matrix (num_colors x num_colors).
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        colors (np.ndarray): Integer color indices of shape (N,).
+        pair_influence (np.ndarray): Influence coefficient of every color pair,
+            see `compute_pair_influence`.
         neighbor_lists (np.ndarray): A 2D array of neighbor indices for each particle.
         influence_scale (float): The spatial scaling for the influence grid cells.
         x_max (int): Maximum x-dimension (width).
         y_max (int): Maximum y-dimension (height).
-        grid_size (int, optional): The resolution of the influence map.
+        chunk_bounds (np.ndarray, optional): Particle ranges processed as one parallel
+            work item, see `balanced_chunks`. Defaults to equally long ranges.
+        influence (np.ndarray, optional): float32 scratch array of shape (2, N) for the
+            per-particle contributions. If omitted, a new array is allocated.
+        map_buffers (tuple, optional): Preallocated map arrays, see `accumulate_influence_map`.
 
     Returns:
-        np.ndarray: A float32 3D array (grid_size, grid_size, 2), where
+        np.ndarray: A float32 3D array (grid_x, grid_y, 2), where
                     [:, :, 0] is the x-influence component and
                     [:, :, 1] is the y-influence component.
     """
-    num_particles = particles.shape[0]
-    influence_map = np.zeros((grid_size, grid_size, 2), dtype=np.float32)
-
-    for i in prange(num_particles):
-        x, y, _, _, color = particles[i]
-        gx = int(x // influence_scale)
-        gy = int(y // influence_scale)
-        if gx < 0 or gx >= grid_size or gy < 0 or gy >= grid_size:
-            continue
-
-        for k in range(len(neighbor_lists[i])):
-            j = neighbor_lists[i][k]
-            if j == -1:
-                break
-            x2, y2, _, _, color2 = particles[j]
-            dx = x2 - x
-            dy = y2 - y
-            dist_sq = dx*dx + dy*dy
-            if dist_sq < (influence_scale * influence_scale) and dist_sq > 1e-5:
-                dist = math.sqrt(dist_sq)
-                inv_dist = 1.0 / dist
-
-                influence = 0.0
-                ncols = interaction_matrix.shape[0]
-                for col in range(ncols):
-                    influence += (interaction_matrix[int(color), col] *
-                                  interaction_matrix[col, int(color2)])
-
-                influence_map[gx, gy, 0] += influence * dx * inv_dist
-                influence_map[gx, gy, 1] += influence * dy * inv_dist
-
-    return influence_map
-
-@njit(parallel=True, fastmath=True)
-def apply_influence(particles, influence_map, influence_scale, max_speed):
+    num_particles = x.shape[0]
+    if influence is None:
+        influence = np.empty((2, num_particles), dtype=np.float32)
+    influence_x = influence[0]
+    influence_y = influence[1]
+    influence_sq = influence_scale * influence_scale
+    if chunk_bounds is None:
+        chunk_bounds = uniform_chunks(num_particles, LOAD_CHUNKS)
+
+    for c in prange(chunk_bounds.shape[0] - 1):
+        for i in range(chunk_bounds[c], chunk_bounds[c + 1]):
+            xi = x[i]
+            yi = y[i]
+            color = colors[i]
+            ix = 0.0
+            iy = 0.0
+
+            for k in range(len(neighbor_lists[i])):
+                j = neighbor_lists[i][k]
+                if j == -1:
+                    break
+                dx = x[j] - xi
+                dy = y[j] - yi
+                dist_sq = dx*dx + dy*dy
+                if dist_sq < influence_sq and dist_sq > 1e-5:
+                    inv_dist = 1.0 / math.sqrt(dist_sq)
+                    coeff = pair_influence[color, colors[j]]
+                    ix += coeff * dx * inv_dist
+                    iy += coeff * dy * inv_dist
+
+            influence_x[i] = ix
+            influence_y[i] = iy
+
+    return accumulate_influence_map(x, y, influence_x, influence_y, influence_scale, x_max, y_max, map_buffers)
+
+@njit(parallel=True, fastmath=True, nogil=True, cache=True)
+def apply_influence(x, y, vx, vy, influence_map, influence_scale, max_speed):
     """
     Adjusts each particle's velocity based on the local influence map.
 
+    The velocity arrays `vx` and `vy` are modified in place.
+
     Args:
-        particles (np.ndarray): Array of shape (N, 5) containing particle data.
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        vx (np.ndarray): x-velocities of shape (N,).
+        vy (np.ndarray): y-velocities of shape (N,).
         influence_map (np.ndarray): The influence map from `compute_influence_map()`.
         influence_scale (float): Cell size for accessing the map.
         max_speed (float): Maximum allowed speed for any particle.
-
-    Returns:
-        np.ndarray: The modified `particles` array with updated velocities.
     """
-    num_particles = particles.shape[0]
+    num_particles = x.shape[0]
 
     for i in prange(num_particles):
-        x, y, vx, vy, _ = particles[i]
-        gx = int(x // influence_scale)
-        gy = int(y // influence_scale)
+        gx = int(x[i] // influence_scale)
+        gy = int(y[i] // influence_scale)
 
         if gx < 0:
             gx = 0
@@ -362,18 +1439,17 @@ def apply_influence(particles, influence_map, influence_scale, max_speed):
 
         fx, fy = influence_map[gx, gy]
 
-        vx += min(max(fx * 0.1, -max_speed / 2), max_speed / 2)
-        vy += min(max(fy * 0.1, -max_speed / 2), max_speed / 2)
-        vx, vy = limit_speed(vx, vy, max_speed, 0.1)
+        vxi = vx[i] + min(max(fx * 0.1, -max_speed / 2), max_speed / 2)
+        vyi = vy[i] + min(max(fy * 0.1, -max_speed / 2), max_speed / 2)
+        vxi, vyi = limit_speed(vxi, vyi, max_speed, 0.1)
 
-        particles[i, 2] = vx
-        particles[i, 3] = vy
+        vx[i] = vxi
+        vy[i] = vyi
 
-    return particles
-
-@njit(parallel=True, fastmath=True)
+@njit(parallel=True, fastmath=True, nogil=True, cache=True)
 def update_positions_numba(
-    particles,
+    state,
+    colors,
     num_particles,
     x_max,
     y_max,
@@ -384,6 +1460,9 @@ def update_positions_numba(
     max_speed,
     min_speed,
     neighbor_lists,
+    out=None,
+    chunk_bounds=None,
+    chunk_threads=None,
 ):
     """
     Finalizes the update of particle positions and velocities, including:
@@ -393,7 +1472,8 @@ def update_positions_numba(
     - Collision handling (pushing particles apart if overlapping).
 
     Args:
-        particles (np.ndarray): Particle data array of shape (N, 5).
+        state (np.ndarray): Particle state of shape (4, N) with rows x, y, vx and vy.
+        colors (np.ndarray): Integer color indices of shape (N,).
         num_particles (int): Total number of particles.
         x_max (int): Maximum x-dimension (width).
         y_max (int): Maximum y-dimension (height).
@@ -404,48 +1484,65 @@ def update_positions_numba(
         max_speed (float): Maximum velocity magnitude.
         min_speed (float): Minimum velocity magnitude.
         neighbor_lists (np.ndarray): Neighbor indices for each particle.
+        out (np.ndarray, optional): Array of shape (4, N) that receives the new state.
+            `state` is only read, so every thread sees the start-of-step
+            positions of all neighbors. If omitted, a new array is allocated.
+            Passing `state` itself updates in place, in which case results
+            depend on thread scheduling.
+        chunk_bounds (np.ndarray, optional): Particle ranges processed as one parallel
+            work item, see `balanced_chunks`. Defaults to equally long ranges.
+        chunk_threads (np.ndarray, optional): int64 array that receives the thread id
+            that processed every chunk.
 
     Returns:
-        np.ndarray: Updated `particles` array after applying interactions and constraints.
+        np.ndarray: The `out` array after applying interactions and constraints.
     """
-    for i in prange(num_particles):
-        x, y, vx, vy, color = particles[i]
-
-        fx, fy = compute_forces_with_neighbors(
-            i, particles, neighbor_lists, interaction_matrix,
-            interaction_strength, radius_sq
-        )
-
-        vx += fx
-        vy += fy
-        vx, vy = limit_speed(vx, vy, max_speed, min_speed)
-
-        x_new = x + vx
-        y_new = y + vy
-
-        # Wrap-around
-        x_new %= x_max
-        y_new %= y_max
-
-        # Collision handling
-        x_new, y_new = handle_collisions(
-            i, x_new, y_new, radius, radius_sq, particles, neighbor_lists
-        )
-
-        # Wrap-around again after collision adjustments
-        x_new %= x_max
-        y_new %= y_max
-
-        particles[i, 0] = x_new
-        particles[i, 1] = y_new
-        particles[i, 2] = vx
-        particles[i, 3] = vy
-        particles[i, 4] = color
-
-    return particles
-
-@njit(fastmath=True)
-def compute_forces_with_neighbors(idx, particles, neighbor_lists,
+    if out is None:
+        out = np.empty_like(state)
+    if chunk_bounds is None:
+        chunk_bounds = uniform_chunks(num_particles, LOAD_CHUNKS)
+
+    x = state[0]
+    y = state[1]
+
+    for c in prange(chunk_bounds.shape[0] - 1):
+        if chunk_threads is not None:
+            chunk_threads[c] = get_thread_id()
+        for i in range(chunk_bounds[c], chunk_bounds[c + 1]):
+            fx, fy = compute_forces_with_neighbors(
+                i, x, y, colors, neighbor_lists, interaction_matrix,
+                interaction_strength, radius_sq
+            )
+
+            vx = state[2, i] + fx
+            vy = state[3, i] + fy
+            vx, vy = limit_speed(vx, vy, max_speed, min_speed)
+
+            x_new = x[i] + vx
+            y_new = y[i] + vy
+
+            # Wrap-around
+            x_new %= x_max
+            y_new %= y_max
+
+            # Collision handling
+            x_new, y_new = handle_collisions(
+                i, x_new, y_new, radius, radius_sq, x, y, neighbor_lists
+            )
+
+            # Wrap-around again after collision adjustments
+            x_new %= x_max
+            y_new %= y_max
+
+            out[0, i] = x_new
+            out[1, i] = y_new
+            out[2, i] = vx
+            out[3, i] = vy
+
+    return out
+
+@njit(fastmath=True, nogil=True, cache=True)
+def compute_forces_with_neighbors(idx, x, y, colors, neighbor_lists,
                                   interaction_matrix, interaction_strength, radius_sq):
     """
     Computes the net force on a given particle from its neighbors.
@@ -456,7 +1553,9 @@ def compute_forces_with_neighbors(idx, particles, neighbor_lists,
 
     Args:
         idx (int): Index of the particle for which to compute the force.
-        particles (np.ndarray): Particle data array of shape (N, 5).
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        colors (np.ndarray): Integer color indices of shape (N,).
         neighbor_lists (np.ndarray): Array of neighbor indices for each particle.
         interaction_matrix (np.ndarray): Color interaction matrix (num_colors x num_colors).
         interaction_strength (float): Global scale for color forces.
@@ -466,7 +1565,9 @@ def compute_forces_with_neighbors(idx, particles, neighbor_lists,
         Tuple[float, float]: (fx, fy), the total force in x and y directions on the particle.
     """
     fx, fy = 0.0, 0.0
-    x, y, _, _, color = particles[idx]
+    xi = x[idx]
+    yi = y[idx]
+    color = colors[idx]
 
     for j in neighbor_lists[idx]:
         if j == -1:
@@ -474,21 +1575,20 @@ def compute_forces_with_neighbors(idx, particles, neighbor_lists,
         if j == idx:
             continue
 
-        x2, y2, _, _, color2 = particles[j]
-        dx = x2 - x
-        dy = y2 - y
+        dx = x[j] - xi
+        dy = y[j] - yi
         dist_sq = dx * dx + dy * dy
 
         if 0.0 < dist_sq < radius_sq:
             dist = math.sqrt(dist_sq)
-            force = interaction_matrix[int(color), int(color2)] * interaction_strength
+            force = interaction_matrix[color, colors[j]] * interaction_strength
             damping_factor = min(1.0, (dist / (math.sqrt(radius_sq) * 0.6)) ** 1.5)
             fx += force * (dx / dist) * damping_factor
             fy += force * (dy / dist) * damping_factor
 
     return fx, fy
 
-@njit(fastmath=True)
+@njit(fastmath=True, nogil=True, cache=True)
 def limit_speed(vx, vy, max_speed, min_speed):
     """
     Clamps the speed of a velocity vector to be within [min_speed, max_speed].
@@ -511,8 +1611,8 @@ def limit_speed(vx, vy, max_speed, min_speed):
         vy = (vy / speed) * min_speed
     return vx, vy
 
-@njit(fastmath=True)
-def handle_collisions(i, x_new, y_new, radius, radius_sq, particles, neighbor_lists):
+@njit(fastmath=True, nogil=True, cache=True)
+def handle_collisions(i, x_new, y_new, radius, radius_sq, x, y, neighbor_lists):
     """
     Resolves collisions by pushing overlapping particles apart.
 
@@ -525,7 +1625,8 @@ def handle_collisions(i, x_new, y_new, radius, radius_sq, particles, neighbor_li
         y_new (float): Proposed new y-position for this particle.
         radius (float): Particle collision radius.
         radius_sq (float): Squared collision diameter for overlap checks.
-        particles (np.ndarray): Array of particle data.
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
         neighbor_lists (np.ndarray): Array of neighbor indices for each particle.
 
     Returns:
@@ -534,8 +1635,8 @@ def handle_collisions(i, x_new, y_new, radius, radius_sq, particles, neighbor_li
     for j in neighbor_lists[i]:
         if j == -1:
             break
-        dx = particles[j, 0] - x_new
-        dy = particles[j, 1] - y_new
+        dx = x[j] - x_new
+        dy = y[j] - y_new
         dist_sq = dx * dx + dy * dy
         if dist_sq < radius_sq:
             dist = max(math.sqrt(dist_sq), 1e-8)
@@ -546,3 +1647,1082 @@ def handle_collisions(i, x_new, y_new, radius, radius_sq, particles, neighbor_li
             y_new -= overlap * ny
 
     return x_new, y_new
+
+@njit(fastmath=True, nogil=True, cache=True)
+def compute_pair_influence(interaction_matrix):
+    """
+    Computes the influence coefficient for every ordered pair of colors.
+
+    The influence of a `color2` neighbor on a `color` particle is the inner
+    product `sum_col M[color, col] * M[col, color2]`, i.e. the matrix
+    product `M @ M`.
+
+    Args:
+        interaction_matrix (np.ndarray): Color interaction matrix (num_colors x num_colors).
+
+    Returns:
+        np.ndarray: A float32 array (num_colors, num_colors) of influence coefficients.
+    """
+    ncols = interaction_matrix.shape[0]
+    pair_influence = np.zeros((ncols, ncols), dtype=np.float32)
+    for c in range(ncols):
+        for c2 in range(ncols):
+            influence = 0.0
+            for col in range(ncols):
+                influence += interaction_matrix[c, col] * interaction_matrix[col, c2]
+            pair_influence[c, c2] = influence
+    return pair_influence
+
+@njit(fastmath=True, nogil=True, cache=True)
+def pair_terms(dx, dy, dist_sq, color, color2, interaction_matrix, pair_influence,
+               interaction_strength, influence_sq, diameter):
+    """
+    Computes everything a single neighbor contributes to a particle in one step.
+
+    Must only be called for pairs closer than the collision diameter.
+
+    Args:
+        dx (float): x-offset from the particle to its neighbor.
+        dy (float): y-offset from the particle to its neighbor.
+        dist_sq (float): Squared distance `dx*dx + dy*dy`.
+        color (int): Color index of the particle.
+        color2 (int): Color index of the neighbor.
+        interaction_matrix (np.ndarray): Color interaction coefficients.
+        pair_influence (np.ndarray): Influence coefficient of every color pair.
+        interaction_strength (float): Global scaling for interaction forces.
+        influence_sq (float): Squared influence radius.
+        diameter (float): Collision diameter.
+
+    Returns:
+        Tuple[float, float, float, float, float, float]: (ix, iy, fx, fy, px, py), the
+            influence, force and collision push contributions.
+    """
+    dist = max(math.sqrt(dist_sq), 1e-8)
+    nx = dx / dist
+    ny = dy / dist
+
+    ix, iy = 0.0, 0.0
+    if 1e-5 < dist_sq < influence_sq:
+        coeff = pair_influence[color, color2]
+        ix = coeff * nx
+        iy = coeff * ny
+
+    fx, fy = 0.0, 0.0
+    if dist_sq > 0.0:
+        force = interaction_matrix[color, color2] * interaction_strength
+        damping_factor = min(1.0, (dist / (diameter * 0.6)) ** 1.5)
+        fx = force * nx * damping_factor
+        fy = force * ny * damping_factor
+
+    overlap = diameter - dist
+    return ix, iy, fx, fy, -overlap * nx, -overlap * ny
+
+@njit(fastmath=True, nogil=True, cache=True)
+def integrate_particle(x, y, vx, vy, influence_x, influence_y, fx, fy, push_x, push_y,
+                       x_max, y_max, max_speed, min_speed):
+    """
+    Advances one particle of a fused step from its influence and pair terms.
+
+    Applies the (clamped) influence, the force, speed limiting, wrap-around
+    and the collision push, in that order.
+
+    Args:
+        x (float): x-position.
+        y (float): y-position.
+        vx (float): x-velocity.
+        vy (float): y-velocity.
+        influence_x (float): x-component of the influence map entry of the particle's cell.
+        influence_y (float): y-component of the influence map entry of the particle's cell.
+        fx (float): x-component of the summed pair force.
+        fy (float): y-component of the summed pair force.
+        push_x (float): x-component of the summed collision push.
+        push_y (float): y-component of the summed collision push.
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        max_speed (float): Maximum velocity magnitude.
+        min_speed (float): Minimum velocity magnitude.
+
+    Returns:
+        Tuple[float, float, float, float]: The new x, y, vx and vy.
+    """
+    vx = vx + min(max(influence_x * 0.1, -max_speed / 2), max_speed / 2)
+    vy = vy + min(max(influence_y * 0.1, -max_speed / 2), max_speed / 2)
+    vx, vy = limit_speed(vx, vy, max_speed, 0.1)
+
+    vx += fx
+    vy += fy
+    vx, vy = limit_speed(vx, vy, max_speed, min_speed)
+
+    x_new = (x + vx) % x_max + push_x
+    y_new = (y + vy) % y_max + push_y
+    return x_new % x_max, y_new % y_max, vx, vy
+
+@njit(parallel=True, fastmath=True, nogil=True, cache=True)
+def fused_integrate(state, terms, x_max, y_max, radius, max_speed, min_speed, out, map_buffers=None,
+                    col_lo=0, col_hi=0, part_bounds=None):
+    """
+    Integrates the per-particle terms of a fused step into the new state.
+
+    Sums the influence terms into the influence map, then applies the
+    influence, the force, speed limiting, wrap-around and the collision push.
+
+    Args:
+        state (np.ndarray): Particle state of shape (4, N) with rows x, y, vx and vy.
+        terms (np.ndarray): Per-particle influence (rows 0:2), force (rows 2:4)
+            and collision push (rows 4:6) of shape (6, N).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        radius (float): Interaction radius; also the influence map cell size.
+        max_speed (float): Maximum velocity magnitude.
+        min_speed (float): Minimum velocity magnitude.
+        out (np.ndarray): Array of shape (4, N) that receives the new state.
+        map_buffers (tuple, optional): Preallocated map arrays, see `accumulate_influence_map`.
+        col_lo (int, optional): First domain column of the influence map.
+        col_hi (int, optional): One past the last column of the influence map; 0 covers
+            the domain. A partial map only sees the influence of the given particles.
+        part_bounds (np.ndarray, optional): Particle ranges of the partial influence maps,
+            see `accumulate_influence_map`.
+    """
+    x = state[0]
+    y = state[1]
+
+    influence_map = accumulate_influence_map(
+        x, y, terms[0], terms[1], radius, x_max, y_max, map_buffers, col_lo, col_hi, part_bounds
+    )
+    map_x = influence_map.shape[0]
+    map_y = influence_map.shape[1]
+
+    for i in prange(state.shape[1]):
+        gx, gy = cell_of(x[i], y[i], radius, map_x, map_y, col_lo)
+        out[0, i], out[1, i], out[2, i], out[3, i] = integrate_particle(
+            x[i], y[i], state[2, i], state[3, i], influence_map[gx, gy, 0], influence_map[gx, gy, 1],
+            terms[2, i], terms[3, i], terms[4, i], terms[5, i], x_max, y_max, max_speed, min_speed
+        )
+
+@njit(parallel=True, fastmath=True, nogil=True, cache=True)
+def fused_pair_terms(x, y, colors, x_max, y_max, radius, radius_sq,
+                     interaction_matrix, pair_influence, interaction_strength, balance_load=False,
+                     cell_buffers=None, cost_prefix=None, chunk_bounds=None, out=None, chunk_threads=None,
+                     col_lo=0, col_hi=0):
+    """
+    Sums the pair terms of every particle over all neighbors in a single cell-list pass.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        colors (np.ndarray): Integer color indices of shape (N,).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        radius (float): Interaction radius.
+        radius_sq (float): Square of the collision interaction diameter.
+        interaction_matrix (np.ndarray): Color interaction coefficients.
+        pair_influence (np.ndarray): Influence coefficient of every color pair.
+        interaction_strength (float): Global scaling for interaction forces.
+        balance_load (bool, optional): Split the particles into chunks of equal
+            estimated cost (see `cell_costs`) instead of equal length.
+        cell_buffers (tuple, optional): Preallocated cell list arrays, see `build_cell_list`.
+        cost_prefix (np.ndarray, optional): int64 array of shape (N + 1,). Its first N
+            entries receive the cost of every particle (see `cell_costs`).
+        chunk_bounds (np.ndarray, optional): int64 array of shape (LOAD_CHUNKS + 1,)
+            that receives the chunk bounds.
+        out (np.ndarray, optional): float32 array of shape (6, N) that receives the terms.
+            If omitted, a new array is allocated.
+        chunk_threads (np.ndarray, optional): int64 array that receives the thread id
+            that processed every chunk.
+        col_lo (int, optional): First domain column of the cell grid.
+        col_hi (int, optional): One past the last column of the cell grid; 0 covers
+            the domain. The cells keep their domain coordinates, so the terms of
+            particles away from the grid edges do not change.
+
+    Returns:
+        np.ndarray: Per-particle influence (rows 0:2), force (rows 2:4) and
+            collision push (rows 4:6) of shape (6, N).
+    """
+    num_particles = x.shape[0]
+
+    cell_size = max(2.0 * radius, 1.0)
+    cell_start, cell_particles, grid_x, grid_y = build_cell_list(
+        x, y, x_max, y_max, cell_size, cell_buffers, col_lo, col_hi
+    )
+
+    influence_sq = radius * radius
+    diameter = math.sqrt(radius_sq)
+
+    # Per-particle influence (0:2), force (2:4) and collision push (4:6)
+    if out is None:
+        terms = np.empty((6, num_particles), dtype=np.float32)
+    else:
+        terms = out
+    if balance_load:
+        chunk_bounds = balanced_chunks(
+            cell_costs(x, y, cell_start, cell_size, grid_x, grid_y, cost_prefix, col_lo), LOAD_CHUNKS, chunk_bounds
+        )
+    else:
+        chunk_bounds = uniform_chunks(num_particles, LOAD_CHUNKS, chunk_bounds)
+
+    for c in prange(chunk_bounds.shape[0] - 1):
+        if chunk_threads is not None:
+            chunk_threads[c] = get_thread_id()
+        for i in range(chunk_bounds[c], chunk_bounds[c + 1]):
+            xi = x[i]
+            yi = y[i]
+            color = colors[i]
+
+            ix, iy = 0.0, 0.0
+            fx, fy = 0.0, 0.0
+            px, py = 0.0, 0.0
+            cost = 1
+
+            cx, cy = cell_of(xi, yi, cell_size, grid_x, grid_y, col_lo)
+            for gx in range(max(0, cx - 1), min(cx + 2, grid_x)):
+                for gy in range(max(0, cy - 1), min(cy + 2, grid_y)):
+                    c = gx * grid_y + gy
+                    cost += cell_start[c + 1] - cell_start[c]
+                    for cidx in range(cell_start[c], cell_start[c + 1]):
+                        j = cell_particles[cidx]
+                        if j == i:
+                            continue
+                        dx = x[j] - xi
+                        dy = y[j] - yi
+                        dist_sq = dx * dx + dy * dy
+                        if dist_sq >= radius_sq:
+                            continue
+
+                        tix, tiy, tfx, tfy, tpx, tpy = pair_terms(
+                            dx, dy, dist_sq, color, colors[j], interaction_matrix, pair_influence,
+                            interaction_strength, influence_sq, diameter
+                        )
+                        ix += tix
+                        iy += tiy
+                        fx += tfx
+                        fy += tfy
+                        px += tpx
+                        py += tpy
+
+            terms[0, i] = ix
+            terms[1, i] = iy
+            terms[2, i] = fx
+            terms[3, i] = fy
+            terms[4, i] = px
+            terms[5, i] = py
+            if cost_prefix is not None:
+                cost_prefix[i] = cost
+
+    return terms
+
+
+@njit(fastmath=True, nogil=True, cache=True)
+def fused_step(
+    state,
+    colors,
+    x_max,
+    y_max,
+    radius,
+    radius_sq,
+    interaction_matrix,
+    pair_influence,
+    interaction_strength,
+    max_speed,
+    min_speed,
+    out=None,
+    balance_load=False,
+):
+    """
+    Performs a complete update step in a single pass over all particle pairs.
+
+    Instead of materialising (N, 20) neighbor lists and walking them three
+    times, the particles are sorted into a CSR cell list and each particle
+    walks the 3x3 block of cells around it once. For every pair, `dx, dy`
+    and the squared distance are evaluated once and feed all three terms
+    (see `pair_terms`):
+
+    - the influence contribution (pairs closer than `radius`),
+    - the color-based force (pairs closer than the collision diameter),
+    - the collision push (pairs closer than the collision diameter).
+
+    The per-particle terms are then combined by `fused_integrate`, which
+    applies the influence map, the force, speed limiting, wrap-around and
+    the collision push. Collisions are resolved against the start-of-step
+    geometry rather than against the already moved position, and every
+    neighbor is considered (there is no limit of 20), so results differ
+    slightly from the classic path of `update_positions`.
+
+    Args:
+        state (np.ndarray): Particle state of shape (4, N) with rows x, y, vx and vy.
+        colors (np.ndarray): Integer color indices of shape (N,).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        radius (float): Interaction radius; also the influence map cell size.
+        radius_sq (float): Square of the collision interaction diameter.
+        interaction_matrix (np.ndarray): Color interaction coefficients.
+        pair_influence (np.ndarray): Influence coefficient of every color pair,
+            see `compute_pair_influence`.
+        interaction_strength (float): Global scaling for interaction forces.
+        max_speed (float): Maximum velocity magnitude.
+        min_speed (float): Minimum velocity magnitude.
+        out (np.ndarray, optional): Array of shape (4, N) that receives the new state.
+            If omitted, a new array is allocated.
+        balance_load (bool, optional): Balance the pair pass by estimated cost,
+            see `fused_pair_terms`.
+
+    Returns:
+        np.ndarray: The `out` array holding the updated state.
+    """
+    terms = fused_pair_terms(
+        state[0], state[1], colors, x_max, y_max, radius, radius_sq,
+        interaction_matrix, pair_influence, interaction_strength, balance_load
+    )
+
+    if out is None:
+        out = np.empty_like(state)
+
+    fused_integrate(state, terms, x_max, y_max, radius, max_speed, min_speed, out)
+    return out
+
+@njit(parallel=True, fastmath=True, nogil=True, cache=True)
+def fused_step_verlet(
+    state,
+    colors,
+    neighbor_start,
+    neighbor_index,
+    x_max,
+    y_max,
+    radius,
+    radius_sq,
+    interaction_matrix,
+    pair_influence,
+    interaction_strength,
+    max_speed,
+    min_speed,
+    out=None,
+    chunk_bounds=None,
+    terms=None,
+    map_buffers=None,
+    chunk_threads=None,
+):
+    """
+    Performs a fused update step that walks a Verlet neighbor list instead of the cell grid.
+
+    Identical to `fused_step`, except that the candidate neighbors of
+    particle `i` are `neighbor_index[neighbor_start[i]:neighbor_start[i + 1]]`,
+    as built by `build_verlet_list`. Candidates farther away than the
+    collision diameter are skipped.
+
+    Args:
+        state (np.ndarray): Particle state of shape (4, N) with rows x, y, vx and vy.
+        colors (np.ndarray): Integer color indices of shape (N,).
+        neighbor_start (np.ndarray): Offsets of each particle's candidates, shape (N + 1,).
+        neighbor_index (np.ndarray): Candidate neighbor indices of all particles.
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        radius (float): Interaction radius; also the influence map cell size.
+        radius_sq (float): Square of the collision interaction diameter.
+        interaction_matrix (np.ndarray): Color interaction coefficients.
+        pair_influence (np.ndarray): Influence coefficient of every color pair.
+        interaction_strength (float): Global scaling for interaction forces.
+        max_speed (float): Maximum velocity magnitude.
+        min_speed (float): Minimum velocity magnitude.
+        out (np.ndarray, optional): Array of shape (4, N) that receives the new state.
+            If omitted, a new array is allocated.
+        chunk_bounds (np.ndarray, optional): Particle ranges processed as one parallel
+            work item, see `balanced_chunks`. Defaults to equally long ranges.
+        terms (np.ndarray, optional): float32 scratch array of shape (6, N) for the pair terms.
+        map_buffers (tuple, optional): Preallocated map arrays, see `accumulate_influence_map`.
+        chunk_threads (np.ndarray, optional): int64 array that receives the thread id
+            that processed every chunk.
+
+    Returns:
+        np.ndarray: The `out` array holding the updated state.
+    """
+    num_particles = state.shape[1]
+    x = state[0]
+    y = state[1]
+
+    influence_sq = radius * radius
+    diameter = math.sqrt(radius_sq)
+    if chunk_bounds is None:
+        chunk_bounds = uniform_chunks(num_particles, LOAD_CHUNKS)
+
+    if terms is None:
+        terms = np.empty((6, num_particles), dtype=np.float32)
+
+    for c in prange(chunk_bounds.shape[0] - 1):
+        if chunk_threads is not None:
+            chunk_threads[c] = get_thread_id()
+        for i in range(chunk_bounds[c], chunk_bounds[c + 1]):
+            xi = x[i]
+            yi = y[i]
+            color = colors[i]
+
+            ix, iy = 0.0, 0.0
+            fx, fy = 0.0, 0.0
+            px, py = 0.0, 0.0
+
+            for k in range(neighbor_start[i], neighbor_start[i + 1]):
+                j = neighbor_index[k]
+                dx = x[j] - xi
+                dy = y[j] - yi
+                dist_sq = dx * dx + dy * dy
+                if dist_sq >= radius_sq:
+                    continue
+
+                tix, tiy, tfx, tfy, tpx, tpy = pair_terms(
+                    dx, dy, dist_sq, color, colors[j], interaction_matrix, pair_influence,
+                    interaction_strength, influence_sq, diameter
+                )
+                ix += tix
+                iy += tiy
+                fx += tfx
+                fy += tfy
+                px += tpx
+                py += tpy
+
+            terms[0, i] = ix
+            terms[1, i] = iy
+            terms[2, i] = fx
+            terms[3, i] = fy
+            terms[4, i] = px
+            terms[5, i] = py
+
+    if out is None:
+        out = np.empty_like(state)
+
+    fused_integrate(state, terms, x_max, y_max, radius, max_speed, min_speed, out, map_buffers)
+    return out
+
+@njit(parallel=True, nogil=True, cache=True)
+def build_verlet_list(x, y, x_max, y_max, cutoff):
+    """
+    Builds a compressed (CSR) Verlet neighbor list with the given cutoff.
+
+    The candidates of particle `i` are
+    `neighbor_index[neighbor_start[i]:neighbor_start[i + 1]]`: every other
+    particle closer than `cutoff`, in a fixed order. The list has no
+    per-particle capacity limit.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        cutoff (float): List radius, usually the interaction diameter plus a skin.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (neighbor_start, neighbor_index), int32 arrays
+            of shapes (N + 1,) and (total number of candidates,).
+    """
+    num_particles = x.shape[0]
+    cell_size = max(cutoff, 1.0)
+    cell_start, cell_particles, grid_x, grid_y = build_cell_list(x, y, x_max, y_max, cell_size)
+    cutoff_sq = cutoff * cutoff
+
+    counts = np.zeros(num_particles, dtype=np.int32)
+    for i in prange(num_particles):
+        cx, cy = cell_of(x[i], y[i], cell_size, grid_x, grid_y)
+        count = 0
+        for gx in range(max(0, cx - 1), min(cx + 2, grid_x)):
+            for gy in range(max(0, cy - 1), min(cy + 2, grid_y)):
+                c = gx * grid_y + gy
+                for cidx in range(cell_start[c], cell_start[c + 1]):
+                    j = cell_particles[cidx]
+                    dx = x[j] - x[i]
+                    dy = y[j] - y[i]
+                    if j != i and dx * dx + dy * dy < cutoff_sq:
+                        count += 1
+        counts[i] = count
+
+    neighbor_start = np.empty(num_particles + 1, dtype=np.int32)
+    neighbor_start[0] = 0
+    for i in range(num_particles):
+        neighbor_start[i + 1] = neighbor_start[i] + counts[i]
+
+    neighbor_index = np.empty(neighbor_start[num_particles], dtype=np.int32)
+    for i in prange(num_particles):
+        cx, cy = cell_of(x[i], y[i], cell_size, grid_x, grid_y)
+        k = neighbor_start[i]
+        for gx in range(max(0, cx - 1), min(cx + 2, grid_x)):
+            for gy in range(max(0, cy - 1), min(cy + 2, grid_y)):
+                c = gx * grid_y + gy
+                for cidx in range(cell_start[c], cell_start[c + 1]):
+                    j = cell_particles[cidx]
+                    dx = x[j] - x[i]
+                    dy = y[j] - y[i]
+                    if j != i and dx * dx + dy * dy < cutoff_sq:
+                        neighbor_index[k] = j
+                        k += 1
+
+    return neighbor_start, neighbor_index
+
+@njit(parallel=True, nogil=True, cache=True)
+def max_displacement_sq(x, y, ref_x, ref_y):
+    """
+    Returns the largest squared displacement of any particle from its reference position.
+
+    Displacements are not wrapped, so a particle that crossed a periodic
+    border counts as having moved by roughly the domain size.
+
+    Args:
+        x (np.ndarray): Current x-positions of shape (N,).
+        y (np.ndarray): Current y-positions of shape (N,).
+        ref_x (np.ndarray): Reference x-positions of shape (N,).
+        ref_y (np.ndarray): Reference y-positions of shape (N,).
+
+    Returns:
+        float: The maximum squared displacement (0.0 for no particles).
+    """
+    num_particles = x.shape[0]
+    num_chunks = max(1, min(MAX_CHUNKS, num_particles))
+    chunk_len = (num_particles + num_chunks - 1) // num_chunks
+    chunk_max = np.zeros(num_chunks, dtype=np.float64)
+    for k in prange(num_chunks):
+        local_max = 0.0
+        for i in range(k * chunk_len, min((k + 1) * chunk_len, num_particles)):
+            dx = x[i] - ref_x[i]
+            dy = y[i] - ref_y[i]
+            local_max = max(local_max, dx * dx + dy * dy)
+        chunk_max[k] = local_max
+    return chunk_max.max()
+
+@njit(parallel=True, nogil=True, cache=True)
+def neighbors_from_verlet(x, y, x_max, y_max, neighbor_start, neighbor_index, radius, out=None):
+    """
+    Extracts classic (N, 20) neighbor lists from a Verlet list.
+
+    Keeps the candidates that are currently closer than `2 * radius` and
+    orders them by the grid cell of `compute_neighbors_grid` and then by
+    index, so the result is identical to `compute_neighbors_grid`, including
+    which neighbors are dropped beyond the limit of 20. Every row is kept
+    sorted by insertion while the candidates are scanned, so no per-particle
+    scratch memory is needed.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        neighbor_start (np.ndarray): Offsets of each particle's candidates, shape (N + 1,).
+        neighbor_index (np.ndarray): Candidate neighbor indices of all particles.
+        radius (float): The neighborhood radius.
+        out (np.ndarray, optional): int32 array of shape (N, MAX_NEIGHBORS) that receives
+            the lists. If omitted, a new array is allocated.
+
+    Returns:
+        np.ndarray: A 2D array (N, MAX_NEIGHBORS) of neighbor indices, padded with -1.
+    """
+    num_particles = x.shape[0]
+    if out is None:
+        neighbor_lists = np.empty((num_particles, MAX_NEIGHBORS), dtype=np.int32)
+    else:
+        neighbor_lists = out
+    max_dist_sq = (2.0 * radius) ** 2
+
+    cell_size = max(2.0 * radius, 1.0)
+    grid_x = int(x_max / cell_size) + 1
+    grid_y = int(y_max / cell_size) + 1
+
+    for i in prange(num_particles):
+        ncount = 0
+        for k in range(neighbor_start[i], neighbor_start[i + 1]):
+            j = neighbor_index[k]
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            if dx * dx + dy * dy < max_dist_sq:
+                gx, gy = cell_of(x[j], y[j], cell_size, grid_x, grid_y)
+                key = np.int64(gx * grid_y + gy) * num_particles + j
+                # Insert into the sorted row, dropping the largest key once it is full
+                slot = ncount
+                while slot > 0:
+                    prev = neighbor_lists[i, slot - 1]
+                    px, py = cell_of(x[prev], y[prev], cell_size, grid_x, grid_y)
+                    if np.int64(px * grid_y + py) * num_particles + prev < key:
+                        break
+                    if slot < MAX_NEIGHBORS:
+                        neighbor_lists[i, slot] = prev
+                    slot -= 1
+                if slot < MAX_NEIGHBORS:
+                    neighbor_lists[i, slot] = j
+                if ncount < MAX_NEIGHBORS:
+                    ncount += 1
+        for k in range(ncount, MAX_NEIGHBORS):
+            neighbor_lists[i, k] = -1
+
+    return neighbor_lists
+
+@njit(nogil=True, cache=True)
+def uniform_chunks(num_particles, num_chunks, out=None):
+    """
+    Splits the particle indices into `num_chunks` ranges of (almost) equal length.
+
+    Args:
+        num_particles (int): Number of particles.
+        num_chunks (int): Number of ranges.
+        out (np.ndarray, optional): int64 array of shape (num_chunks + 1,) that receives
+            the bounds. If omitted, a new array is allocated.
+
+    Returns:
+        np.ndarray: int64 bounds of shape (num_chunks + 1,); chunk `c` holds the
+            particles `bounds[c]` to `bounds[c + 1] - 1`.
+    """
+    if out is None:
+        bounds = np.empty(num_chunks + 1, dtype=np.int64)
+    else:
+        bounds = out
+    for c in range(num_chunks + 1):
+        bounds[c] = c * num_particles // num_chunks
+    return bounds
+
+@njit(nogil=True, cache=True)
+def balanced_chunks(cost_prefix, num_chunks, out=None):
+    """
+    Splits the particle indices into `num_chunks` ranges of (almost) equal cost.
+
+    In clustered states a few particles have many neighbors and most have
+    none. Ranges of equal length then carry very different amounts of work
+    and the thread that gets the dense region determines the step time.
+    Cutting the prefix sum of the per-particle costs at equal heights gives
+    ranges of equal estimated work instead. Particles keep their order, so
+    every particle is computed exactly as before and results do not change.
+
+    Args:
+        cost_prefix (np.ndarray): Exclusive prefix sum of the per-particle costs,
+            shape (N + 1,), e.g. from `neighbor_costs`, `cell_costs` or `verlet_costs`.
+        num_chunks (int): Number of ranges.
+        out (np.ndarray, optional): int64 array of shape (num_chunks + 1,) that receives
+            the bounds. If omitted, a new array is allocated.
+
+    Returns:
+        np.ndarray: int64 bounds of shape (num_chunks + 1,), see `uniform_chunks`.
+    """
+    num_particles = cost_prefix.shape[0] - 1
+    total = cost_prefix[num_particles]
+    if out is None:
+        bounds = np.empty(num_chunks + 1, dtype=np.int64)
+    else:
+        bounds = out
+    for c in range(num_chunks + 1):
+        bounds[c] = np.searchsorted(cost_prefix, c * total // num_chunks)
+    bounds[0] = 0
+    bounds[num_chunks] = num_particles
+    return bounds
+
+@njit(nogil=True, cache=True)
+def exclusive_prefix(costs, out=None):
+    """
+    Returns the exclusive prefix sum of per-particle costs.
+
+    Args:
+        costs (np.ndarray): Cost of every particle, shape (N,).
+        out (np.ndarray, optional): int64 array of shape (N + 1,) that receives the sum.
+            It may start with `costs` itself (`out[:N]`), which gives an in-place sum.
+
+    Returns:
+        np.ndarray: int64 array of shape (N + 1,) with `prefix[i]` the summed cost of particles before `i`.
+    """
+    if out is None:
+        prefix = np.empty(costs.shape[0] + 1, dtype=np.int64)
+    else:
+        prefix = out
+    total = 0
+    for i in range(costs.shape[0]):
+        cost = costs[i]
+        prefix[i] = total
+        total += cost
+    prefix[costs.shape[0]] = total
+    return prefix
+
+@njit(parallel=True, nogil=True, cache=True)
+def neighbor_costs(neighbor_lists, out=None):
+    """
+    Estimates the work of every particle from its (N, 20) neighbor list.
+
+    Args:
+        neighbor_lists (np.ndarray): Neighbor indices of every particle, -1 terminated.
+        out (np.ndarray, optional): int64 array of shape (N + 1,) that receives the
+            prefix sum. If omitted, a new array is allocated.
+
+    Returns:
+        np.ndarray: int64 exclusive prefix sum of the costs (1 plus the number
+            of neighbors), shape (N + 1,).
+    """
+    num_particles = neighbor_lists.shape[0]
+    if out is None:
+        out = np.empty(num_particles + 1, dtype=np.int64)
+    costs = out[:num_particles]
+    for i in prange(num_particles):
+        count = 0
+        while count < neighbor_lists.shape[1] and neighbor_lists[i, count] != -1:
+            count += 1
+        costs[i] = 1 + count
+    return exclusive_prefix(costs, out)
+
+@njit(parallel=True, nogil=True, cache=True)
+def cell_costs(x, y, cell_start, cell_size, grid_x, grid_y, out=None, col_lo=0):
+    """
+    Estimates the work of every particle from the occupancy of the cells it searches.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        cell_start (np.ndarray): Cell offsets from `build_cell_list`.
+        cell_size (float): Edge length of the cells.
+        grid_x (int): Number of cell columns.
+        grid_y (int): Number of cell rows.
+        out (np.ndarray, optional): int64 array of shape (N + 1,) that receives the
+            prefix sum. If omitted, a new array is allocated.
+        col_lo (int, optional): Domain column of the first grid column.
+
+    Returns:
+        np.ndarray: int64 exclusive prefix sum of the costs (1 plus the number
+            of particles in the surrounding 3x3 cells), shape (N + 1,).
+    """
+    num_particles = x.shape[0]
+    if out is None:
+        out = np.empty(num_particles + 1, dtype=np.int64)
+    costs = out[:num_particles]
+    for i in prange(num_particles):
+        cx, cy = cell_of(x[i], y[i], cell_size, grid_x, grid_y, col_lo)
+        count = 1
+        for gx in range(max(0, cx - 1), min(cx + 2, grid_x)):
+            c0 = gx * grid_y
+            count += cell_start[c0 + min(cy + 2, grid_y)] - cell_start[c0 + max(0, cy - 1)]
+        costs[i] = count
+    return exclusive_prefix(costs, out)
+
+@njit(nogil=True, cache=True)
+def verlet_costs(neighbor_start, out=None):
+    """
+    Estimates the work of every particle from the length of its Verlet list.
+
+    Args:
+        neighbor_start (np.ndarray): Offsets of each particle's candidates, shape (N + 1,).
+        out (np.ndarray, optional): int64 array of shape (N + 1,) that receives the
+            prefix sum. If omitted, a new array is allocated.
+
+    Returns:
+        np.ndarray: int64 exclusive prefix sum of the costs (1 plus the number
+            of candidates), shape (N + 1,).
+    """
+    if out is None:
+        prefix = np.empty(neighbor_start.shape[0], dtype=np.int64)
+    else:
+        prefix = out
+    for i in range(neighbor_start.shape[0]):
+        prefix[i] = neighbor_start[i] + i
+    return prefix
+
+@njit(nogil=True, cache=True)
+def thread_loads(cost_prefix, chunk_bounds, num_threads, chunk_threads=None, out=None):
+    """
+    Sums the cost of the chunks each thread processed.
+
+    Without `chunk_threads`, the chunks are assumed to be handed out in
+    contiguous blocks of equal count, as the workqueue and OpenMP layers
+    do for a `prange` loop. TBB schedules dynamically, so the result is
+    then only an estimate.
+
+    Args:
+        cost_prefix (np.ndarray): Exclusive prefix sum of the per-particle costs.
+        chunk_bounds (np.ndarray): Chunk bounds, see `uniform_chunks`.
+        num_threads (int): Number of threads.
+        chunk_threads (np.ndarray, optional): Thread id that processed every chunk,
+            as recorded by the kernels.
+        out (np.ndarray, optional): float64 array of shape (num_threads,) that receives
+            the loads. If omitted, a new array is allocated.
+
+    Returns:
+        np.ndarray: float64 load of every thread, shape (num_threads,).
+    """
+    num_chunks = chunk_bounds.shape[0] - 1
+    if out is None:
+        loads = np.empty(num_threads, dtype=np.float64)
+    else:
+        loads = out
+    if chunk_threads is None:
+        for t in range(num_threads):
+            lo = chunk_bounds[t * num_chunks // num_threads]
+            hi = chunk_bounds[(t + 1) * num_chunks // num_threads]
+            loads[t] = cost_prefix[hi] - cost_prefix[lo]
+    else:
+        loads[:] = 0.0
+        for c in range(num_chunks):
+            loads[chunk_threads[c] % num_threads] += cost_prefix[chunk_bounds[c + 1]] - cost_prefix[chunk_bounds[c]]
+    return loads
+
+@njit(nogil=True, cache=True)
+def load_imbalance(loads):
+    """
+    Returns the ratio of the largest to the mean thread load (1.0 is perfect balance).
+
+    Args:
+        loads (np.ndarray): Load of every thread, see `thread_loads`.
+
+    Returns:
+        float: The imbalance factor; the step time is roughly the balanced time times this factor.
+    """
+    mean = loads.mean()
+    if mean <= 0.0:
+        return 1.0
+    return loads.max() / mean
+
+@njit(nogil=True, cache=True)
+def mix64(z):
+    """
+    Scrambles a 64-bit integer (the SplitMix64 finalizer).
+
+    Args:
+        z (np.uint64): Input value.
+
+    Returns:
+        np.uint64: The scrambled value.
+    """
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+@njit(nogil=True, cache=True)
+def counter_uniform(key, counter):
+    """
+    Returns the uniform random number with a given index of a random stream.
+
+    The number only depends on `key` and `counter`, so any subset of a
+    stream can be drawn in any order, e.g. by many threads at once.
+
+    Args:
+        key (np.uint64): Stream key, see `seed_key`.
+        counter (int): Index of the number in the stream.
+
+    Returns:
+        float: A float64 in [0, 1).
+    """
+    z = mix64(key + (np.uint64(counter) + np.uint64(1)) * np.uint64(0x9E3779B97F4A7C15))
+    return (z >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+
+@njit(nogil=True, cache=True)
+def seed_key(seed):
+    """
+    Derives the key of a random stream from a user seed.
+
+    Args:
+        seed (int): The seed.
+
+    Returns:
+        np.uint64: The stream key.
+    """
+    return mix64(np.uint64(seed) + np.uint64(0x9E3779B97F4A7C15))
+
+@njit(nogil=True, cache=True)
+def wrap_coordinate(value, size):
+    """
+    Wraps a coordinate into [0, size) and rounds it to float32.
+    """
+    value = value - math.floor(value / size) * size
+    result = np.float32(value)
+    if result >= size or result < 0:
+        result = np.float32(0.0)
+    return result
+
+@njit(parallel=True, nogil=True, cache=True)
+def seed_particles(state, colors, seed, clustered, x_max, y_max, speed_lo, speed_hi, num_colors, spread):
+    """
+    Fills the particle state and colors in place from a seed.
+
+    Particle `i` uses the numbers `i * RANDOM_STREAMS` to
+    `i * RANDOM_STREAMS + RANDOM_STREAMS - 1` of the stream, so the result
+    does not depend on the thread count or the order of evaluation.
+
+    Args:
+        state (np.ndarray): float32 state of shape (4, N) to fill.
+        colors (np.ndarray): Color indices of shape (N,) to fill.
+        seed (int): Seed of the world.
+        clustered (bool): Place every color in a Gaussian cluster instead of uniformly.
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        speed_lo (float): Lower bound of the initial velocity components.
+        speed_hi (float): Upper bound of the initial velocity components.
+        num_colors (int): Number of distinct colors.
+        spread (float): Standard deviation of the clusters in world units.
+    """
+    key = seed_key(seed)
+    # The cluster centers come after the counters of all particles
+    num_particles = state.shape[1]
+    centers = np.empty((2, num_colors), dtype=np.float64)
+    base = num_particles * RANDOM_STREAMS
+    for c in range(num_colors):
+        centers[0, c] = counter_uniform(key, base + 2 * c) * x_max
+        centers[1, c] = counter_uniform(key, base + 2 * c + 1) * y_max
+
+    for i in prange(num_particles):
+        counter = i * RANDOM_STREAMS
+        color = min(int(counter_uniform(key, counter + 4) * num_colors), num_colors - 1)
+        if clustered:
+            # Box-Muller transform of two uniform numbers
+            radius = spread * math.sqrt(-2.0 * math.log(1.0 - counter_uniform(key, counter + 5)))
+            angle = 2.0 * math.pi * counter_uniform(key, counter + 6)
+            x = centers[0, color] + radius * math.cos(angle)
+            y = centers[1, color] + radius * math.sin(angle)
+        else:
+            x = counter_uniform(key, counter) * x_max
+            y = counter_uniform(key, counter + 1) * y_max
+        state[0, i] = wrap_coordinate(x, x_max)
+        state[1, i] = wrap_coordinate(y, y_max)
+        state[2, i] = speed_lo + counter_uniform(key, counter + 2) * (speed_hi - speed_lo)
+        state[3, i] = speed_lo + counter_uniform(key, counter + 3) * (speed_hi - speed_lo)
+        colors[i] = color
+
+@njit(parallel=True, nogil=True, cache=True)
+def load_particles(state, colors, positions, position_colors, seed, x_max, y_max, speed_lo, speed_hi):
+    """
+    Copies given positions and colors into the state and draws seeded velocities.
+
+    Args:
+        state (np.ndarray): float32 state of shape (4, N) to fill.
+        colors (np.ndarray): Color indices of shape (N,) to fill.
+        positions (np.ndarray): Positions of shape (2, N); wrapped into the domain.
+        position_colors (np.ndarray): Color index of every particle.
+        seed (int): Seed of the velocities (same stream as `seed_particles`).
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+        speed_lo (float): Lower bound of the initial velocity components.
+        speed_hi (float): Upper bound of the initial velocity components.
+    """
+    key = seed_key(seed)
+    for i in prange(state.shape[1]):
+        counter = i * RANDOM_STREAMS
+        state[0, i] = wrap_coordinate(positions[0, i], x_max)
+        state[1, i] = wrap_coordinate(positions[1, i], y_max)
+        state[2, i] = speed_lo + counter_uniform(key, counter + 2) * (speed_hi - speed_lo)
+        state[3, i] = speed_lo + counter_uniform(key, counter + 3) * (speed_hi - speed_lo)
+        colors[i] = position_colors[i]
+
+@njit(nogil=True, cache=True)
+def layout_spread(layout, cluster_spread, x_max, y_max):
+    """
+    Checks the layout arguments of `generate_seeded` and returns the cluster spread.
+
+    Args:
+        layout (str): One of `LAYOUTS`.
+        cluster_spread (float): Cluster size relative to the shorter domain side.
+        x_max (int): Maximum x-dimension (width).
+        y_max (int): Maximum y-dimension (height).
+
+    Returns:
+        float: Standard deviation of the clusters in world units, 0 for "uniform".
+
+    Raises:
+        ValueError: If `layout` is unknown or `cluster_spread` is negative.
+    """
+    if layout != "uniform" and layout != "clusters":
+        raise ValueError("layout must be 'uniform' or 'clusters'.")
+    if cluster_spread < 0:
+        raise ValueError("cluster_spread must not be negative.")
+    spread = 0.0
+    if layout == "clusters":
+        spread = cluster_spread * min(x_max, y_max)
+    return spread
+
+@njit(nogil=True, cache=True)
+def check_layout_arrays(positions, colors, num_colors):
+    """
+    Checks the arrays passed to `load_layout`.
+
+    Args:
+        positions (np.ndarray): Positions of shape (2, N) (x row, y row).
+        colors (np.ndarray): Integer color index of every particle, shape (N,).
+        num_colors (int): Number of colors.
+
+    Raises:
+        ValueError: If the shapes do not match or a color is outside [0, num_colors).
+    """
+    num_particles = colors.shape[0]
+    if positions.shape[0] != 2 or positions.shape[1] != num_particles:
+        raise ValueError("positions must have the shape (2, N) of the colors.")
+    if num_particles > 0 and (colors.min() < 0 or colors.max() >= num_colors):
+        raise ValueError("colors must be between 0 and num_colors - 1.")
+
+@njit
+def stage_clock():
+    """
+    Reads `time.perf_counter` from compiled code.
+
+    Briefly switches to object mode (and takes the GIL), which costs about
+    a microsecond, so it is only called while stage timing is enabled. Not
+    cached, as object mode code cannot be cached.
+
+    Returns:
+        float: The current clock value in seconds.
+    """
+    with objmode(now="float64"):
+        now = time.perf_counter()
+    return now
+
+@njit(nogil=True)
+def step_particles(particle_creator, num_steps=1):
+    """
+    Calls `update_positions` of a `CreateParticle` without holding the GIL.
+
+    Calling a jitclass method from Python keeps the GIL for the whole call.
+    Going through this compiled function instead releases it, so other
+    Python threads (e.g. the GUI) keep running while the step is computed.
+
+    Args:
+        particle_creator (CreateParticle): The particle system to step.
+        num_steps (int, optional): Number of steps to perform.
+    """
+    for _ in range(num_steps):
+        particle_creator.update_positions()
+
+
+def warmup(particle_creator, num_steps: int = 2) -> float:
+    """
+    Compiles the code paths of a particle system before it is timed.
+
+    Steps a small throwaway system with the configuration of
+    `particle_creator` (engine, buffering, reordering and Verlet skin),
+    both directly and through `step_particles`, so the first real step
+    pays neither for JIT compilation nor for loading the kernels from
+    Numba's on-disk cache. The particles are placed on a lattice instead of
+    being drawn from the global random generators, so warming up does not
+    change the random stream of the caller.
+
+    Args:
+        particle_creator (CreateParticle): The particle system to prepare.
+        num_steps (int, optional): Number of steps of the throwaway system.
+
+    Returns:
+        float: The wall time of the warmup in seconds.
+    """
+    start_time = time.perf_counter()
+
+    side = 8
+    spacing = 2.0 * particle_creator.radius + particle_creator.skin
+    size = int(math.ceil(side * 2.0 * spacing))
+    dummy = CreateParticle(
+        num_particles=side * side,
+        x_max=size,
+        y_max=size,
+        max_speed=particle_creator.max_speed,
+        min_speed=particle_creator.min_speed,
+        radius=particle_creator.radius,
+        num_colors=particle_creator.num_colors,
+        interaction_strength=particle_creator.interaction_strength,
+        radius_factor=1.0,
+        fused=particle_creator.fused,
+        double_buffered=particle_creator.double_buffered,
+        reorder_interval=1 if particle_creator.reorder_interval > 0 else 0,
+        reorder_order=particle_creator.reorder_order,
+        skin=particle_creator.skin,
+    )
+    k = np.arange(side * side)
+    dummy.state[0] = (k % side) * 2.0 * spacing
+    dummy.state[1] = (k // side) * 2.0 * spacing
+    dummy.state[2] = 0.5 * particle_creator.max_speed
+    dummy.state[3] = -0.5 * particle_creator.max_speed
+    dummy.colors[:] = k % particle_creator.num_colors
+    dummy.set_interaction_matrix(np.ascontiguousarray(particle_creator.color_interaction))
+
+    for _ in range(num_steps):
+        dummy.update_positions()
+    step_particles(dummy, num_steps)
+    dummy.get_positions_and_colors()
+
+    return time.perf_counter() - start_time
@@ -0,0 +1,240 @@
+import os
+import threading
+import time
+
+import numpy as np
+from numba import config, njit, prange, threading_layer
+
+from particle_life_simulator.Class_Particle import CreateParticle, step_particles
+
+# Threading layers that may launch parallel kernels from several threads at once
+THREADSAFE_LAYERS = ("tbb", "omp")
+
+
+@njit(parallel=True, cache=True)
+def launch_threads(n):
+    """
+    Runs a trivial parallel loop, which makes Numba load its threading layer.
+
+    Args:
+        n (int): Number of iterations.
+
+    Returns:
+        int: Sum of 0 to n - 1.
+    """
+    total = 0
+    for i in prange(n):
+        total += i
+    return total
+
+
+def select_threading_layer():
+    """
+    Selects a Numba threading layer that may launch parallel kernels from several threads at once.
+
+    In threaded mode the physics thread and the render thread both run
+    parallel kernels. The workqueue layer aborts the process when that
+    happens, so a thread-safe layer (TBB or OpenMP) is requested and loaded
+    by Numba's own backend selection, falling back to the default order if
+    neither is available. A layer set through NUMBA_THREADING_LAYER is left
+    alone. Numba loads the layer once per process, so this must run before
+    the first parallel kernel to have an effect; afterwards it only reports
+    on the loaded layer.
+
+    Returns:
+        bool: True if the loaded layer is thread-safe.
+    """
+    try:
+        return threading_layer() in THREADSAFE_LAYERS
+    except ValueError:
+        pass  # No parallel kernel has run yet
+    if not os.environ.get("NUMBA_THREADING_LAYER"):
+        config.THREADING_LAYER = "threadsafe"
+        try:
+            launch_threads(1)
+        except ValueError:
+            config.THREADING_LAYER = "default"
+    launch_threads(1)
+    return threading_layer() in THREADSAFE_LAYERS
+
+
+class Frame:
+    """
+    One published snapshot of the particle positions.
+
+    Attributes:
+        x (np.ndarray): float32 x-positions of shape (N,).
+        y (np.ndarray): float32 y-positions of shape (N,).
+        colors (np.ndarray): int16 color indices of shape (N,).
+        layout_version (int): Layout version of the system when the colors were copied.
+        step (int): Number of physics steps performed before the snapshot.
+    """
+
+    def __init__(self):
+        self.x = np.empty(0, dtype=np.float32)
+        self.y = np.empty(0, dtype=np.float32)
+        self.colors = np.empty(0, dtype=np.int16)
+        self.layout_version = -1
+        self.step = 0
+
+
+class TripleBuffer:
+    """
+    Hands frames from one producer to one consumer without copying under a lock.
+
+    There are three frames: the producer fills `back`, the consumer reads
+    `front`, and `middle` holds the latest completed frame. Publishing swaps
+    `back` and `middle`; acquiring swaps `middle` and `front` if a new frame
+    was published since. Neither side ever waits for the other to finish
+    copying or drawing, and the consumer always gets the newest complete frame.
+
+    The swap is not lock-free: Python has no atomic compare-and-swap, so the
+    index exchange (and the `fresh` flag) is guarded by a lock. Nothing else
+    happens while the lock is held, so it is only ever contended for the
+    duration of a few assignments.
+    """
+
+    def __init__(self):
+        self.frames = [Frame(), Frame(), Frame()]
+        self.back = 0
+        self.middle = 1
+        self.front = 2
+        self.fresh = False
+        self.lock = threading.Lock()
+
+    def write_frame(self) -> Frame:
+        """
+        Returns the frame the producer may fill.
+
+        Returns:
+            Frame: The back frame; it is not read by the consumer until `publish`.
+        """
+        return self.frames[self.back]
+
+    def publish(self):
+        """
+        Makes the back frame the latest completed frame.
+        """
+        with self.lock:
+            self.back, self.middle = self.middle, self.back
+            self.fresh = True
+
+    def acquire(self):
+        """
+        Takes the latest completed frame, if there is a new one.
+
+        Returns:
+            Frame or None: The newest frame, or None if nothing was published
+                since the last call. The frame stays valid until the next call.
+        """
+        with self.lock:
+            if not self.fresh:
+                return None
+            self.front, self.middle = self.middle, self.front
+            self.fresh = False
+        return self.frames[self.front]
+
+
+class PhysicsThread(threading.Thread):
+    """
+    Steps a particle system on its own thread and publishes every step to a `TripleBuffer`.
+
+    `CreateParticle` is stepped through `step_particles`, which releases the
+    GIL, so the render thread runs concurrently with the physics kernels.
+    Other systems (e.g. `DistributedParticle` or `TrajectoryPlayer`) are
+    stepped by calling their `update_positions`.
+
+    Attributes:
+        particle_creator: The stepped particle system.
+        buffer (TripleBuffer): Receives a frame after every step.
+        recorder: Optional object whose `step()` is called after every step.
+        steps (int): Number of steps performed.
+        steps_per_second (float): Step rate measured over roughly the last second.
+        error (Exception): The exception that stopped the thread, if any.
+    """
+
+    def __init__(self, particle_creator, buffer: TripleBuffer, recorder=None, max_steps_per_second: float = None):
+        """
+        Args:
+            particle_creator: The particle system to step.
+            buffer (TripleBuffer): Buffer that receives the frames.
+            recorder (optional): Called with `step()` after every step.
+            max_steps_per_second (float, optional): Upper limit for the step rate.
+        """
+        super().__init__(name="PhysicsThread", daemon=True)
+        self.particle_creator = particle_creator
+        self.buffer = buffer
+        self.recorder = recorder
+        self.min_step_time = 1.0 / max_steps_per_second if max_steps_per_second else 0.0
+        self.steps = 0
+        self.steps_per_second = 0.0
+        self.error = None
+        self.stop_event = threading.Event()
+
+    def run(self):
+        jitted = isinstance(self.particle_creator, CreateParticle)
+        window_start = time.perf_counter()
+        window_steps = 0
+        try:
+            while not self.stop_event.is_set():
+                step_start = time.perf_counter()
+                if jitted:
+                    step_particles(self.particle_creator)
+                else:
+                    self.particle_creator.update_positions()
+                if self.recorder is not None:
+                    self.recorder.step()
+                self.steps += 1
+                self.publish()
+
+                now = time.perf_counter()
+                window_steps += 1
+                if now - window_start >= 1.0:
+                    self.steps_per_second = window_steps / (now - window_start)
+                    window_start = now
+                    window_steps = 0
+                if self.min_step_time:
+                    self.stop_event.wait(max(0.0, self.min_step_time - (now - step_start)))
+        except Exception as exc:
+            self.error = exc
+
+    def publish(self):
+        """
+        Copies the current positions (and colors, if the layout changed) into the back frame.
+        """
+        frame = self.buffer.write_frame()
+        state = getattr(self.particle_creator, "state", None)
+        if isinstance(state, np.ndarray):
+            x, y = state[0], state[1]
+            colors = self.particle_creator.colors
+            layout_version = self.particle_creator.layout_version
+        else:
+            particles = self.particle_creator.get_positions_and_colors()
+            x, y = particles[:, 0], particles[:, 1]
+            colors = particles[:, 2] if particles.shape[1] > 2 else np.full(x.shape[0], -1)
+            layout_version = None
+
+        if frame.x.shape != x.shape:
+            frame.x = np.empty(x.shape[0], dtype=np.float32)
+            frame.y = np.empty(x.shape[0], dtype=np.float32)
+            frame.colors = np.empty(x.shape[0], dtype=np.int16)
+            frame.layout_version = -1
+        frame.x[:] = x
+        frame.y[:] = y
+        if layout_version is None or layout_version != frame.layout_version:
+            frame.colors[:] = colors
+            # Sources without a layout version get a fresh one per frame
+            frame.layout_version = layout_version if layout_version is not None else -2 - self.steps
+        frame.step = self.steps
+        self.buffer.publish()
+
+    def stop(self, timeout: float = None):
+        """
+        Asks the thread to stop after the current step and waits for it.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the thread.
+        """
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,251 @@
+import threading
+
+import numpy as np
+
+from particle_life_simulator.Class_Recorder import open_trajectory
+
+
+class TrajectoryPlayer:
+    """
+    Replays a recorded trajectory through the particle system interface.
+
+    The player exposes `update_positions`, `get_positions_and_colors` and
+    `num_particles` like `CreateParticle`, so `Simulation` and the GUI can
+    show a recording instead of a live simulation. `update_positions`
+    advances the current frame by `speed` frames (negative speeds play
+    backwards) unless playback is paused.
+
+    Frames are read from a memory map of the trajectory file, so seeking to
+    any frame does not touch earlier ones. A background thread prepares the
+    next `prefetch` frames along the playback direction, so the frame the
+    render loop asks for is usually already paged in and converted.
+
+    Attributes:
+        path (str): Path of the trajectory file.
+        metadata (dict): Metadata of the trajectory (see `TrajectoryRecorder`).
+        frames (np.memmap): All frames, shape (num_frames, num_fields, num_particles).
+        num_frames (int): Number of frames in the file.
+        num_particles (int): Number of particles per frame.
+        frame (int): Index of the current frame.
+        speed (int): Frames advanced per `update_positions` call.
+        playing (bool): False while playback is paused.
+        loop (bool): Restart at the other end instead of pausing at the last frame.
+        prefetch (int): Number of frames prepared ahead of the current one.
+    """
+
+    def __init__(self, path, prefetch: int = 4, loop: bool = False):
+        """
+        Opens a trajectory and starts the prefetch thread.
+
+        Args:
+            path (str): Path of the trajectory file.
+            prefetch (int, optional): Number of frames to prepare ahead.
+            loop (bool, optional): Loop playback instead of pausing at the end.
+
+        Raises:
+            ValueError: If the trajectory has no frames or lacks the x and y fields.
+        """
+        self.path = path
+        self.metadata, self.frames = open_trajectory(path)
+        fields = self.metadata["fields"]
+        if "x" not in fields or "y" not in fields:
+            raise ValueError("The trajectory does not contain positions.")
+        self.rows = [fields.index("x"), fields.index("y")]
+        if "color" in fields:
+            self.rows.append(fields.index("color"))
+
+        self.num_frames = self.frames.shape[0]
+        if self.num_frames == 0:
+            raise ValueError("The trajectory has no frames.")
+        self.num_particles = self.metadata["num_particles"]
+        self.particle_ids = np.arange(self.num_particles, dtype=np.int32)
+        self.layout_version = 0
+
+        self.frame = 0
+        self.speed = 1
+        self.playing = True
+        self.loop = loop
+        self.prefetch = prefetch
+
+        self.cache = {}
+        self.condition = threading.Condition()
+        self.closed = False
+        self.prefetcher = threading.Thread(target=self.prefetch_loop, name="TrajectoryPrefetch", daemon=True)
+        self.prefetcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def step_count(self) -> int:
+        """int: The simulation step of the current frame."""
+        return self.frame * self.metadata["interval"]
+
+    def update_positions(self):
+        """
+        Advances playback by `speed` frames, unless it is paused.
+        """
+        if self.playing:
+            self.seek(self.frame + self.speed, from_playback=True)
+
+    def get_positions_and_colors(self) -> np.ndarray:
+        """
+        Returns the positions and colors of the current frame.
+
+        Returns:
+            np.ndarray: An array of shape (num_particles, 3) with the columns x, y and
+                color, or (num_particles, 2) if the trajectory has no colors.
+        """
+        frame = self.frame
+        with self.condition:
+            data = self.cache.get(frame)
+        if data is None:
+            data = self.load_frame(frame)
+            with self.condition:
+                self.cache[frame] = data
+        return data
+
+    def seek(self, frame: int, from_playback: bool = False):
+        """
+        Jumps to a frame.
+
+        Out-of-range frames are clamped, or wrapped around if `loop` is set.
+        Reaching either end during playback pauses it unless `loop` is set.
+
+        Args:
+            frame (int): Index of the frame to show.
+            from_playback (bool, optional): True if called by `update_positions`.
+        """
+        if self.loop:
+            frame %= self.num_frames
+        elif frame < 0 or frame >= self.num_frames:
+            frame = min(max(frame, 0), self.num_frames - 1)
+            if from_playback:
+                self.playing = False
+        with self.condition:
+            self.frame = frame
+            self.condition.notify_all()
+
+    def toggle_pause(self):
+        """
+        Pauses or resumes playback.
+        """
+        self.playing = not self.playing
+
+    def set_speed(self, speed: int):
+        """
+        Sets the number of frames advanced per update.
+
+        Args:
+            speed (int): Frames per update; negative values play backwards.
+
+        Raises:
+            ValueError: If `speed` is zero.
+        """
+        if speed == 0:
+            raise ValueError("speed must not be zero; use toggle_pause to stop playback.")
+        with self.condition:
+            self.speed = int(speed)
+            self.condition.notify_all()
+
+    def handle_key(self, key: str) -> bool:
+        """
+        Applies a playback key binding.
+
+        Space pauses and resumes, Right and Left step one frame, Up and Down
+        double and halve the speed, R reverses the direction, Home and End
+        jump to the first and the last frame.
+
+        Args:
+            key (str): Name of the pressed key.
+
+        Returns:
+            bool: True if the key is a playback key.
+        """
+        if key == "Space":
+            self.toggle_pause()
+        elif key == "Right":
+            self.seek(self.frame + 1)
+        elif key == "Left":
+            self.seek(self.frame - 1)
+        elif key == "Up":
+            self.set_speed(self.speed * 2)
+        elif key == "Down":
+            self.set_speed(int(np.sign(self.speed)) * max(1, abs(self.speed) // 2))
+        elif key == "R":
+            self.set_speed(-self.speed)
+        elif key == "Home":
+            self.seek(0)
+        elif key == "End":
+            self.seek(self.num_frames - 1)
+        else:
+            return False
+        return True
+
+    def load_frame(self, frame: int) -> np.ndarray:
+        """
+        Reads a frame from the memory map into a new (num_particles, 3) array.
+
+        Args:
+            frame (int): Index of the frame.
+
+        Returns:
+            np.ndarray: The positions and colors of the frame, see `get_positions_and_colors`.
+        """
+        data = np.empty((self.num_particles, len(self.rows)), dtype=np.float32)
+        for column, row in enumerate(self.rows):
+            data[:, column] = self.frames[frame, row]
+        return data
+
+    def upcoming_frames(self) -> list:
+        """
+        Lists the current frame and the next `prefetch` frames along the playback direction.
+
+        Returns:
+            list: Frame indices, without duplicates.
+        """
+        upcoming = []
+        for k in range(self.prefetch + 1):
+            frame = self.frame + k * self.speed
+            if self.loop:
+                frame %= self.num_frames
+            elif frame < 0 or frame >= self.num_frames:
+                break
+            if frame not in upcoming:
+                upcoming.append(frame)
+        return upcoming
+
+    def prefetch_loop(self):
+        """
+        Keeps the upcoming frames in the cache until `close` is called.
+        """
+        while True:
+            with self.condition:
+                while not self.closed:
+                    upcoming = self.upcoming_frames()
+                    missing = [frame for frame in upcoming if frame not in self.cache]
+                    if missing:
+                        break
+                    self.condition.wait()
+                if self.closed:
+                    return
+                for frame in list(self.cache):
+                    if frame not in upcoming:
+                        del self.cache[frame]
+
+            data = self.load_frame(missing[0])
+            with self.condition:
+                self.cache[missing[0]] = data
+
+    def close(self):
+        """
+        Stops the prefetch thread and drops the cached frames.
+        """
+        with self.condition:
+            self.closed = True
+            self.cache.clear()
+            self.condition.notify_all()
+        self.prefetcher.join()
@@ -0,0 +1,242 @@
+import json
+import queue
+import threading
+import time
+
+import numpy as np
+from numba import njit, prange
+
+TRAJECTORY_MAGIC = b"PLTRAJ01"
+HEADER_SIZE = 4096
+FIELDS = ("x", "y", "vx", "vy", "color")
+
+
+class TrajectoryRecorder:
+    """
+    Appends snapshots of a particle system to a binary trajectory file.
+
+    The file starts with a `HEADER_SIZE` byte header (magic plus JSON
+    metadata), followed by fixed-size frames of shape (num_fields, N)
+    float32. Frames are stored in particle ID order, so spatial reordering
+    does not shuffle the trajectory of a particle. Because all frames have
+    the same size, `open_trajectory` can map the file as an `np.memmap`
+    of shape (frames, num_fields, N) for zero-copy access to any frame.
+
+    Snapshots are copied into one of `num_buffers` preallocated staging
+    buffers and handed to a background thread that writes them to disk,
+    so the step loop only pays for the copy. If the writer falls behind
+    and all buffers are in flight, `record` waits for a free buffer; the
+    time spent waiting is accumulated in `stall_time`.
+
+    Attributes:
+        path (str): Path of the trajectory file.
+        particle_creator: The recorded system (`CreateParticle` or any object
+            exposing `state`, `colors`, `particle_ids` and `num_particles`).
+        interval (int): Record every `interval`-th call of `step`.
+        fields (tuple): Recorded fields, a subset of `FIELDS` in any order.
+        frames_recorded (int): Number of frames handed to the writer.
+        stall_time (float): Seconds `record` spent waiting for a free staging buffer.
+    """
+
+    def __init__(self, path, particle_creator, interval: int = 1, fields=FIELDS, num_buffers: int = 4):
+        """
+        Creates the trajectory file and starts the writer thread.
+
+        Args:
+            path (str): Path of the trajectory file; an existing file is overwritten.
+            particle_creator: The particle system to record.
+            interval (int, optional): Record every `interval`-th step.
+            fields (tuple, optional): Fields to record, see `FIELDS`.
+            num_buffers (int, optional): Number of staging buffers.
+
+        Raises:
+            ValueError: If `interval` or `num_buffers` is smaller than 1 or a field is unknown.
+        """
+        if interval < 1 or num_buffers < 1:
+            raise ValueError("interval and num_buffers must be at least 1.")
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+
+        self.path = path
+        self.particle_creator = particle_creator
+        self.interval = interval
+        self.fields = tuple(fields)
+        self.field_rows = np.array([FIELDS.index(field) for field in self.fields], dtype=np.int64)
+        self.num_particles = particle_creator.num_particles
+        self.steps_seen = 0
+        self.frames_recorded = 0
+        self.stall_time = 0.0
+        self.error = None
+
+        self.free_buffers = queue.Queue()
+        for _ in range(num_buffers):
+            self.free_buffers.put(np.empty((len(self.fields), self.num_particles), dtype=np.float32))
+        self.pending = queue.Queue()
+
+        self.file = open(path, "wb")
+        self.file.write(make_header({
+            "num_particles": self.num_particles,
+            "fields": list(self.fields),
+            "dtype": "float32",
+            "interval": interval,
+            "order": "particle_id",
+            "header_size": HEADER_SIZE,
+        }))
+        self.writer = threading.Thread(target=self.write_loop, name="TrajectoryWriter", daemon=True)
+        self.writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def step(self):
+        """
+        Notifies the recorder that a simulation step was performed.
+
+        Records a frame on every `interval`-th call, starting with the first.
+        """
+        if self.steps_seen % self.interval == 0:
+            self.record()
+        self.steps_seen += 1
+
+    def record(self):
+        """
+        Snapshots the current state into a staging buffer and queues it for writing.
+
+        Raises:
+            RuntimeError: If the writer thread failed or the recorder is closed.
+            ValueError: If the number of particles changed since the recorder was created.
+        """
+        if self.error is not None:
+            raise RuntimeError(f"Trajectory writer failed: {self.error!r}")
+        if self.file is None:
+            raise RuntimeError("Recorder is closed.")
+        if self.particle_creator.num_particles != self.num_particles:
+            raise ValueError("The number of particles changed during recording.")
+
+        try:
+            buffer = self.free_buffers.get_nowait()
+        except queue.Empty:
+            start = time.perf_counter()
+            buffer = self.free_buffers.get()
+            self.stall_time += time.perf_counter() - start
+
+        snapshot_fields(
+            self.particle_creator.state,
+            self.particle_creator.colors,
+            self.particle_creator.particle_ids,
+            self.field_rows,
+            buffer,
+        )
+        self.pending.put(buffer)
+        self.frames_recorded += 1
+
+    def write_loop(self):
+        """
+        Writes queued frames to the file until `close` sends the stop marker.
+        """
+        while True:
+            buffer = self.pending.get()
+            if buffer is None:
+                break
+            try:
+                if self.error is None:
+                    self.file.write(memoryview(buffer))
+            except OSError as exc:
+                self.error = exc
+            self.free_buffers.put(buffer)
+
+    def close(self):
+        """
+        Writes all queued frames and closes the file.
+
+        Raises:
+            RuntimeError: If the writer thread failed.
+        """
+        if self.file is None:
+            return
+        self.pending.put(None)
+        self.writer.join()
+        self.file.close()
+        self.file = None
+        if self.error is not None:
+            raise RuntimeError(f"Trajectory writer failed: {self.error!r}")
+
+
+def make_header(metadata: dict) -> bytes:
+    """
+    Encodes trajectory metadata as a fixed-size header.
+
+    Args:
+        metadata (dict): JSON-serialisable metadata.
+
+    Returns:
+        bytes: `HEADER_SIZE` bytes: the magic, the JSON metadata and space padding.
+
+    Raises:
+        ValueError: If the metadata does not fit into the header.
+    """
+    header = TRAJECTORY_MAGIC + json.dumps(metadata).encode("utf-8")
+    if len(header) > HEADER_SIZE:
+        raise ValueError("Trajectory metadata does not fit into the header.")
+    return header.ljust(HEADER_SIZE, b" ")
+
+
+def open_trajectory(path):
+    """
+    Opens a trajectory file for zero-copy random access.
+
+    A partially written last frame (e.g. after a crash) is ignored.
+
+    Args:
+        path (str): Path of the trajectory file.
+
+    Returns:
+        Tuple[dict, np.memmap]: The metadata and a read-only float32 memmap of
+            shape (frames, num_fields, num_particles).
+
+    Raises:
+        ValueError: If the file is not a trajectory file.
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+        file.seek(0, 2)
+        size = file.tell()
+    if len(header) != HEADER_SIZE or not header.startswith(TRAJECTORY_MAGIC):
+        raise ValueError(f"{path} is not a trajectory file.")
+
+    metadata = json.loads(header[len(TRAJECTORY_MAGIC):].decode("utf-8"))
+    frame_shape = (len(metadata["fields"]), metadata["num_particles"])
+    frame_bytes = 4 * frame_shape[0] * frame_shape[1]
+    num_frames = (size - HEADER_SIZE) // frame_bytes if frame_bytes else 0
+    if num_frames == 0:
+        return metadata, np.zeros((0,) + frame_shape, dtype=np.float32)
+    frames = np.memmap(
+        path, dtype=np.float32, mode="r", offset=HEADER_SIZE, shape=(num_frames,) + frame_shape
+    )
+    return metadata, frames
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def snapshot_fields(state, colors, particle_ids, field_rows, out):
+    """
+    Copies the selected fields of all particles into a staging buffer in ID order.
+
+    Args:
+        state (np.ndarray): Particle state of shape (4, N) with rows x, y, vx and vy.
+        colors (np.ndarray): Integer color indices of shape (N,).
+        particle_ids (np.ndarray): Stable ID of the particle in each slot, shape (N,).
+        field_rows (np.ndarray): Index into `FIELDS` of every recorded field.
+        out (np.ndarray): float32 buffer of shape (len(field_rows), N).
+    """
+    for i in prange(state.shape[1]):
+        pid = particle_ids[i]
+        for f in range(field_rows.shape[0]):
+            row = field_rows[f]
+            if row < 4:
+                out[f, pid] = state[row, i]
+            else:
+                out[f, pid] = colors[i]
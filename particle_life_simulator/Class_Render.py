@@ -0,0 +1,423 @@
+import math
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+from numba import njit, prange
+
+from particle_life_simulator.Class_Particle import bin_by_key
+
+# Colors of the particle groups, shared with the GUI.
+DEFAULT_COLOR_LOOKUP = {
+    0: (1.0, 0.0, 0.0),  # Red
+    1: (0.0, 0.0, 1.0),  # Blue
+    2: (0.0, 1.0, 0.0),  # Green
+    3: (1.0, 1.0, 0.0),  # Yellow
+    4: (1.0, 0.0, 1.0),  # Magenta
+}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def create_palette(color_lookup):
+    """
+    Converts a color dictionary into a palette array indexed by color.
+
+    Args:
+        color_lookup (dict): Dictionary mapping color indices to RGB colors.
+
+    Returns:
+        np.ndarray: float32 array of shape (max index + 1, 3); missing indices are white.
+    """
+    palette = np.ones((max(color_lookup) + 1 if color_lookup else 0, 3), dtype=np.float32)
+    for key, value in color_lookup.items():
+        if key >= 0:
+            palette[key] = value
+    return palette
+
+
+class FrameRenderer:
+    """
+    Draws particles into an RGB image on the CPU, without OpenGL or a display.
+
+    Particles are drawn as filled discs of `particle_size` pixels diameter
+    in the palette color of their group, like the markers of the GUI. The
+    world (0..x_max, 0..y_max) is stretched over the whole image, with the
+    y-axis pointing up as in the GUI; image row 0 is the top row.
+
+    Attributes:
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        x_max (float): World width.
+        y_max (float): World height.
+        particle_size (float): Disc diameter in pixels.
+        palette (np.ndarray): uint8 RGB palette of shape (K, 3), see `create_palette`.
+        background (np.ndarray): uint8 RGB background color.
+    """
+
+    def __init__(self, width: int, height: int, x_max: float, y_max: float, particle_size: float = 3,
+                 color_lookup: dict = None, background=(0.0, 0.0, 0.0)):
+        """
+        Args:
+            width (int): Image width in pixels.
+            height (int): Image height in pixels.
+            x_max (float): World width.
+            y_max (float): World height.
+            particle_size (float, optional): Disc diameter in pixels.
+            color_lookup (dict, optional): Colors of the particle groups (defaults to the GUI colors).
+            background (tuple, optional): RGB background color with components in [0, 1].
+
+        Raises:
+            ValueError: If the image or the world is empty or `particle_size` is not positive.
+        """
+        if width < 1 or height < 1 or x_max <= 0 or y_max <= 0:
+            raise ValueError("Image and world size must be positive.")
+        if particle_size <= 0:
+            raise ValueError("particle_size must be positive.")
+        self.width = width
+        self.height = height
+        self.x_max = x_max
+        self.y_max = y_max
+        self.particle_size = particle_size
+        lookup = color_lookup if color_lookup else DEFAULT_COLOR_LOOKUP
+        self.palette = to_uint8(create_palette(lookup))
+        self.background = to_uint8(np.asarray(background, dtype=np.float32))
+
+    def new_image(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: An uninitialised uint8 image of shape (height, width, 3).
+        """
+        return np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def render(self, particles: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Draws the output of `get_positions_and_colors`.
+
+        Args:
+            particles (np.ndarray): Array of shape (N, 3) with the columns x, y and color
+                index; without the color column all particles are drawn white.
+            out (np.ndarray, optional): Image to draw into, see `new_image`.
+
+        Returns:
+            np.ndarray: The image.
+        """
+        x = np.ascontiguousarray(particles[:, 0], dtype=np.float32)
+        y = np.ascontiguousarray(particles[:, 1], dtype=np.float32)
+        if particles.shape[1] > 2:
+            color_indices = particles[:, 2].astype(np.int16)
+        else:
+            color_indices = np.full(particles.shape[0], -1, dtype=np.int16)
+        return self.render_state(x, y, color_indices, out)
+
+    def render_state(self, x: np.ndarray, y: np.ndarray, color_indices: np.ndarray,
+                     out: np.ndarray = None) -> np.ndarray:
+        """
+        Draws particles given as separate position and color arrays (e.g. the rows of a state).
+
+        Args:
+            x (np.ndarray): x-positions of shape (N,).
+            y (np.ndarray): y-positions of shape (N,).
+            color_indices (np.ndarray): Integer color index of every particle.
+            out (np.ndarray, optional): Image to draw into, see `new_image`.
+
+        Returns:
+            np.ndarray: The image.
+        """
+        if out is None:
+            out = self.new_image()
+        rasterize_particles(
+            x, y, color_indices, self.palette, self.background,
+            self.width / self.x_max, self.height / self.y_max, self.particle_size / 2.0, out
+        )
+        return out
+
+
+class FrameExporter:
+    """
+    Renders a particle system every `interval` steps and writes the images in the background.
+
+    The exporter is driven like a `TrajectoryRecorder`: its `step()` is
+    called after every simulation step, so it can be passed as the
+    `recorder` of a `HeadlessSimulation`. Images are drawn into one of a
+    set of preallocated buffers on the stepping thread and handed to a pool
+    of writer threads, which encode and write them while the simulation
+    continues. zlib releases the GIL, so PNG frames are encoded in parallel.
+    If all buffers are in flight, `record` waits for a free one; the time
+    spent waiting is accumulated in `stall_time`.
+
+    Two outputs are supported:
+        - A PNG sequence if `path` ends in ".png". It must contain a format
+          field for the frame number, e.g. "frames/frame_{:06d}.png".
+        - Otherwise raw video: all frames appended to one file as packed
+          rgb24, which e.g. `ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH` reads.
+          Frames must stay in order, so a single writer thread is used.
+
+    Attributes:
+        path (str): Output file or PNG file name pattern.
+        particle_creator: The rendered system (`CreateParticle` or any object exposing
+            `get_positions_and_colors`).
+        renderer (FrameRenderer): Draws the images.
+        interval (int): Render every `interval`-th call of `step`.
+        raw (bool): True for raw video, False for a PNG sequence.
+        frames_rendered (int): Number of frames handed to the writers.
+        stall_time (float): Seconds `record` spent waiting for a free buffer.
+    """
+
+    def __init__(self, path, particle_creator, renderer: FrameRenderer, interval: int = 1,
+                 num_workers: int = 4, num_buffers: int = None, compression: int = 6):
+        """
+        Opens the output and starts the writer threads.
+
+        Args:
+            path (str): Output file, or a PNG file name pattern (see above).
+            particle_creator: The particle system to render.
+            renderer (FrameRenderer): Renderer of the images.
+            interval (int, optional): Render every `interval`-th step.
+            num_workers (int, optional): Number of PNG writer threads.
+            num_buffers (int, optional): Number of image buffers (defaults to twice the writers).
+            compression (int, optional): zlib compression level of the PNG files.
+
+        Raises:
+            ValueError: If `interval` or `num_workers` is smaller than 1, or a PNG
+                pattern has no format field.
+        """
+        if interval < 1 or num_workers < 1:
+            raise ValueError("interval and num_workers must be at least 1.")
+        self.path = str(path)
+        self.raw = not self.path.lower().endswith(".png")
+        if not self.raw and self.path.format(0) == self.path:
+            raise ValueError("PNG paths need a format field for the frame number, e.g. 'frame_{:06d}.png'.")
+        if self.raw:
+            num_workers = 1
+
+        self.particle_creator = particle_creator
+        self.renderer = renderer
+        self.interval = interval
+        self.compression = compression
+        self.steps_seen = 0
+        self.frames_rendered = 0
+        self.stall_time = 0.0
+        self.error = None
+
+        if num_buffers is None:
+            num_buffers = 2 * num_workers
+        self.free_buffers = queue.Queue()
+        for _ in range(max(num_buffers, 1)):
+            self.free_buffers.put(renderer.new_image())
+        self.pending = queue.Queue()
+
+        self.file = open(self.path, "wb") if self.raw else None
+        self.closed = False
+        self.workers = [
+            threading.Thread(target=self.write_loop, name=f"FrameWriter{k}", daemon=True)
+            for k in range(num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def step(self):
+        """
+        Notifies the exporter that a simulation step was performed.
+
+        Renders a frame on every `interval`-th call, starting with the first.
+        """
+        if self.steps_seen % self.interval == 0:
+            self.record()
+        self.steps_seen += 1
+
+    def record(self):
+        """
+        Renders the current state into a free buffer and queues it for writing.
+
+        Raises:
+            RuntimeError: If a writer thread failed or the exporter is closed.
+        """
+        if self.error is not None:
+            raise RuntimeError(f"Frame writer failed: {self.error!r}")
+        if self.closed:
+            raise RuntimeError("Exporter is closed.")
+
+        try:
+            buffer = self.free_buffers.get_nowait()
+        except queue.Empty:
+            start = time.perf_counter()
+            buffer = self.free_buffers.get()
+            self.stall_time += time.perf_counter() - start
+
+        pc = self.particle_creator
+        state = getattr(pc, "state", None)
+        if isinstance(state, np.ndarray):
+            self.renderer.render_state(state[0], state[1], pc.colors, buffer)
+        else:
+            self.renderer.render(pc.get_positions_and_colors(), buffer)
+        self.pending.put((self.frames_rendered, buffer))
+        self.frames_rendered += 1
+
+    def write_loop(self):
+        """
+        Encodes and writes queued frames until `close` sends the stop marker.
+        """
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            index, buffer = item
+            try:
+                if self.error is None:
+                    if self.raw:
+                        self.file.write(memoryview(buffer))
+                    else:
+                        data = encode_png(buffer, self.compression)
+                        with open(self.path.format(index), "wb") as file:
+                            file.write(data)
+            except OSError as exc:
+                self.error = exc
+            self.free_buffers.put(buffer)
+
+    def close(self):
+        """
+        Writes all queued frames and stops the writer threads.
+
+        Raises:
+            RuntimeError: If a writer thread failed.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for _ in self.workers:
+            self.pending.put(None)
+        for worker in self.workers:
+            worker.join()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.error is not None:
+            raise RuntimeError(f"Frame writer failed: {self.error!r}")
+
+
+def to_uint8(colors: np.ndarray) -> np.ndarray:
+    """
+    Converts colors with components in [0, 1] to uint8.
+    """
+    return np.round(np.clip(colors, 0.0, 1.0) * 255).astype(np.uint8)
+
+
+def encode_png(image: np.ndarray, compression: int = 6) -> bytes:
+    """
+    Encodes an RGB image as PNG.
+
+    Args:
+        image (np.ndarray): uint8 image of shape (height, width, 3), row 0 at the top.
+        compression (int, optional): zlib compression level.
+
+    Returns:
+        bytes: The PNG file (8 bit RGB, no filtering, not interlaced).
+    """
+    height, width = image.shape[:2]
+    scanlines = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    scanlines[:, 1:] = image.reshape(height, 3 * width)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(scanlines.tobytes(), compression))
+        + chunk(b"IEND", b"")
+    )
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def rasterize_particles(x, y, color_indices, palette, background, scale_x, scale_y, radius, out):
+    """
+    Draws every particle as a filled disc into an RGB image.
+
+    Particles are sorted by the image row of their center with a counting
+    sort. Every image row is then drawn by one thread from the particles
+    whose disc reaches it, so no two threads write the same pixel and the
+    image does not depend on the thread count. Overlapping discs are drawn
+    in the order of their center row, then of their index.
+
+    Args:
+        x (np.ndarray): x-positions of shape (N,).
+        y (np.ndarray): y-positions of shape (N,).
+        color_indices (np.ndarray): Integer color index of every particle.
+        palette (np.ndarray): uint8 RGB palette of shape (K, 3); other indices are drawn white.
+        background (np.ndarray): uint8 RGB background color.
+        scale_x (float): Pixels per world unit along x.
+        scale_y (float): Pixels per world unit along y.
+        radius (float): Disc radius in pixels; a particle always covers the pixel of its center.
+        out (np.ndarray): uint8 image of shape (height, width, 3) to draw into; row 0 is the top.
+    """
+    height = out.shape[0]
+    width = out.shape[1]
+    num_particles = x.shape[0]
+    reach = int(math.ceil(radius))
+    num_rows = height + 2 * reach
+
+    # Center row of every particle, shifted by `reach` so that discs whose
+    # center lies just outside the image still get drawn
+    row = np.empty(num_particles, dtype=np.int32)
+    for i in prange(num_particles):
+        cx = x[i] * scale_x
+        cy = height - y[i] * scale_y
+        r = int(math.floor(cy)) + reach
+        if 0 <= r < num_rows and -reach - 1 < cx < width + reach + 1:
+            row[i] = r
+        else:
+            row[i] = -1
+
+    row_start, row_particles = bin_by_key(row, num_rows)
+
+    radius_sq = radius * radius
+    for py in prange(height):
+        for px in range(width):
+            for k in range(3):
+                out[py, px, k] = background[k]
+
+        # Shifted rows of the centers whose disc can reach image row py
+        for r in range(py, py + 2 * reach + 1):
+            for idx in range(row_start[r], row_start[r + 1]):
+                i = row_particles[idx]
+                cx = x[i] * scale_x
+                cy = height - y[i] * scale_y
+                dy = py + 0.5 - cy
+                lo = width
+                hi = -1
+                if dy * dy <= radius_sq:
+                    half = math.sqrt(radius_sq - dy * dy)
+                    lo = int(math.ceil(cx - half - 0.5))
+                    hi = int(math.floor(cx + half - 0.5))
+                if r - reach == py:
+                    center = int(math.floor(cx))
+                    lo = min(lo, center)
+                    hi = max(hi, center)
+                lo = max(lo, 0)
+                hi = min(hi, width - 1)
+                if lo > hi:
+                    continue
+
+                c = color_indices[i]
+                if 0 <= c < palette.shape[0]:
+                    red = palette[c, 0]
+                    green = palette[c, 1]
+                    blue = palette[c, 2]
+                else:
+                    red = green = blue = np.uint8(255)
+                for px in range(lo, hi + 1):
+                    out[py, px, 0] = red
+                    out[py, px, 1] = green
+                    out[py, px, 2] = blue
+
@@ -0,0 +1,579 @@
+import json
+import socket
+import struct
+import threading
+import zlib
+
+import numpy as np
+from numba import njit, prange
+
+STREAM_MAGIC = b"PLSTRM01"
+# Largest quantised coordinate; 0 maps to 0 and QUANT_MAX to x_max (or y_max).
+QUANT_MAX = 65535
+# Frame header: frame kind, simulation step, payload size in bytes.
+FRAME_HEADER = struct.Struct("<BqI")
+KEYFRAME = 1
+DELTA = 2
+# Consecutive offers the sender must keep up with before the frame skip is halved.
+RELAX_OFFERS = 8
+
+
+class StreamServer:
+    """
+    Publishes the particle positions of a running simulation to TCP clients.
+
+    The server is driven like a `TrajectoryRecorder`: its `step()` is called
+    after every simulation step, so it can be passed as the `recorder` of a
+    `HeadlessSimulation`. Clients connect at any time and first receive the
+    world size and the colors of all particles, which are sent only once.
+
+    Positions are quantised to uint16 relative to `x_max` and `y_max` and
+    sent in particle ID order. Every `keyframe_interval`-th frame of a client
+    is a keyframe; the others carry the difference to the client's last
+    keyframe (modulo 2**16, so wrapping around the borders costs nothing).
+    Deltas only depend on the keyframe, so any of them can be dropped. The
+    two bytes of every value are split into separate planes and compressed
+    with zlib; since particles move little between frames, the high bytes
+    of the deltas are nearly constant and compress well.
+
+    Every client has its own sender thread and frame skip. A frame is only
+    quantised on steps on which at least one client is due. If the sender
+    of a client is still busy with the previous frame when the next one is
+    due, the client cannot keep up (the socket blocks once the client stops
+    reading): the waiting frame is replaced by the newer one and the skip is
+    doubled. After `RELAX_OFFERS` frames sent in time, the skip is halved.
+
+    Attributes:
+        particle_creator: The published system (`CreateParticle` or any object
+            exposing `state`, `colors`, `particle_ids`, `num_particles`, `x_max` and `y_max`).
+        keyframe_interval (int): Frames per client between two keyframes.
+        max_skip (int): Upper bound of the frame skip.
+        compression (int): zlib compression level (0 to 9).
+        steps_seen (int): Number of `step` calls.
+        connections (list): The `StreamConnection` of every connected client.
+    """
+
+    def __init__(self, particle_creator, host: str = "127.0.0.1", port: int = 0,
+                 keyframe_interval: int = 30, max_skip: int = 64, compression: int = 1):
+        """
+        Opens the listening socket and starts accepting clients.
+
+        Args:
+            particle_creator: The particle system to publish.
+            host (str, optional): Address to listen on.
+            port (int, optional): Port to listen on (0 picks a free port, see `address`).
+            keyframe_interval (int, optional): Frames between two keyframes.
+            max_skip (int, optional): Largest number of steps between two frames of a client.
+            compression (int, optional): zlib compression level.
+
+        Raises:
+            ValueError: If `keyframe_interval` or `max_skip` is smaller than 1.
+        """
+        if keyframe_interval < 1 or max_skip < 1:
+            raise ValueError("keyframe_interval and max_skip must be at least 1.")
+        self.particle_creator = particle_creator
+        self.keyframe_interval = keyframe_interval
+        self.max_skip = max_skip
+        self.compression = compression
+        self.steps_seen = 0
+        self.connections = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+        self.socket = socket.create_server((host, port))
+        self.socket.settimeout(0.2)
+        self.acceptor = threading.Thread(target=self.accept_loop, name="StreamAccept", daemon=True)
+        self.acceptor.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def address(self) -> tuple:
+        """tuple: The (host, port) the server listens on."""
+        return self.socket.getsockname()[:2]
+
+    def metadata(self) -> dict:
+        """
+        Describes the stream for the handshake.
+
+        Returns:
+            dict: The particle count, the world size and the encoding parameters.
+        """
+        pc = self.particle_creator
+        return {
+            "num_particles": int(pc.num_particles),
+            "x_max": float(pc.x_max),
+            "y_max": float(pc.y_max),
+            "quant_max": QUANT_MAX,
+            "keyframe_interval": self.keyframe_interval,
+            "order": "particle_id",
+        }
+
+    def accept_loop(self):
+        """
+        Accepts clients until `close` is called.
+        """
+        while not self.closed:
+            try:
+                client, _ = self.socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                connection = StreamConnection(client, self.metadata(), self.keyframe_interval,
+                                              self.max_skip, self.compression)
+            except OSError:
+                # The client hung up before it could be registered
+                client.close()
+                continue
+            with self.lock:
+                self.connections.append(connection)
+
+    def step(self):
+        """
+        Notifies the server that a simulation step was performed.
+
+        Quantises the positions once and offers them to every client whose
+        frame skip has elapsed. Clients that disconnected are dropped.
+        """
+        step = getattr(self.particle_creator, "step_count", self.steps_seen)
+        self.steps_seen += 1
+        with self.lock:
+            self.connections = [c for c in self.connections if not c.closed]
+            due = [c for c in self.connections if c.is_due(step)]
+        if not due:
+            return
+
+        pc = self.particle_creator
+        frame = np.empty((2, pc.num_particles), dtype=np.uint16)
+        quantize_positions(pc.state, pc.particle_ids, pc.x_max, pc.y_max, frame)
+        colors = None
+        for connection in due:
+            if not connection.greeted and colors is None:
+                colors = np.empty(pc.num_particles, dtype=np.int16)
+                colors[pc.particle_ids] = pc.colors
+            connection.offer(frame, step, colors)
+
+    def stats(self) -> list:
+        """
+        Returns the transfer statistics of the connected clients.
+
+        Returns:
+            list: One dict per client with the keys `address`, `skip`,
+                `frames_sent`, `frames_dropped`, `keyframes_sent` and `bytes_sent`.
+        """
+        with self.lock:
+            return [connection.stats() for connection in self.connections]
+
+    def close(self):
+        """
+        Stops accepting clients and disconnects all of them.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.acceptor.join()
+        self.socket.close()
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            connection.close()
+
+
+class StreamConnection:
+    """
+    Sends the frames offered by a `StreamServer` to one client.
+
+    The connection holds at most one frame waiting to be sent. A sender
+    thread encodes and sends it while the simulation keeps stepping.
+
+    Attributes:
+        address (tuple): Address of the client.
+        skip (int): Current number of steps between two frames.
+        greeted (bool): True once the handshake (metadata and colors) was queued.
+        closed (bool): True once the client disconnected or `close` was called.
+        frames_sent (int): Frames sent, keyframes included.
+        keyframes_sent (int): Keyframes sent.
+        frames_dropped (int): Frames replaced by a newer one before they could be sent.
+        bytes_sent (int): Bytes sent, handshake included.
+    """
+
+    def __init__(self, sock, metadata: dict, keyframe_interval: int, max_skip: int, compression: int):
+        self.socket = sock
+        self.address = sock.getpeername()[:2]
+        self.metadata = metadata
+        self.keyframe_interval = keyframe_interval
+        self.max_skip = max_skip
+        self.compression = compression
+        self.skip = 1
+        self.last_offer = None
+        self.idle_offers = 0
+        self.greeted = False
+        self.colors = None
+        self.pending = None
+        self.closed = False
+        self.frames_sent = 0
+        self.keyframes_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.condition = threading.Condition()
+        self.sender = threading.Thread(target=self.send_loop, name="StreamSender", daemon=True)
+        self.sender.start()
+
+    def is_due(self, step: int) -> bool:
+        """
+        Checks whether the frame skip of the client has elapsed.
+
+        Args:
+            step (int): The current simulation step.
+
+        Returns:
+            bool: True if the client should get the frame of this step.
+        """
+        return self.last_offer is None or step - self.last_offer >= self.skip
+
+    def offer(self, frame: np.ndarray, step: int, colors: np.ndarray = None):
+        """
+        Hands a frame to the sender thread and adapts the frame skip.
+
+        Args:
+            frame (np.ndarray): Quantised positions of shape (2, N), uint16; not modified.
+            step (int): Simulation step of the frame.
+            colors (np.ndarray, optional): Colors in particle ID order, required
+                until the handshake was queued.
+        """
+        with self.condition:
+            if not self.greeted:
+                self.colors = colors
+                self.greeted = True
+            if self.pending is not None:
+                self.frames_dropped += 1
+                self.skip = min(self.skip * 2, self.max_skip)
+                self.idle_offers = 0
+            else:
+                self.idle_offers += 1
+                if self.idle_offers >= RELAX_OFFERS and self.skip > 1:
+                    self.skip //= 2
+                    self.idle_offers = 0
+            self.pending = (step, frame)
+            self.last_offer = step
+            self.condition.notify()
+
+    def send_loop(self):
+        """
+        Sends the handshake and then the offered frames until the connection closes.
+        """
+        keyframe = None
+        frames_since_key = 0
+        try:
+            while True:
+                with self.condition:
+                    while self.pending is None and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        return
+                    step, frame = self.pending
+                    self.pending = None
+                    colors, self.colors = self.colors, None
+
+                if colors is not None:
+                    self.send(encode_handshake(self.metadata, colors))
+
+                if keyframe is None or frames_since_key >= self.keyframe_interval:
+                    kind = KEYFRAME
+                    payload = encode_frame(frame, None, self.compression)
+                    keyframe = frame
+                    frames_since_key = 0
+                    self.keyframes_sent += 1
+                else:
+                    kind = DELTA
+                    payload = encode_frame(frame, keyframe, self.compression)
+                frames_since_key += 1
+                self.send(FRAME_HEADER.pack(kind, step, len(payload)) + payload)
+                self.frames_sent += 1
+        except OSError:
+            with self.condition:
+                self.closed = True
+
+    def send(self, data: bytes):
+        self.socket.sendall(data)
+        self.bytes_sent += len(data)
+
+    def stats(self) -> dict:
+        """
+        Returns the transfer statistics of this client (see `StreamServer.stats`).
+        """
+        return {
+            "address": self.address,
+            "skip": self.skip,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "keyframes_sent": self.keyframes_sent,
+            "bytes_sent": self.bytes_sent,
+        }
+
+    def close(self):
+        """
+        Stops the sender thread and closes the socket.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sender.join()
+        self.socket.close()
+
+
+class StreamClient:
+    """
+    Receives a frame stream of a `StreamServer` and shows it like a particle system.
+
+    The client exposes `update_positions`, `get_positions_and_colors`,
+    `state`, `colors`, `layout_version` and `num_particles` like
+    `CreateParticle`, so `Simulation` and the GUI can show a remote run.
+    Frames are received and decoded by a background thread; every
+    `update_positions` call moves the newest complete frame into `state`.
+    Frames that arrive while the render loop is busy are skipped.
+
+    Attributes:
+        metadata (dict): Stream description sent by the server.
+        num_particles (int): Number of particles.
+        x_max (float): Width of the world.
+        y_max (float): Height of the world.
+        colors (np.ndarray): Color index of every particle, int16.
+        particle_ids (np.ndarray): Identity; the stream is in particle ID order.
+        layout_version (int): Always 0, the particle order never changes.
+        state (np.ndarray): Positions of the shown frame, float32 of shape (2, N).
+        step_count (int): Simulation step of the shown frame (-1 before the first frame).
+        frames_received (int): Frames received, keyframes included.
+        bytes_received (int): Bytes received, handshake included.
+        error (Exception): The error that ended the receiver thread, if any.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 10.0):
+        """
+        Connects to a server, reads the handshake and starts the receiver thread.
+
+        Args:
+            host (str): Address of the server.
+            port (int): Port of the server.
+            timeout (float, optional): Seconds to wait for the connection and the handshake.
+
+        Raises:
+            ValueError: If the server does not speak the stream protocol.
+            OSError: If the connection fails.
+        """
+        self.socket = socket.create_connection((host, port), timeout=timeout)
+        self.bytes_received = 0
+        magic = self.receive(len(STREAM_MAGIC))
+        if magic != STREAM_MAGIC:
+            self.socket.close()
+            raise ValueError("The server does not send a particle stream.")
+        (length,) = struct.unpack("<I", self.receive(4))
+        self.metadata = json.loads(self.receive(length).decode("utf-8"))
+        self.num_particles = self.metadata["num_particles"]
+        self.x_max = self.metadata["x_max"]
+        self.y_max = self.metadata["y_max"]
+        self.colors = np.frombuffer(self.receive(2 * self.num_particles), dtype=np.int16).copy()
+        self.socket.settimeout(None)
+
+        self.particle_ids = np.arange(self.num_particles, dtype=np.int32)
+        self.layout_version = 0
+        self.state = np.zeros((2, self.num_particles), dtype=np.float32)
+        self.step_count = -1
+        self.frames_received = 0
+        self.error = None
+        self.latest = None
+        self.lock = threading.Lock()
+        self.closed = False
+        self.receiver = threading.Thread(target=self.receive_loop, name="StreamReceiver", daemon=True)
+        self.receiver.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def receive(self, size: int) -> bytes:
+        """
+        Reads exactly `size` bytes from the socket.
+
+        Raises:
+            ConnectionError: If the server closed the connection.
+        """
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            count = self.socket.recv_into(view[received:])
+            if count == 0:
+                raise ConnectionError("The stream server closed the connection.")
+            received += count
+        self.bytes_received += size
+        return bytes(data)
+
+    def receive_loop(self):
+        """
+        Receives and decodes frames until the connection closes.
+        """
+        keyframe = None
+        try:
+            while not self.closed:
+                kind, step, size = FRAME_HEADER.unpack(self.receive(FRAME_HEADER.size))
+                payload = self.receive(size)
+                if kind == KEYFRAME:
+                    keyframe = decode_frame(payload, None, self.num_particles)
+                    frame = keyframe
+                elif kind == DELTA and keyframe is not None:
+                    frame = decode_frame(payload, keyframe, self.num_particles)
+                else:
+                    raise ValueError(f"Unexpected frame kind {kind}.")
+                with self.lock:
+                    self.latest = (step, frame)
+                self.frames_received += 1
+        except (OSError, ValueError) as exc:
+            if not self.closed:
+                self.error = exc
+
+    def update_positions(self):
+        """
+        Shows the newest received frame, if a new one arrived since the last call.
+        """
+        with self.lock:
+            latest, self.latest = self.latest, None
+        if latest is None:
+            return
+        step, frame = latest
+        dequantize_positions(frame, self.x_max, self.y_max, self.state)
+        self.step_count = step
+
+    def get_positions_and_colors(self) -> np.ndarray:
+        """
+        Returns the positions and colors of the shown frame.
+
+        Returns:
+            np.ndarray: An array of shape (num_particles, 3) with the columns x, y and color.
+        """
+        return np.column_stack((self.state[0], self.state[1], self.colors.astype(np.float32)))
+
+    def close(self):
+        """
+        Disconnects from the server and stops the receiver thread.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.receiver.join()
+        self.socket.close()
+
+
+def encode_handshake(metadata: dict, colors: np.ndarray) -> bytes:
+    """
+    Encodes the first message of a stream.
+
+    Args:
+        metadata (dict): Stream description, see `StreamServer.metadata`.
+        colors (np.ndarray): Colors in particle ID order.
+
+    Returns:
+        bytes: `STREAM_MAGIC`, the size of the JSON metadata as uint32, the
+            metadata and the colors as int16.
+    """
+    text = json.dumps(metadata).encode("utf-8")
+    return STREAM_MAGIC + struct.pack("<I", len(text)) + text + colors.astype("<i2").tobytes()
+
+
+def encode_frame(frame: np.ndarray, keyframe: np.ndarray = None, compression: int = 1) -> bytes:
+    """
+    Encodes quantised positions, optionally as the difference to a keyframe.
+
+    Args:
+        frame (np.ndarray): Quantised positions of shape (2, N), uint16.
+        keyframe (np.ndarray, optional): Quantised positions the client already has.
+        compression (int, optional): zlib compression level.
+
+    Returns:
+        bytes: The zlib compressed low byte plane followed by the high byte plane
+            of `frame - keyframe` (modulo 2**16), or of `frame` without a keyframe.
+    """
+    values = frame if keyframe is None else np.subtract(frame, keyframe, dtype=np.uint16)
+    planes = values.astype("<u2").view(np.uint8).reshape(-1, 2).T
+    return zlib.compress(planes.tobytes(), compression)
+
+
+def decode_frame(payload: bytes, keyframe: np.ndarray, num_particles: int) -> np.ndarray:
+    """
+    Decodes a frame written by `encode_frame`.
+
+    Args:
+        payload (bytes): The encoded frame.
+        keyframe (np.ndarray): The keyframe the frame was encoded against, or None.
+        num_particles (int): Number of particles.
+
+    Returns:
+        np.ndarray: Quantised positions of shape (2, N), uint16.
+
+    Raises:
+        ValueError: If the payload does not hold 2 * N values.
+    """
+    planes = np.frombuffer(zlib.decompress(payload), dtype=np.uint8)
+    if planes.shape[0] != 4 * num_particles:
+        raise ValueError("Frame size does not match the particle count.")
+    values = np.ascontiguousarray(planes.reshape(2, -1).T).view("<u2").reshape(2, num_particles)
+    if keyframe is None:
+        return values.astype(np.uint16)
+    return np.add(keyframe, values, dtype=np.uint16)
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def quantize_positions(state, particle_ids, x_max, y_max, out):
+    """
+    Quantises the positions to uint16 in particle ID order.
+
+    Args:
+        state (np.ndarray): Particle state whose rows 0 and 1 hold x and y.
+        particle_ids (np.ndarray): ID of the particle stored in each slot.
+        x_max (float): Width of the world, mapped to `QUANT_MAX`.
+        y_max (float): Height of the world, mapped to `QUANT_MAX`.
+        out (np.ndarray): uint16 array of shape (2, N) that receives the result.
+    """
+    scale_x = QUANT_MAX / x_max
+    scale_y = QUANT_MAX / y_max
+    for k in prange(particle_ids.shape[0]):
+        i = particle_ids[k]
+        x = min(max(state[0, k] * scale_x, 0.0), QUANT_MAX)
+        y = min(max(state[1, k] * scale_y, 0.0), QUANT_MAX)
+        out[0, i] = np.uint16(int(x + 0.5))
+        out[1, i] = np.uint16(int(y + 0.5))
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def dequantize_positions(frame, x_max, y_max, out):
+    """
+    Converts quantised positions back to world coordinates.
+
+    Args:
+        frame (np.ndarray): Quantised positions of shape (2, N), uint16.
+        x_max (float): Width of the world.
+        y_max (float): Height of the world.
+        out (np.ndarray): float32 array of shape (2, N) that receives the positions.
+    """
+    scale_x = x_max / QUANT_MAX
+    scale_y = y_max / QUANT_MAX
+    for i in prange(frame.shape[1]):
+        out[0, i] = frame[0, i] * scale_x
+        out[1, i] = frame[1, i] * scale_y
@@ -0,0 +1,112 @@
+import time
+
+import numpy as np
+
+# Number of frames kept by the stage timing ring buffers.
+STAGE_HISTORY = 1024
+
+
+class StageTimer:
+    """
+    Collects per-frame wall times of named stages in a fixed-size ring buffer.
+
+    Every frame starts with `start_frame` and each stage ends with `mark`,
+    which books the time since the previous mark on that stage. While the
+    timer is disabled both calls return immediately, so the timer can stay
+    in place in hot code.
+
+    Attributes:
+        stages (tuple): Names of the stages.
+        enabled (bool): Whether frames are recorded.
+        times (np.ndarray): Ring buffer of shape (STAGE_HISTORY, len(stages)) in seconds.
+        count (int): Number of frames recorded so far.
+    """
+
+    def __init__(self, stages, enabled: bool = False):
+        self.stages = tuple(stages)
+        self.enabled = enabled
+        self.times = np.zeros((STAGE_HISTORY, len(self.stages)), dtype=np.float64)
+        self.count = 0
+        self.row = 0
+        self.last = 0.0
+
+    def start_frame(self):
+        """
+        Starts a new frame, overwriting the oldest one once the buffer is full.
+        """
+        if not self.enabled:
+            return
+        self.row = self.count % STAGE_HISTORY
+        self.times[self.row] = 0.0
+        self.count += 1
+        self.last = time.perf_counter()
+
+    def mark(self, stage: int):
+        """
+        Books the time since the last mark (or the frame start) on a stage.
+
+        Args:
+            stage (int): Index of the stage in `stages`.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.times[self.row, stage] += now - self.last
+        self.last = now
+
+    def get_times(self) -> np.ndarray:
+        """
+        Returns the recorded frames.
+
+        Returns:
+            np.ndarray: Array of shape (frames, len(stages)) in seconds, oldest frame first.
+        """
+        return ordered_history(self.times, self.count)
+
+
+def ordered_history(times: np.ndarray, count: int) -> np.ndarray:
+    """
+    Unrolls a ring buffer of per-frame rows into chronological order.
+
+    Args:
+        times (np.ndarray): Ring buffer with one row per frame.
+        count (int): Number of rows written so far.
+
+    Returns:
+        np.ndarray: The last (up to `len(times)`) rows, oldest first.
+    """
+    history = times.shape[0]
+    if count <= history:
+        return times[:count].copy()
+    first = count % history
+    return np.concatenate((times[first:], times[:first]))
+
+
+def summarize_stage_times(times: np.ndarray, stages, last: int = 60) -> dict:
+    """
+    Averages the stage times of the most recent frames.
+
+    Args:
+        times (np.ndarray): Stage times of shape (frames, len(stages)), oldest first.
+        stages (tuple): Names of the stages.
+        last (int, optional): Number of most recent frames to average.
+
+    Returns:
+        dict: Mean time in milliseconds per stage name (empty if no frames were recorded).
+    """
+    if times.shape[0] == 0:
+        return {}
+    means = times[-last:].mean(axis=0) * 1e3
+    return {stage: float(mean) for stage, mean in zip(stages, means)}
+
+
+def export_stage_times(path, times: np.ndarray, stages):
+    """
+    Writes stage times to a CSV file with one row per frame and one column per stage.
+
+    Args:
+        path (str): Path of the CSV file.
+        times (np.ndarray): Stage times of shape (frames, len(stages)) in seconds.
+        stages (tuple): Names of the stages, used as column headers.
+    """
+    np.savetxt(path, times, delimiter=",", header=",".join(stages), comments="", fmt="%.9f")
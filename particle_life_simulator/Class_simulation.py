@@ -1,43 +1,143 @@
 import time
+import numpy as np
 from vispy import app
 
+from particle_life_simulator.Class_Particle import STAGES
+from particle_life_simulator.Class_Physics import PhysicsThread, TripleBuffer, select_threading_layer
+
 
 class Simulation(app.Timer):
-    def __init__(self, particle_creator, gui, benchmark_mode=True):
+    def __init__(self, particle_creator, gui, benchmark_mode=True, recorder=None, threaded=False):
         super().__init__(interval=1 / 60, start=False)
         self.particle_creator = particle_creator
         self.gui = gui
+        self.recorder = recorder
+        self.threaded = threaded
+        self.buffer = None
+        self.physics = None
+        self.sps_list = []
         self.benchmark_mode = benchmark_mode
         self.frame_count = 0
         self.start_time = time.perf_counter()
         self.last_time = self.start_time
         self.fps_list = []
         self.benchmark_duration = 60
+        self.timing = False
+        self.gui.timing_handler = self.set_timing
         self.connect(self.on_timer)
 
+    def set_timing(self, enabled):
+        """
+        Turns the stage timers of the particle system and the GUI on or off.
+
+        Particle systems without stage timers (e.g. a `TrajectoryPlayer`) only
+        get their drawing timed.
+
+        Args:
+            enabled (bool): Whether to record and show stage times.
+        """
+        self.timing = enabled
+        set_timing = getattr(self.particle_creator, "set_timing", None)
+        if set_timing is not None:
+            set_timing(enabled)
+        self.gui.set_timing(enabled)
+
     def start(self):
+        """
+        Starts the render timer and, in threaded mode, the physics thread.
+
+        Without a thread-safe threading layer (see `select_threading_layer`),
+        the GUI switches to serial drawing kernels while the physics thread runs.
+        """
         print("Simulation started!")
+        if self.threaded and self.physics is None:
+            self.gui.serial_kernels = not select_threading_layer()
+            self.buffer = TripleBuffer()
+            self.physics = PhysicsThread(self.particle_creator, self.buffer, recorder=self.recorder)
+            self.physics.start()
+        # The benchmark starts with the first frame, not when the timer was created
+        self.frame_count = 0
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
         super().start()
 
+    def stop(self):
+        """
+        Stops the render timer and the physics thread.
+        """
+        super().stop()
+        if self.physics is not None:
+            self.physics.stop(timeout=5)
+            self.physics = None
+            self.gui.serial_kernels = False
+
     def on_timer(self, event):
         """
         Updates the particle positions, redraws them on the GUI, and updates the FPS counter.
         If benchmark mode is active, it calculates the average FPS over 60 seconds.
+
+        In threaded mode, the physics runs on a `PhysicsThread` and this
+        callback only draws the newest published frame, so render FPS and
+        physics steps/s are independent and reported separately.
         """
+        if self.physics is not None:
+            error = self.physics.error
+            if error is not None:
+                self.stop()
+                raise RuntimeError("The physics thread failed.") from error
+            frame = self.buffer.acquire()
+            if frame is not None:
+                self.gui.draw_state(frame.x, frame.y, frame.colors, frame.layout_version)
+                self.frame_count += 1
+            self.report_rates()
+            return
+
         self.particle_creator.update_positions()
-        
-        particles = self.particle_creator.get_positions_and_colors()
-        
-        self.gui.draw_particles(particles, self.particle_creator.num_particles)
+        if self.recorder is not None:
+            self.recorder.step()
+
+        state = getattr(self.particle_creator, "state", None)
+        if isinstance(state, np.ndarray):
+            # Positions are streamed straight from the state rows, colors are
+            # only uploaded again when the particle order changes
+            self.gui.draw_state(
+                state[0], state[1], self.particle_creator.colors, self.particle_creator.layout_version
+            )
+        else:
+            particles = self.particle_creator.get_positions_and_colors()
+            self.gui.draw_particles(particles, self.particle_creator.num_particles)
 
         self.frame_count += 1
+        self.report_rates()
+
+    def update_stage_overlay(self):
+        """
+        Passes the recent stage times of the particle system to the GUI overlay.
+        """
+        get_stage_times = getattr(self.particle_creator, "get_stage_times", None)
+        if get_stage_times is None:
+            self.gui.update_stage_overlay()
+        else:
+            self.gui.update_stage_overlay(get_stage_times(), STAGES)
+
+    def report_rates(self):
+        """
+        Updates the FPS (and physics steps/s) display about once per second and ends benchmarks.
+        """
         current_time = time.perf_counter()
         elapsed_time = current_time - self.last_time
 
         if elapsed_time > 1.0:
             fps = self.frame_count / elapsed_time
-            self.gui.update_fps(fps)
+            if self.physics is not None:
+                steps_per_second = self.physics.steps_per_second
+                self.gui.update_fps(fps, steps_per_second)
+                self.sps_list.append(steps_per_second)
+            else:
+                self.gui.update_fps(fps)
             self.fps_list.append(fps)
+            if self.timing:
+                self.update_stage_overlay()
             self.frame_count = 0
             self.last_time = current_time
 
@@ -46,5 +146,8 @@ class Simulation(app.Timer):
             if total_elapsed >= self.benchmark_duration:
                 avg_fps = sum(self.fps_list) / len(self.fps_list)
                 print(f"Benchmark completed! Average FPS: {avg_fps:.2f}")
+                if self.sps_list:
+                    avg_sps = sum(self.sps_list) / len(self.sps_list)
+                    print(f"Average physics steps/s: {avg_sps:.2f}")
                 self.stop()
 
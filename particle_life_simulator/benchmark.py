@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import sys
+
+# See main.py: the package is imported by its full name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from particle_life_simulator.Class_Benchmark import DEFAULT_DENSITY, KERNELS, compare_results, run_suite
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time the simulation kernels and compare benchmark results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the kernel benchmarks")
+    run.add_argument("--particles", type=float, nargs="+", default=[1e3, 1e4, 1e5, 1e6, 1e7],
+                     help="particle counts to sweep")
+    run.add_argument("--densities", type=float, nargs="+", default=[DEFAULT_DENSITY],
+                     help="particle densities (particles per unit area) to sweep")
+    run.add_argument("--colors", type=int, nargs="+", default=[5], help="numbers of colors to sweep")
+    run.add_argument("--threads", type=int, nargs="+", default=None, help="Numba thread counts to sweep")
+    run.add_argument("--kernels", nargs="+", default=list(KERNELS), choices=KERNELS, help="kernels to time")
+    run.add_argument("--repeats", type=int, default=5, help="timed calls per kernel")
+    run.add_argument("--seed", type=int, default=0, help="seed of the initial states")
+    run.add_argument("--output", default=None, help="write the results as JSON to this path")
+
+    compare = commands.add_parser("compare", help="compare two result files")
+    compare.add_argument("baseline", help="results of the reference run")
+    compare.add_argument("current", help="results of the run under test")
+    compare.add_argument("--threshold", type=float, default=0.1, help="relative slowdown counted as regression")
+    compare.add_argument("--statistic", default="median", choices=("min", "median", "mean"),
+                         help="timing statistic to compare")
+    return parser.parse_args(argv)
+
+
+def print_entry(entry):
+    print(
+        f"{entry['kernel']:<30} N={entry['num_particles']:<10} density={entry['density']:.4f} "
+        f"colors={entry['num_colors']:<3} threads={entry['threads']:<3} "
+        f"median {entry['median'] * 1e3:10.3f} ms"
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "run":
+        results = run_suite(
+            particle_counts=[int(n) for n in args.particles],
+            densities=args.densities,
+            color_counts=args.colors,
+            thread_counts=args.threads,
+            repeats=args.repeats,
+            seed=args.seed,
+            kernels=tuple(args.kernels),
+            progress=print_entry,
+        )
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
+        return results
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    comparison = compare_results(baseline, current, args.threshold, args.statistic)
+    for row in comparison:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['kernel']:<30} N={row['num_particles']:<10} colors={row['num_colors']:<3} "
+            f"threads={row['threads']:<3} {row['baseline'] * 1e3:10.3f} ms -> "
+            f"{row['current'] * 1e3:10.3f} ms ({row['ratio']:.2f}x) {flag}"
+        )
+    regressions = sum(row["regression"] for row in comparison)
+    print(f"{len(comparison)} measurements compared, {regressions} regressions")
+    return comparison
+
+
+if __name__ == "__main__":
+    comparison = main()
+    if isinstance(comparison, list) and any(row["regression"] for row in comparison):
+        sys.exit(1)
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# See main.py: the package is imported by its full name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from particle_life_simulator.Class_Headless import HeadlessSimulation
+from particle_life_simulator.Class_Checkpoint import load_checkpoint, save_checkpoint
+from particle_life_simulator.Class_Distributed import DistributedParticle
+from particle_life_simulator.Class_Particle import LAYOUTS, STAGES, CreateParticle
+from particle_life_simulator.Class_Recorder import TrajectoryRecorder
+from particle_life_simulator.Class_Render import FrameExporter, FrameRenderer
+from particle_life_simulator.Class_Stream import StreamServer
+from particle_life_simulator.Class_Timing import export_stage_times
+
+DEFAULT_INTERACTION_MATRIX = np.array(
+    [
+        [1, 0, 0, 0, 0],  # Red interactions
+        [-2, -2, 0, 0, 0],  # Blue interactions
+        [0, 0, 0, 0, 0],  # Green interactions
+        [0, 0, 0, 0, 0],  # Yellow interactions
+        [-1, 0, 0, 0, 2],  # Magenta interactions
+    ],
+    dtype=np.float32,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the particle simulation without rendering.")
+    parser.add_argument("--particles", type=int, default=100000, help="number of particles")
+    parser.add_argument("--width", type=int, default=1920, help="domain width (x_max)")
+    parser.add_argument("--height", type=int, default=1080, help="domain height (y_max)")
+    parser.add_argument("--radius", type=float, default=3.0, help="interaction radius")
+    parser.add_argument("--max-speed", type=float, default=1.0, help="maximum particle speed")
+    parser.add_argument("--strength", type=float, default=0.5, help="interaction strength")
+    parser.add_argument("--steps", type=int, default=None, help="number of steps to run")
+    parser.add_argument("--duration", type=float, default=None, help="wall time to run in seconds")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="initialise the world in parallel from this seed (same world for any thread count)")
+    parser.add_argument("--layout", default="uniform", choices=LAYOUTS, help="initial layout of a seeded world")
+    parser.add_argument("--fused", action="store_true", help="use the single-pass fused update engine")
+    parser.add_argument("--reorder-interval", type=int, default=0, help="steps between spatial reorderings")
+    parser.add_argument("--skin", type=float, default=0.0, help="Verlet neighbor list skin (0 disables it)")
+    parser.add_argument("--no-balance", action="store_true", help="split parallel loops by index instead of estimated cost")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes for strip decomposition (0 runs in-process)")
+    parser.add_argument("--record", default=None, help="write a trajectory file to this path")
+    parser.add_argument("--record-interval", type=int, default=1, help="steps between recorded frames")
+    parser.add_argument("--render", default=None,
+                        help="render frames on the CPU to a PNG sequence ('frames/f_{:06d}.png') or a raw rgb24 video file")
+    parser.add_argument("--render-interval", type=int, default=1, help="steps between rendered frames")
+    parser.add_argument("--render-size", type=int, nargs=2, default=None, metavar=("WIDTH", "HEIGHT"),
+                        help="image size in pixels (defaults to the world size)")
+    parser.add_argument("--render-workers", type=int, default=4, help="threads encoding and writing PNG frames")
+    parser.add_argument("--particle-size", type=float, default=3, help="rendered particle diameter in pixels")
+    parser.add_argument("--stream", type=int, default=None, metavar="PORT",
+                        help="publish frames to stream clients on this TCP port (0 picks a free one)")
+    parser.add_argument("--stream-host", default="127.0.0.1", help="address the stream server listens on")
+    parser.add_argument("--resume", default=None, help="start from this checkpoint instead of random particles")
+    parser.add_argument("--checkpoint", default=None, help="save a checkpoint to this path after the run")
+    parser.add_argument("--stage-times", default=None, help="time the stages of every step and write them as CSV to this path")
+    parser.add_argument("--no-warmup", action="store_true", help="do not compile the kernels before the timed run")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    if args.steps is None and args.duration is None:
+        args.steps = 1000
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_start = time.perf_counter()
+
+    world = dict(
+        num_particles=args.particles,
+        x_max=args.width,
+        y_max=args.height,
+        speed_range=(-1, 1),
+        max_speed=args.max_speed,
+        radius=args.radius,
+        num_colors=DEFAULT_INTERACTION_MATRIX.shape[0],
+        interaction_strength=args.strength,
+    )
+    if args.workers > 0 and (args.resume or args.checkpoint):
+        raise SystemExit("--resume and --checkpoint are not supported with --workers.")
+    if args.workers > 0 and args.stage_times:
+        raise SystemExit("--stage-times is not supported with --workers.")
+    if args.resume:
+        particle_creator = load_checkpoint(args.resume)
+    elif args.workers > 0:
+        particle_creator = DistributedParticle(num_workers=args.workers, **world)
+    else:
+        particle_creator = CreateParticle(
+            fused=args.fused, reorder_interval=args.reorder_interval, skin=args.skin,
+            balance_load=not args.no_balance, **world
+        )
+    if not args.resume:
+        if args.seed is None and args.layout == "uniform":
+            particle_creator.generate_particles()
+        else:
+            particle_creator.generate_seeded(args.seed or 0, args.layout)
+        particle_creator.set_interaction_matrix(DEFAULT_INTERACTION_MATRIX)
+
+    # Recording, rendering and streaming all run after every step and can be combined
+    hooks = []
+    try:
+        if args.record:
+            hooks.append(TrajectoryRecorder(args.record, particle_creator, interval=args.record_interval))
+        if args.render:
+            width, height = args.render_size or (particle_creator.x_max, particle_creator.y_max)
+            renderer = FrameRenderer(width, height, particle_creator.x_max, particle_creator.y_max, args.particle_size)
+            exporter = FrameExporter(
+                args.render, particle_creator, renderer, interval=args.render_interval, num_workers=args.render_workers
+            )
+            hooks.append(exporter)
+            if exporter.raw:
+                print(f"Writing rgb24 video of {width}x{height} pixels to {args.render}")
+        if args.stream is not None:
+            server = StreamServer(particle_creator, host=args.stream_host, port=args.stream)
+            hooks.append(server)
+            host, port = server.address
+            print(f"Streaming on {host}:{port}")
+    except BaseException:
+        for hook in hooks:
+            hook.close()
+        raise
+
+    simulation = HeadlessSimulation(particle_creator, hooks=hooks)
+    try:
+        if not args.no_warmup:
+            simulation.warmup()
+        startup_time = time.perf_counter() - setup_start
+        if args.stage_times:
+            particle_creator.set_timing(True)
+        report = simulation.run(steps=args.steps, duration=args.duration)
+    finally:
+        for hook in hooks:
+            hook.close()
+        if args.workers > 0:
+            particle_creator.close()
+    if args.checkpoint:
+        save_checkpoint(particle_creator, args.checkpoint)
+    if args.stage_times:
+        export_stage_times(args.stage_times, particle_creator.get_stage_times(), STAGES)
+    report["num_particles"] = particle_creator.num_particles
+    report["warmup_time"] = simulation.warmup_time
+    report["startup_time"] = startup_time
+    if args.workers == 0:
+        report["load_imbalance"], report["estimated_index_imbalance"] = particle_creator.get_load_imbalance()
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(
+            f"{report['steps']} steps in {report['elapsed']:.2f} s: "
+            f"{report['steps_per_second']:.2f} steps/s, "
+            f"{report['particle_updates_per_second']:.3e} particle updates/s"
+        )
+        print(f"Start-up {report['startup_time']:.2f} s, of which warmup {report['warmup_time']:.2f} s")
+        if "load_imbalance" in report:
+            print(
+                f"Thread load imbalance {report['load_imbalance']:.2f} "
+                f"(by index, estimated {report['estimated_index_imbalance']:.2f})"
+            )
+    return report
+
+
+if __name__ == "__main__":
+    main()
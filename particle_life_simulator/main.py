@@ -1,20 +1,47 @@
-from Class_GUI import GUI
-from Class_Particle import CreateParticle
-from Class_simulation import Simulation
-from vispy import app
-from tkinter import Tk
+import argparse
+import os
+import sys
+
+# Run as a script, only the package directory is on sys.path. The modules are
+# imported through the package so that Numba's on-disk cache always sees them
+# under one name.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import numpy as np
+from particle_life_simulator.Class_Particle import CreateParticle, warmup
+from particle_life_simulator.Class_Physics import select_threading_layer
+from particle_life_simulator.Class_Playback import TrajectoryPlayer
+from particle_life_simulator.Class_Stream import StreamClient
 
-win = Tk()
 
-win.geometry("650x250")
+def main(replay=None, connect=None):
+    # VisPy and Tk are only imported once a window is actually requested
+    from particle_life_simulator.Class_GUI import GUI
+    from particle_life_simulator.Class_simulation import Simulation
+    from vispy import app
 
-screen_width = win.winfo_screenwidth()
-screen_height = win.winfo_screenheight()
+    # The physics and render threads both run parallel kernels; the layer
+    # has to be chosen before the first one (in warmup) loads it
+    select_threading_layer()
+    gui = GUI(particle_size=3)
 
+    if replay is not None:
+        player = TrajectoryPlayer(replay)
+        gui.connect_playback(player)
+        simulation = Simulation(particle_creator=player, gui=gui, benchmark_mode=False)
+        simulation.start()
+        app.run()
+        player.close()
+        return
 
-def main():
-    gui = GUI(window_width=screen_width, window_height=screen_height, particle_size=3)
+    if connect is not None:
+        host, port = connect.rsplit(":", 1)
+        client = StreamClient(host, int(port))
+        simulation = Simulation(particle_creator=client, gui=gui, benchmark_mode=False)
+        simulation.start()
+        app.run()
+        client.close()
+        return
 
     particle_creator = CreateParticle(
         num_particles=100000,
@@ -41,11 +68,18 @@ def main():
     )
 
     particle_creator.set_interaction_matrix(interaction_matrix)
+    warmup_time = warmup(particle_creator)
+    print(f"Warmup took {warmup_time:.2f} s")
 
-    simulation = Simulation(particle_creator=particle_creator, gui=gui)
+    simulation = Simulation(particle_creator=particle_creator, gui=gui, threaded=True)
     simulation.start() 
 
     app.run()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the particle simulation.")
+    parser.add_argument("--replay", default=None, help="play back a recorded trajectory file")
+    parser.add_argument("--connect", default=None, metavar="HOST:PORT",
+                        help="show the frames of a headless run started with --stream")
+    args = parser.parse_args()
+    main(replay=args.replay, connect=args.connect)
@@ -1,8 +1,12 @@
 import cProfile
-import pstats
 import os
+import pstats
+import sys
+
+# See main.py: the package is imported by its full name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from main import main
+from particle_life_simulator.main import main
 
 if __name__ == "__main__":
     profiler = cProfile.Profile()
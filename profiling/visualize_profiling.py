@@ -1,64 +1,234 @@
+import argparse
+import os
+import pstats
+
 import pandas as pd
+import matplotlib
+
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
 plt.style.use("dark_background")
 
-profiling_file = "profiling/profiling_results.txt"
-
-with open(profiling_file, "r") as file:
-    lines = file.readlines()
-
-data = []
-for line in lines:
-    parts = line.strip().split()
-    if len(parts) >= 6 and parts[-1].count(":") == 1:
-        try:
-            ncalls = int(parts[0])  
-            cumtime = float(parts[4])
-            function = parts[-1]
-            data.append((function, ncalls, cumtime))
-        except ValueError:
-            continue
-
-df = pd.DataFrame(data, columns=["Function", "Calls", "Cumulative Time"])
-
-df["Time per Call"] = df["Cumulative Time"] / df["Calls"]
-df_top = df.sort_values(by="Cumulative Time", ascending=False).head(15)
-df_top_calls = df.sort_values(by="Calls", ascending=False).head(15)
-df_time_per_call = df.sort_values(by="Time per Call", ascending=False).head(15)
-
-fig, axes = plt.subplots(3, 1, figsize=(14, 18))
-
-for ax in axes:
-    ax.set_facecolor("black")
-    ax.tick_params(colors="white")
-    ax.xaxis.label.set_color("white")
-    ax.yaxis.label.set_color("white")
-    ax.title.set_color("white")
-
-# 1. Cumulative Execution Time per Function
-axes[0].barh(df_top["Function"], df_top["Cumulative Time"], color='dodgerblue')
-axes[0].set_xlabel("Cumulative Execution Time (Seconds)", color="white")
-axes[0].set_ylabel("Function", color="white")
-axes[0].set_title("Top 15 Functions by Cumulative Execution Time", color="white")
-axes[0].invert_yaxis()
-axes[0].grid(axis='x', linestyle='--', alpha=0.7, color="gray")
-
-# 2. Number of Function Calls
-axes[1].barh(df_top_calls["Function"], df_top_calls["Calls"], color='limegreen')
-axes[1].set_xlabel("Number of Calls", color="white")
-axes[1].set_ylabel("Function", color="white")
-axes[1].set_title("Top 15 Functions by Number of Calls", color="white")
-axes[1].invert_yaxis()
-axes[1].grid(axis='x', linestyle='--', alpha=0.7, color="gray")
-
-# 3. Execution Time per Call
-axes[2].barh(df_time_per_call["Function"], df_time_per_call["Time per Call"], color='orchid')
-axes[2].set_xlabel("Execution Time per Call (Seconds)", color="white")
-axes[2].set_ylabel("Function", color="white")
-axes[2].set_title("Top 15 Functions by Execution Time per Call", color="white")
-axes[2].invert_yaxis()
-axes[2].grid(axis='x', linestyle='--', alpha=0.7, color="gray")
-
-plt.tight_layout()
-plt.savefig("profiling/profiling_visualization.png")
\ No newline at end of file
+PROFILING_DIR = "profiling"
+PROFILE_FILE = os.path.join(PROFILING_DIR, "profiling_results.prof")
+VISUALIZATION_FILE = os.path.join(PROFILING_DIR, "profiling_visualization.png")
+REPORT_FILE = os.path.join(PROFILING_DIR, "profiling_diff.txt")
+
+
+def function_name(key):
+    """
+    Formats a pstats function key like `pstats` does in its text output.
+
+    Args:
+        key (tuple): (file name, line number, function name).
+
+    Returns:
+        str: "file.py:line(function)", or "{built-in}" style names for C functions.
+    """
+    filename, line, name = key
+    if filename == "~" and line == 0:
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def load_profile(path):
+    """
+    Loads a binary cProfile dump into a per-function table.
+
+    Every entry of the dump is kept, including built-ins and functions
+    whose names contain colons or spaces.
+
+    Args:
+        path (str): Path of a `.prof` file written by `cProfile`/`pstats`.
+
+    Returns:
+        pd.DataFrame: One row per function with the columns "Function", "Calls",
+            "Primitive Calls", "Total Time", "Cumulative Time" and "Time per Call",
+            sorted by cumulative time.
+    """
+    stats = pstats.Stats(path).stats
+    rows = [
+        (function_name(key), calls, primitive_calls, total_time, cumulative_time)
+        for key, (primitive_calls, calls, total_time, cumulative_time, _) in stats.items()
+    ]
+    df = pd.DataFrame(rows, columns=["Function", "Calls", "Primitive Calls", "Total Time", "Cumulative Time"])
+    # Names can repeat after stripping directories; merge them like pstats.strip_dirs does
+    df = df.groupby("Function", as_index=False).sum()
+    df["Time per Call"] = df["Cumulative Time"] / df["Calls"].where(df["Calls"] > 0)
+    return df.sort_values(by="Cumulative Time", ascending=False).reset_index(drop=True)
+
+
+def load_stage_times(path):
+    """
+    Loads a stage timing export into a per-stage table.
+
+    Args:
+        path (str): CSV file written by `export_stage_times` (one row per step,
+            one column per stage, times in seconds).
+
+    Returns:
+        pd.DataFrame: One row per stage with the columns "Stage", "Mean (ms)",
+            "Median (ms)", "P95 (ms)", "Max (ms)" and "Share" (fraction of the
+            summed mean times).
+    """
+    times = pd.read_csv(path) * 1e3
+    df = pd.DataFrame({
+        "Stage": times.columns,
+        "Mean (ms)": times.mean().values,
+        "Median (ms)": times.median().values,
+        "P95 (ms)": times.quantile(0.95).values,
+        "Max (ms)": times.max().values,
+    })
+    total = df["Mean (ms)"].sum()
+    df["Share"] = df["Mean (ms)"] / total if total > 0 else 0.0
+    return df
+
+
+def diff_tables(baseline, current, key, value):
+    """
+    Compares a column of two tables row by row.
+
+    Args:
+        baseline (pd.DataFrame): Table of the reference run.
+        current (pd.DataFrame): Table of the run under test.
+        key (str): Column identifying a row (e.g. "Function" or "Stage").
+        value (str): Column to compare (e.g. "Cumulative Time").
+
+    Returns:
+        pd.DataFrame: Columns `key`, "Baseline", "Current", "Absolute Change" and
+            "Relative Change" (NaN for rows missing in the baseline), sorted by
+            absolute change, largest regression first. Rows present in only one
+            run count as 0 in the other.
+    """
+    merged = pd.merge(
+        baseline[[key, value]], current[[key, value]], on=key, how="outer", suffixes=(" baseline", " current")
+    )
+    merged = merged.rename(columns={f"{value} baseline": "Baseline", f"{value} current": "Current"})
+    merged[["Baseline", "Current"]] = merged[["Baseline", "Current"]].fillna(0.0)
+    merged["Absolute Change"] = merged["Current"] - merged["Baseline"]
+    merged["Relative Change"] = merged["Absolute Change"] / merged["Baseline"].where(merged["Baseline"] > 0)
+    return merged.sort_values(by="Absolute Change", ascending=False).reset_index(drop=True)
+
+
+def format_report(function_diff, own_time_diff=None, stage_diff=None, top=15, threshold=0.1):
+    """
+    Writes the diff of two runs as a plain-text report.
+
+    Cumulative times show which call paths got slower, own (total) times
+    point at the function in which the extra time is actually spent.
+
+    Args:
+        function_diff (pd.DataFrame): Output of `diff_tables` for the cumulative times.
+        own_time_diff (pd.DataFrame, optional): Output of `diff_tables` for the own times.
+        stage_diff (pd.DataFrame, optional): Output of `diff_tables` for the stages.
+        top (int, optional): Number of largest regressions and improvements to list.
+        threshold (float, optional): Relative slowdown above which a row is marked as a regression.
+
+    Returns:
+        str: The report.
+    """
+    def table(df):
+        df = df.copy()
+        df["Regression"] = (df["Absolute Change"] > 0) & ~(df["Relative Change"] <= threshold)
+        df["Regression"] = df["Regression"].map({True: "REGRESSION", False: ""})
+        return df.to_string(index=False, float_format=lambda v: f"{v:.6f}")
+
+    def regressions(df):
+        return df[df["Absolute Change"] > 0].head(top)
+
+    def improvements(df):
+        return df[df["Absolute Change"] < 0].sort_values(by="Absolute Change").head(top)
+
+    sections = []
+    if stage_diff is not None:
+        sections.append("Per-stage mean time (ms)\n" + table(stage_diff))
+    if own_time_diff is not None:
+        sections.append(f"Largest regressions (own time, s)\n{table(regressions(own_time_diff))}")
+    sections.append(f"Largest regressions (cumulative time, s)\n{table(regressions(function_diff))}")
+    sections.append(f"Largest improvements (cumulative time, s)\n{table(improvements(function_diff))}")
+    return "\n\n".join(sections) + "\n"
+
+
+def plot_profile(df, stages=None, path=VISUALIZATION_FILE):
+    """
+    Draws the per-function charts and, if given, the per-stage chart of one run.
+
+    Args:
+        df (pd.DataFrame): Output of `load_profile`.
+        stages (pd.DataFrame, optional): Output of `load_stage_times`.
+        path (str, optional): Path of the PNG file.
+    """
+    df_top = df.sort_values(by="Cumulative Time", ascending=False).head(15)
+    df_top_calls = df.sort_values(by="Calls", ascending=False).head(15)
+    df_time_per_call = df.sort_values(by="Time per Call", ascending=False).head(15)
+
+    charts = [
+        (df_top["Function"], df_top["Cumulative Time"], "dodgerblue",
+         "Cumulative Execution Time (Seconds)", "Function", "Top 15 Functions by Cumulative Execution Time"),
+        (df_top_calls["Function"], df_top_calls["Calls"], "limegreen",
+         "Number of Calls", "Function", "Top 15 Functions by Number of Calls"),
+        (df_time_per_call["Function"], df_time_per_call["Time per Call"], "orchid",
+         "Execution Time per Call (Seconds)", "Function", "Top 15 Functions by Execution Time per Call"),
+    ]
+    if stages is not None:
+        charts.append((stages["Stage"], stages["Mean (ms)"], "orange",
+                       "Mean Time per Step (Milliseconds)", "Stage", "Time per Simulation Stage"))
+
+    fig, axes = plt.subplots(len(charts), 1, figsize=(14, 6 * len(charts)))
+
+    for ax, (labels, values, color, xlabel, ylabel, title) in zip(axes, charts):
+        ax.set_facecolor("black")
+        ax.tick_params(colors="white")
+        ax.barh(labels, values, color=color)
+        ax.set_xlabel(xlabel, color="white")
+        ax.set_ylabel(ylabel, color="white")
+        ax.set_title(title, color="white")
+        ax.invert_yaxis()
+        ax.grid(axis='x', linestyle='--', alpha=0.7, color="gray")
+
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close(fig)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Visualize a profiling run and compare it with a baseline.")
+    parser.add_argument("--profile", default=PROFILE_FILE, help="binary cProfile dump of the run")
+    parser.add_argument("--stages", default=None, help="stage timing CSV of the run")
+    parser.add_argument("--baseline-profile", default=None, help="binary cProfile dump to compare against")
+    parser.add_argument("--baseline-stages", default=None, help="stage timing CSV to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown marked as regression")
+    parser.add_argument("--output", default=VISUALIZATION_FILE, help="path of the chart image")
+    parser.add_argument("--report", default=REPORT_FILE, help="path of the diff report")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    df = load_profile(args.profile)
+    stages = load_stage_times(args.stages) if args.stages else None
+    plot_profile(df, stages, args.output)
+    print(f"Charts written to {args.output}")
+
+    if args.baseline_profile is None:
+        return None
+
+    baseline = load_profile(args.baseline_profile)
+    function_diff = diff_tables(baseline, df, "Function", "Cumulative Time")
+    own_time_diff = diff_tables(baseline, df, "Function", "Total Time")
+    stage_diff = None
+    if stages is not None and args.baseline_stages:
+        stage_diff = diff_tables(load_stage_times(args.baseline_stages), stages, "Stage", "Mean (ms)")
+
+    report = format_report(function_diff, own_time_diff, stage_diff, threshold=args.threshold)
+    with open(args.report, "w") as file:
+        file.write(report)
+    print(report)
+    print(f"Diff report written to {args.report}")
+    return function_diff, stage_diff
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from particle_life_simulator.Class_Benchmark import compare_results, make_world, run_suite
+
+
+def test_make_world_is_seeded():
+    """Checks that the same seed gives the same initial state and the requested density."""
+    first = make_world(2000, density=0.05, num_colors=3, seed=4)
+    second = make_world(2000, density=0.05, num_colors=3, seed=4)
+    other = make_world(2000, density=0.05, num_colors=3, seed=5)
+
+    assert np.array_equal(first.state, second.state)
+    assert np.array_equal(first.colors, second.colors)
+    assert np.array_equal(first.color_interaction, second.color_interaction)
+    assert not np.array_equal(first.state, other.state)
+    assert 2000 / (first.x_max * first.y_max) == pytest.approx(0.05, rel=0.05)
+
+
+def test_run_suite_sweeps_all_combinations():
+    """Checks that every sweep combination and kernel gets one result entry."""
+    results = run_suite(
+        particle_counts=[200, 400], color_counts=[2, 3], repeats=1,
+        kernels=("compute_neighbors_grid", "fused_step"),
+    )
+
+    assert len(results["results"]) == 2 * 2 * 2
+    entry = results["results"][0]
+    assert entry["kernel"] == "compute_neighbors_grid"
+    assert entry["num_particles"] == 200 and entry["num_colors"] == 2
+    assert 0 < entry["min"] <= entry["median"]
+    assert results["metadata"]["seed"] == 0
+
+
+def test_compare_results_flags_regressions():
+    """Checks that only measurements slower than the threshold are flagged."""
+    def result(kernel, median):
+        return {"kernel": kernel, "num_particles": 1000, "density": 0.05, "num_colors": 5,
+                "threads": 1, "min": median, "median": median, "mean": median, "repeats": 1}
+
+    baseline = {"results": [result("fused_step", 1.0), result("apply_influence", 1.0)]}
+    current = {"results": [result("fused_step", 1.05), result("apply_influence", 1.5), result("new", 1.0)]}
+
+    comparison = compare_results(baseline, current, threshold=0.1)
+
+    assert [row["kernel"] for row in comparison] == ["fused_step", "apply_influence"]
+    assert [row["regression"] for row in comparison] == [False, True]
+    assert comparison[1]["ratio"] == pytest.approx(1.5)
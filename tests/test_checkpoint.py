@@ -0,0 +1,76 @@
+import numba
+import numpy as np
+import pytest
+from particle_life_simulator.Class_Checkpoint import CHECKPOINT_ALIGN, load_checkpoint, save_checkpoint
+from particle_life_simulator.Class_Particle import CreateParticle
+
+
+def test_checkpoint_restart_continues_run(tmp_path):
+    """Test that a restored system continues exactly like the original."""
+    path = str(tmp_path / "world.ckpt")
+    matrix = np.array([[1, -1, 0], [0, 1, -1], [-1, 0, 1]], dtype=np.float32)
+    original = CreateParticle(num_particles=800, x_max=120, y_max=90, radius=4, num_colors=3,
+                              fused=True, reorder_interval=3, skin=1.5, max_speed=1.0)
+    original.generate_particles()
+    original.set_interaction_matrix(matrix)
+    for _ in range(4):
+        original.update_positions()
+
+    save_checkpoint(original, path)
+    restored = load_checkpoint(path)
+
+    for name in ("num_particles", "radius", "radius_sq", "fused", "skin", "reorder_interval",
+                 "reorder_order", "step_count", "layout_version", "interaction_strength"):
+        assert getattr(restored, name) == getattr(original, name)
+    assert np.array_equal(restored.particles, original.particles)
+    assert np.array_equal(restored.particle_ids, original.particle_ids)
+    assert np.array_equal(restored.color_interaction, matrix)
+
+    for _ in range(4):
+        original.update_positions()
+        restored.update_positions()
+    assert np.array_equal(restored.particles, original.particles)
+    assert np.array_equal(restored.particle_ids, original.particle_ids)
+
+
+def test_checkpoint_restores_rng_and_alignment(tmp_path):
+    """Test that the RNG stream continues after loading and arrays are page aligned."""
+    path = str(tmp_path / "rng.ckpt")
+    cp = CreateParticle(num_particles=100, num_colors=3)
+    cp.generate_particles()
+    save_checkpoint(cp, path)
+
+    cp.generate_particles()
+    expected = cp.particles
+    numpy_expected = np.random.rand(3)
+
+    restored = load_checkpoint(path)
+    restored.generate_particles()
+    assert np.array_equal(restored.particles, expected)
+    assert np.array_equal(np.random.rand(3), numpy_expected)
+
+    with open(path, "rb") as file:
+        assert file.seek(0, 2) % CHECKPOINT_ALIGN == 0
+
+    with open(tmp_path / "bad.ckpt", "wb") as file:
+        file.write(b"nope")
+    with pytest.raises(ValueError):
+        load_checkpoint(str(tmp_path / "bad.ckpt"))
+
+
+def test_checkpoint_rng_requires_same_numba_version(tmp_path):
+    """Test that the RNG is only restored from checkpoints of the running Numba version."""
+    path = str(tmp_path / "version.ckpt")
+    cp = CreateParticle(num_particles=10, num_colors=3)
+    cp.generate_particles()
+    save_checkpoint(cp, path)
+
+    with open(path, "r+b") as file:
+        header = file.read(CHECKPOINT_ALIGN)
+        file.seek(0)
+        file.write(header.replace(numba.__version__.encode(), b"0" * len(numba.__version__)))
+
+    with pytest.raises(ValueError):
+        load_checkpoint(path)
+    restored = load_checkpoint(path, restore_rng=False)
+    assert np.array_equal(restored.particles, cp.particles)
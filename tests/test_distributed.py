@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from particle_life_simulator.Class_Distributed import STRIP_COPIES, DistributedParticle, assign_strips
+from particle_life_simulator.Class_Particle import CreateParticle
+
+
+def test_distributed_matches_fused_engine():
+    """Test that stepping strips in worker processes matches the fused single-process engine."""
+    kwargs = dict(num_particles=2000, x_max=240, y_max=160, radius=4, num_colors=3, max_speed=1.0)
+    matrix = np.array([[1, -1, 0], [0, 1, -1], [-1, 0, 1]], dtype=np.float32)
+    reference = CreateParticle(fused=True, **kwargs)
+    reference.generate_particles()
+    reference.set_interaction_matrix(matrix)
+
+    with DistributedParticle(num_workers=2, **kwargs) as distributed:
+        distributed.particles = reference.particles
+        distributed.set_interaction_matrix(matrix)
+        assert distributed.num_workers == 2
+
+        for _ in range(5):
+            reference.update_positions()
+            distributed.update_positions()
+
+        assert distributed.step_count == 5
+        assert np.array_equal(distributed.particles, reference.particles)
+        assert distributed.get_positions_and_colors().shape == (2000, 3)
+
+
+def test_assign_strips_lists_strip_and_halo_particles():
+    """Checks that every strip lists exactly its own and its halo particles, in ascending order."""
+    rng = np.random.default_rng(2)
+    state = np.zeros((4, 3000), dtype=np.float32)
+    state[0] = rng.uniform(0, 120, 3000)
+    state[1] = rng.uniform(0, 50, 3000)
+    cell_bounds = np.array([0, 3, 20, 41], dtype=np.int64)
+    columns = np.empty(3000, dtype=np.int32)
+    strip_index = np.empty(STRIP_COPIES * 3000, dtype=np.int32)
+    strip_start = np.empty(4, dtype=np.int64)
+
+    assign_strips(state, np.float32(3.0), 120, 50, cell_bounds, 3, columns, strip_index, strip_start)
+
+    assert np.array_equal(columns, np.minimum((state[0] / np.float32(3.0)).astype(np.int32), 40))
+    for k in range(3):
+        expected = np.nonzero((columns >= cell_bounds[k] - 3) & (columns < cell_bounds[k + 1] + 3))[0]
+        assert np.array_equal(strip_index[strip_start[k]:strip_start[k + 1]], expected)
+
+
+def test_distributed_matches_fused_engine_with_narrow_strips():
+    """Checks that strips as narrow as the halo still give the fused result."""
+    kwargs = dict(num_particles=1500, x_max=48, y_max=60, radius=4, num_colors=3, max_speed=1.0)
+    matrix = np.array([[1, -1, 0], [0, 1, -1], [-1, 0, 1]], dtype=np.float32)
+    reference = CreateParticle(fused=True, **kwargs)
+    reference.generate_particles()
+    reference.set_interaction_matrix(matrix)
+
+    with DistributedParticle(num_workers=8, **kwargs) as distributed:
+        distributed.particles = reference.particles
+        distributed.set_interaction_matrix(matrix)
+        assert distributed.num_workers == 5
+
+        for _ in range(3):
+            reference.update_positions()
+            distributed.update_positions()
+
+        assert np.array_equal(distributed.particles, reference.particles)
+
+
+def test_distributed_matches_fused_engine_with_partial_maps():
+    """Checks bitwise equality for a system large enough to reduce several partial influence maps."""
+    kwargs = dict(num_particles=20000, x_max=400, y_max=300, radius=4, num_colors=3, max_speed=1.0)
+    matrix = np.array([[1, -1, 0], [0, 1, -1], [-1, 0, 1]], dtype=np.float32)
+    reference = CreateParticle(fused=True, **kwargs)
+    reference.generate_particles()
+    reference.set_interaction_matrix(matrix)
+
+    with DistributedParticle(num_workers=3, **kwargs) as distributed:
+        distributed.particles = reference.particles
+        distributed.set_interaction_matrix(matrix)
+
+        for _ in range(5):
+            reference.update_positions()
+            distributed.update_positions()
+
+        assert np.array_equal(distributed.particles, reference.particles)
+
+
+def test_distributed_resize_and_close():
+    """Test that loading a different particle count reallocates and close releases everything."""
+    distributed = DistributedParticle(num_particles=10, x_max=100, y_max=100, num_colors=3, num_workers=2)
+    with pytest.raises(ValueError):
+        distributed.set_interaction_matrix(np.zeros((2, 2), dtype=np.float32))
+    distributed.set_interaction_matrix(np.eye(3, dtype=np.float32))
+
+    particles = np.zeros((50, 5), dtype=np.float32)
+    particles[:, 0] = np.arange(50)
+    distributed.particles = particles
+
+    assert distributed.num_particles == 50
+    assert np.array_equal(distributed.particles, particles)
+    assert np.array_equal(distributed.color_interaction, np.eye(3))
+
+    distributed.close()
+    assert distributed.shm is None
+    distributed.close()
+
+
+def test_distributed_generate_seeded_matches_create_particle():
+    """Checks that a seed gives the same world in shared memory as in a CreateParticle."""
+    world = dict(num_particles=400, x_max=120, y_max=90, num_colors=3)
+    local = CreateParticle(**world)
+    local.generate_seeded(11, "clusters")
+    distributed = DistributedParticle(num_workers=2, **world)
+    try:
+        distributed.generate_seeded(11, "clusters")
+        assert np.array_equal(distributed.state, local.state)
+        assert np.array_equal(distributed.colors, local.colors)
+
+        distributed.load_layout(local.state[:2, :100], local.colors[:100], 11)
+        assert distributed.num_particles == 100
+        assert np.array_equal(distributed.state, local.state[:, :100])
+    finally:
+        distributed.close()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from particle_life_simulator.Class_Ensemble import ParticleEnsemble
+from particle_life_simulator.Class_Particle import CreateParticle
+
+
+def test_ensemble_matches_individual_worlds():
+    """Test that every world of an ensemble evolves exactly like a standalone fused world."""
+    kwargs = dict(num_particles=600, x_max=150, y_max=100, radius=4, num_colors=3, max_speed=1.0)
+    np.random.seed(11)
+    matrices = np.random.uniform(-1, 1, (3, 3, 3)).astype(np.float32)
+
+    ensemble = ParticleEnsemble(num_worlds=3, **kwargs)
+    ensemble.generate_particles()
+    ensemble.set_interaction_matrices(matrices)
+
+    worlds = []
+    for b in range(3):
+        cp = CreateParticle(fused=True, **kwargs)
+        cp.particles = ensemble.get_particles(b)
+        cp.set_interaction_matrix(matrices[b])
+        worlds.append(cp)
+
+    for _ in range(5):
+        ensemble.update_positions()
+        for cp in worlds:
+            cp.update_positions()
+
+    for b, cp in enumerate(worlds):
+        assert np.array_equal(ensemble.get_particles(b), cp.particles)
+
+
+def test_ensemble_matches_fused_world_with_partial_maps():
+    """Checks the equality for a world large enough to be reduced from several partial influence maps."""
+    kwargs = dict(num_particles=9000, x_max=300, y_max=200, radius=4, num_colors=3, max_speed=1.0)
+    np.random.seed(12)
+    matrices = np.random.uniform(-1, 1, (2, 3, 3)).astype(np.float32)
+
+    ensemble = ParticleEnsemble(num_worlds=2, **kwargs)
+    ensemble.generate_particles()
+    ensemble.set_interaction_matrices(matrices)
+    cp = CreateParticle(fused=True, **kwargs)
+    cp.particles = ensemble.get_particles(1)
+    cp.set_interaction_matrix(matrices[1])
+
+    for _ in range(3):
+        ensemble.update_positions()
+        cp.update_positions()
+
+    assert np.array_equal(ensemble.get_particles(1), cp.particles)
+
+
+def test_ensemble_matrix_validation():
+    """Test that a shared matrix is broadcast and wrong shapes are rejected."""
+    ensemble = ParticleEnsemble(num_worlds=2, num_particles=10, num_colors=3)
+    ensemble.set_interaction_matrices(np.eye(3))
+    assert np.array_equal(ensemble.pair_influence, np.broadcast_to(np.eye(3), (2, 3, 3)))
+
+    with pytest.raises(ValueError):
+        ensemble.set_interaction_matrices(np.zeros((3, 3, 3)))
+    with pytest.raises(ValueError):
+        ensemble.set_particles(0, np.zeros((5, 5), dtype=np.float32))
@@ -80,3 +80,119 @@ def test_gui_stop_simulation(create_mocked_gui):
     gui.stop_simulation()
 
     gui.canvas.close.assert_called_once()
+
+
+def test_gui_routes_keys_to_playback(create_mocked_gui):
+    """Checks that key presses reach a connected trajectory player."""
+    gui = create_mocked_gui
+    player = MagicMock()
+    gui.connect_playback(player)
+
+    event = MagicMock()
+    event.key.name = "Space"
+    gui.on_key_press(event)
+
+    player.handle_key.assert_called_once_with("Space")
+
+
+def test_gui_draw_state_uploads_colors_once(create_mocked_gui):
+    """Checks that draw_state streams positions and only re-uploads colors on layout changes."""
+    gui = create_mocked_gui
+    state = np.array([[10, 20, 30], [40, 50, 60]], dtype=np.float32)
+    colors = np.array([0, 1, 7], dtype=np.int16)
+    gui.particle_visual.set_colors = MagicMock()
+
+    gui.draw_state(state[0], state[1], colors, layout_version=0)
+    gui.draw_state(state[0], state[1], colors, layout_version=0)
+    assert gui.particle_visual.set_colors.call_count == 1
+    assert gui.particle_visual.num_points == 3
+    assert gui.particle_visual.visible and not gui.scatter.visible
+
+    gui.draw_state(state[0], state[1], colors, layout_version=1)
+    assert gui.particle_visual.set_colors.call_count == 2
+    rgb = gui.particle_visual.set_colors.call_args[0][0]
+    assert np.array_equal(rgb, [[1, 0, 0], [0, 0, 1], [1, 1, 1]])
+
+
+def test_splat_density_bins_particles():
+    """Checks that the density kernel bins particles per pixel with their mean color."""
+    from particle_life_simulator.Class_GUI import splat_density
+
+    palette = np.array([[1, 0, 0], [0, 0, 1]], dtype=np.float32)
+    x = np.array([0.5, 0.6, 3.5, 3.5, 9.0], dtype=np.float32)
+    y = np.array([0.5, 0.7, 1.5, 1.5, 9.0], dtype=np.float32)
+    colors = np.array([0, 0, 0, 1, 1], dtype=np.int16)
+
+    image = splat_density(x, y, colors, palette, 0.0, 0.0, 1.0, 1.0, 4, 2)
+
+    assert image.shape == (2, 4, 4)
+    assert np.array_equal(image[0, 0, :3], [255, 0, 0])
+    assert np.array_equal(image[1, 3, :3], [127, 0, 127])
+    assert image[0, 0, 3] == 255  # densest pixel
+    assert np.count_nonzero(image[..., 3]) == 2  # the last particle is off-screen
+
+
+def test_serial_splat_density_matches_parallel():
+    """Checks that the serial fallback of the density kernel gives the same image."""
+    from particle_life_simulator.Class_GUI import splat_density, splat_density_serial
+
+    rng = np.random.default_rng(0)
+    palette = np.array([[1, 0, 0], [0, 0, 1]], dtype=np.float32)
+    x = rng.uniform(0, 40, 1000).astype(np.float32)
+    y = rng.uniform(0, 30, 1000).astype(np.float32)
+    colors = rng.integers(0, 2, 1000).astype(np.int16)
+
+    args = (x, y, colors, palette, 0.0, 0.0, 1.0, 1.0, 40, 30)
+    assert np.array_equal(splat_density_serial(*args), splat_density(*args))
+
+
+def test_gui_switches_to_density_above_threshold(create_mocked_gui):
+    """Checks that large particle counts are drawn as a density image."""
+    gui = create_mocked_gui
+    gui.lod_threshold = 2
+    state = np.array([[10, 20, 30], [40, 50, 60]], dtype=np.float32)
+    colors = np.zeros(3, dtype=np.int16)
+
+    gui.draw_state(state[0], state[1], colors, layout_version=0)
+    assert gui.density_image.visible
+    assert not gui.particle_visual.visible and not gui.scatter.visible
+
+    gui.lod_threshold = 10
+    gui.draw_state(state[0], state[1], colors, layout_version=0)
+    assert gui.particle_visual.visible and not gui.density_image.visible
+
+
+def test_gui_timing_key_toggles_overlay(create_mocked_gui):
+    """Checks that T toggles the draw timers and that the overlay lists all stages."""
+    gui = create_mocked_gui
+    event = MagicMock()
+    event.key.name = "T"
+
+    gui.on_key_press(event)
+    assert gui.draw_timer.enabled and gui.stage_label.visible
+
+    state = np.array([[10, 20, 30], [40, 50, 60]], dtype=np.float32)
+    gui.draw_state(state[0], state[1], np.zeros(3, dtype=np.int16), layout_version=0)
+    gui.update_stage_overlay(np.array([[0.001, 0.002]]), ("neighbors", "integrate"))
+    assert gui.draw_timer.get_times().shape == (1, 2)
+    assert "neighbors 1.00" in gui.stage_label.text and "upload" in gui.stage_label.text
+
+    gui.on_key_press(event)
+    assert not gui.draw_timer.enabled and not gui.stage_label.visible
+
+
+def test_gui_draw_particles_reuses_buffers(create_mocked_gui):
+    """Checks that drawing the same number of particles fills the same marker buffers."""
+    gui = create_mocked_gui
+    gui.scatter.set_data = MagicMock()
+    particles = np.array([[100, 200, 1], [300, 400, 99]], dtype=np.float32)
+
+    gui.draw_particles(particles, num_particles=2)
+    positions = gui.scatter.set_data.call_args[0][0]
+    colors = gui.scatter.set_data.call_args[1]["face_color"]
+    assert np.array_equal(positions, [[100, 200], [300, 400]])
+    assert np.array_equal(colors[1], [1, 1, 1])  # unknown color index is drawn white
+
+    gui.draw_particles(particles, num_particles=2)
+    assert gui.scatter.set_data.call_args[0][0] is positions
+    assert gui.draw_workspace.allocations == 1
@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../particle_life_simulator")))
+
+from particle_life_simulator.Class_Headless import HeadlessSimulation
+
+
+@pytest.fixture
+def mocked_particle_creator():
+    """Creates a particle creator mock that counts update calls."""
+    particle_creator = MagicMock()
+    particle_creator.num_particles = 100
+    return particle_creator
+
+
+def test_headless_run_steps(mocked_particle_creator):
+    """Checks that a step-limited run performs exactly the requested steps."""
+    sim = HeadlessSimulation(mocked_particle_creator)
+    report = sim.run(steps=25)
+
+    assert mocked_particle_creator.update_positions.call_count == 25
+    assert report["steps"] == 25
+    assert sim.total_steps == 25
+    assert report["particle_updates_per_second"] == pytest.approx(report["steps_per_second"] * 100)
+
+
+def test_headless_run_calls_every_hook(mocked_particle_creator):
+    """Checks that the recorder and all further step hooks run after every step, in order."""
+    calls = []
+    recorder, server = MagicMock(), MagicMock()
+    recorder.step.side_effect = lambda: calls.append("recorder")
+    server.step.side_effect = lambda: calls.append("server")
+
+    HeadlessSimulation(mocked_particle_creator, recorder=recorder, hooks=[server]).run(steps=3)
+
+    assert calls == ["recorder", "server"] * 3
+
+
+def test_headless_run_duration(mocked_particle_creator):
+    """Checks that a time-limited run stops after the duration and respects the step cap."""
+    sim = HeadlessSimulation(mocked_particle_creator)
+    report = sim.run(steps=10, duration=5.0)
+
+    assert report["steps"] == 10
+    assert report["elapsed"] < 5.0
+
+    report = sim.run(duration=0.05)
+    assert report["elapsed"] >= 0.05
+    assert sim.total_steps == 10 + report["steps"]
+
+
+def test_headless_run_requires_limit(mocked_particle_creator):
+    """Ensures a run without any limit is rejected."""
+    sim = HeadlessSimulation(mocked_particle_creator)
+    with pytest.raises(ValueError):
+        sim.run()
+
+
+def test_headless_cli():
+    """Runs the headless entry point on a small real world."""
+    from headless import main
+
+    report = main(["--particles", "200", "--width", "100", "--height", "100", "--steps", "3", "--json"])
+
+    assert report["steps"] == 3
+    assert report["num_particles"] == 200
+    assert report["warmup_time"] > 0.0
+    assert report["startup_time"] >= report["warmup_time"]
+
+
+def test_headless_cli_checkpoint_resume(tmp_path):
+    """Runs the headless entry point, saves a checkpoint and resumes from it."""
+    from headless import main
+
+    path = str(tmp_path / "run.ckpt")
+    main(["--particles", "100", "--width", "80", "--height", "80", "--steps", "2", "--checkpoint", path])
+    report = main(["--resume", path, "--steps", "2", "--checkpoint", path])
+
+    assert report["num_particles"] == 100
+
+
+def test_headless_cli_renders_png_sequence(tmp_path):
+    """Runs the headless entry point with CPU rendering of every second step, recording and streaming at once."""
+    from headless import main
+    from particle_life_simulator.Class_Recorder import open_trajectory
+
+    (tmp_path / "frames").mkdir()
+    pattern = str(tmp_path / "frames" / "frame_{:03d}.png")
+    path = str(tmp_path / "run.traj")
+    main(["--particles", "100", "--width", "80", "--height", "60", "--steps", "5",
+          "--render", pattern, "--render-interval", "2", "--render-size", "40", "30",
+          "--record", path, "--stream", "0"])
+
+    assert sorted(os.listdir(tmp_path / "frames")) == ["frame_000.png", "frame_001.png", "frame_002.png"]
+    assert open_trajectory(path)[1].shape[0] == 5
+
+
+def test_kernel_cache_is_shared_by_script_and_package_imports(tmp_path):
+    """Runs the headless script and a package import against one Numba cache directory, in both orders."""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    cache_dir = tmp_path / "cache"
+    env = dict(os.environ, NUMBA_CACHE_DIR=str(cache_dir))
+    env.pop("PYTHONPATH", None)
+    script = [
+        sys.executable, os.path.join(root, "particle_life_simulator", "headless.py"),
+        "--particles", "100", "--width", "60", "--height", "60", "--steps", "2", "--no-warmup",
+    ]
+    package = [
+        sys.executable, "-c",
+        "from particle_life_simulator.Class_Particle import CreateParticle; "
+        "cp = CreateParticle(num_particles=100, x_max=60, y_max=60); "
+        "cp.generate_particles(); cp.update_positions()",
+    ]
+
+    subprocess.run(package, cwd=root, env=env, check=True)
+    assert any(cache_dir.rglob("*.nbi"))
+    subprocess.run(script, cwd=tmp_path, env=env, check=True)
+    subprocess.run(package, cwd=root, env=env, check=True)
@@ -11,11 +11,12 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../p
 from particle_life_simulator.main import main
 
 
-@patch("particle_life_simulator.main.GUI")
+@patch("particle_life_simulator.Class_GUI.GUI")
 @patch("particle_life_simulator.main.CreateParticle")
-@patch("particle_life_simulator.main.Simulation")
+@patch("particle_life_simulator.main.warmup", return_value=0.0)
+@patch("particle_life_simulator.Class_simulation.Simulation")
 @patch("vispy.app.run")
-def test_main_execution(mock_run, mock_sim, mock_particles, mock_gui):
+def test_main_execution(mock_run, mock_sim, mock_warmup, mock_particles, mock_gui):
     """Checks if main() correctly initializes key components without enforcing specific parameters."""
 
     main()
@@ -23,10 +24,23 @@ def test_main_execution(mock_run, mock_sim, mock_particles, mock_gui):
     # Verify if the expected instances were created
     mock_gui.assert_called_once()  
     mock_particles.assert_called_once()
+    mock_warmup.assert_called_once_with(mock_particles.return_value)
     mock_sim.assert_called_once()
     mock_run.assert_called_once()
 
 
+def test_main_imports_no_gui():
+    """Ensures importing the entry point does not load VisPy or Tk."""
+    import subprocess
+
+    code = (
+        "import sys; sys.path.insert(0, 'particle_life_simulator'); import main; "
+        "assert 'vispy' not in sys.modules and 'tkinter' not in sys.modules"
+    )
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+
+
 @pytest.mark.benchmark
 @pytest.mark.skipif(os.getenv("CI") == "true", reason="Benchmark tests are only for local execution")
 def test_simulation_speed(benchmark):
@@ -1,11 +1,30 @@
 import math
 import numpy as np
+import pytest
 from particle_life_simulator.Class_Particle import (
     CreateParticle,
     update_positions_numba,
     compute_neighbors_grid,
+    build_cell_list,
+    bin_by_key,
+    fused_step,
+    accumulate_influence_map,
+    compute_influence_map,
+    morton_keys,
+    build_verlet_list,
+    balanced_chunks,
+    uniform_chunks,
+    thread_loads,
+    load_imbalance,
+    exclusive_prefix,
 )
 
+def to_soa(particles):
+    """Splits a legacy (N, 5) particle array into a (4, N) state and int16 colors."""
+    state = np.ascontiguousarray(particles[:, :4].T)
+    colors = particles[:, 4].astype(np.int16)
+    return state, colors
+
 def test_create_particle_initialization():
     """Test initialization of CreateParticle class."""
     cp = CreateParticle(
@@ -46,6 +65,18 @@ def test_generate_particles():
     assert np.all((particles[:, 3] >= -2.0) & (particles[:, 3] <= 2.0))  # y velocities
     assert np.all((particles[:, 4] >= 0) & (particles[:, 4] < cp.num_colors))  # colors
 
+
+def test_generate_particles_resets_layout():
+    """Checks that regenerating the particles tells cached consumers (e.g. the GUI colors) to refresh."""
+    cp = CreateParticle(num_particles=50, x_max=100, y_max=100, reorder_interval=1)
+    cp.generate_particles()
+    cp.update_positions()
+    version = cp.layout_version
+
+    cp.generate_particles()
+    assert cp.layout_version > version
+    assert np.array_equal(cp.particle_ids, np.arange(50))
+
 def test_set_interaction_matrix():
     """Test setting the interaction matrix."""
     cp = CreateParticle(num_colors=3)
@@ -75,9 +106,11 @@ def test_update_positions_numba():
     max_speed = 2.0
     min_speed = 0.1
     neighbor_lists = np.full((num_particles, 5), -1, dtype=np.int32)
+    state, colors = to_soa(particles)
 
-    updated_particles = update_positions_numba(
-        particles,
+    updated_state = update_positions_numba(
+        state,
+        colors,
         num_particles,
         x_max,
         y_max,
@@ -90,9 +123,9 @@ def test_update_positions_numba():
         neighbor_lists,
     )
 
-    assert updated_particles.shape == (num_particles, 5)
-    assert np.all(updated_particles[:, 0] < x_max)
-    assert np.all(updated_particles[:, 1] < y_max)
+    assert updated_state.shape == (4, num_particles)
+    assert np.all(updated_state[0] < x_max)
+    assert np.all(updated_state[1] < y_max)
 
 def test_compute_neighbors_grid():
     """Test the compute_neighbors_grid function."""
@@ -105,7 +138,526 @@ def test_compute_neighbors_grid():
         dtype=np.float32,
     )
     x_max, y_max, radius = 100, 100, 10
-    neighbor_lists = compute_neighbors_grid(particles, x_max, y_max, radius)
+    neighbor_lists = compute_neighbors_grid(particles[:, 0], particles[:, 1], x_max, y_max, radius)
 
     assert neighbor_lists.shape[0] == particles.shape[0]
     assert neighbor_lists.shape[1] >= 1  # At least one neighbor per particle
+
+def test_build_cell_list():
+    """Test that the CSR cell list holds every particle exactly once, sorted by cell."""
+    rng = np.random.default_rng(0)
+    particles = np.zeros((500, 5), dtype=np.float32)
+    particles[:, 0] = rng.uniform(0, 100, 500)
+    particles[:, 1] = rng.uniform(0, 50, 500)
+    # A dense cluster far beyond any per-cell capacity
+    particles[:200, 0] = 42.0
+    particles[:200, 1] = 17.0
+
+    cell_size = 5.0
+    cell_start, cell_particles, grid_x, grid_y = build_cell_list(particles[:, 0], particles[:, 1], 100, 50, cell_size)
+
+    assert cell_start.shape[0] == grid_x * grid_y + 1
+    assert cell_start[-1] == 500
+    assert np.array_equal(np.sort(cell_particles), np.arange(500))
+    for c in range(grid_x * grid_y):
+        members = cell_particles[cell_start[c]:cell_start[c + 1]]
+        assert np.all(np.diff(members) > 0)  # stable: ascending indices
+        for i in members:
+            assert int(particles[i, 0] // cell_size) * grid_y + int(particles[i, 1] // cell_size) == c
+
+def test_bin_by_key_matches_stable_argsort():
+    """Test that binning equals a stable sort by key and skips negative keys."""
+    rng = np.random.default_rng(3)
+    keys = rng.integers(-1, 7, 1000).astype(np.int32)
+
+    bin_start, bin_items = bin_by_key(keys, 7)
+
+    visible = np.flatnonzero(keys >= 0)
+    expected = visible[np.argsort(keys[visible], kind="stable")]
+    assert np.array_equal(bin_start, np.searchsorted(keys[expected], np.arange(8)))
+    assert np.array_equal(bin_items[:bin_start[-1]], expected)
+
+def test_compute_neighbors_grid_matches_brute_force():
+    """Test that the grid search finds exactly the neighbors within 2*radius."""
+    rng = np.random.default_rng(1)
+    particles = np.zeros((300, 5), dtype=np.float32)
+    particles[:, 0] = rng.uniform(0, 200, 300)
+    particles[:, 1] = rng.uniform(0, 200, 300)
+    radius = 4.5
+    neighbor_lists = compute_neighbors_grid(particles[:, 0], particles[:, 1], 200, 200, radius)
+
+    for i in range(300):
+        d_sq = (particles[:, 0] - particles[i, 0]) ** 2 + (particles[:, 1] - particles[i, 1]) ** 2
+        expected = set(np.nonzero(d_sq < (2.0 * radius) ** 2)[0]) - {i}
+        found = set(neighbor_lists[i][neighbor_lists[i] != -1])
+        assert found == expected
+
+    assert np.array_equal(neighbor_lists, compute_neighbors_grid(particles[:, 0], particles[:, 1], 200, 200, radius))
+
+def test_fused_step_free_motion():
+    """Test that isolated particles in the fused engine just move and wrap around."""
+    particles = np.array(
+        [
+            [10, 10, 1, 1, 0],
+            [50, 50, -1, 0.5, 1],
+            [99.5, 20, 1, 0, 0],
+        ],
+        dtype=np.float32,
+    )
+    interaction_matrix = np.ones((2, 2), dtype=np.float32)
+    state, colors = to_soa(particles)
+    updated = fused_step(
+        state, colors, 100, 100, 2.0, 16.0, interaction_matrix, interaction_matrix @ interaction_matrix, 0.1, 2.0, 0.1
+    )
+
+    assert updated is not state
+    assert np.allclose(updated[0], [11.0, 49.0, 0.5])
+    assert np.allclose(updated[1], [11.0, 50.5, 20.0])
+    assert np.array_equal(updated[2:], state[2:])
+
+def test_fused_step_resolves_overlap():
+    """Test that the fused engine pushes overlapping particles apart."""
+    particles = np.array(
+        [
+            [50, 50, 0, 0, 0],
+            [51, 50, 0, 0, 0],
+        ],
+        dtype=np.float32,
+    )
+    interaction_matrix = np.zeros((1, 1), dtype=np.float32)
+    radius = 2.0
+    state, colors = to_soa(particles)
+    updated = fused_step(
+        state, colors, 100, 100, radius, (2 * radius) ** 2, interaction_matrix, interaction_matrix, 0.1, 2.0, 0.0
+    )
+
+    assert updated[0, 1] - updated[0, 0] >= 2 * radius - 1e-4
+
+def test_create_particle_fused_update():
+    """Test that the fused engine keeps particles in the domain and is deterministic."""
+    cp = CreateParticle(num_particles=2000, x_max=200, y_max=100, radius=3, num_colors=3, fused=True)
+    cp.generate_particles()
+    cp.set_interaction_matrix(np.array([[1, -1, 0], [0, 1, -1], [-1, 0, 1]], dtype=np.float32))
+    start = cp.particles.copy()
+    cp.update_positions()
+    first = cp.particles.copy()
+
+    assert first.shape == (2000, 5)
+    assert np.all((first[:, 0] >= 0) & (first[:, 0] < 200))
+    assert np.all((first[:, 1] >= 0) & (first[:, 1] < 100))
+    assert np.array_equal(first[:, 4], start[:, 4])
+
+    cp.particles = start
+    cp.update_positions()
+    assert np.array_equal(cp.particles, first)
+
+def test_update_positions_numba_double_buffered():
+    """Test that integrating into a separate buffer treats all particles alike."""
+    particles = np.array(
+        [
+            [49, 50, 0, 0, 0],
+            [51, 50, 0, 0, 0],
+        ],
+        dtype=np.float32,
+    )
+    state, colors = to_soa(particles)
+    start = state.copy()
+    radius = 2.0
+    neighbor_lists = np.array([[1, -1], [0, -1]], dtype=np.int32)
+    out = np.empty_like(state)
+
+    updated = update_positions_numba(
+        state, colors, 2, 100, 100, radius, (2 * radius) ** 2,
+        np.zeros((1, 1), dtype=np.float32), 0.1, 2.0, 0.0, neighbor_lists, out,
+    )
+
+    assert updated is out
+    assert np.array_equal(state, start)
+    # Both particles see the start-of-step position of the other, so they are pushed symmetrically
+    assert np.isclose(50 - updated[0, 0], updated[0, 1] - 50)
+
+def test_create_particle_swaps_buffers():
+    """Test that double-buffered updates alternate between two preallocated arrays."""
+    cp = CreateParticle(num_particles=50, x_max=100, y_max=100, radius=3)
+    cp.generate_particles()
+    front = cp.state
+    back = cp.state_back
+
+    cp.update_positions()
+    assert np.shares_memory(cp.state, back)
+    assert np.shares_memory(cp.state_back, front)
+
+    cp.double_buffered = False
+    cp.update_positions()
+    assert np.shares_memory(cp.state, back)
+
+def test_structure_of_arrays_layout():
+    """Test that particle data lives in contiguous arrays with integer colors."""
+    cp = CreateParticle(num_particles=100, x_max=100, y_max=100, num_colors=4)
+    cp.generate_particles()
+
+    assert cp.state.shape == (4, 100)
+    assert cp.state.flags.c_contiguous
+    assert cp.colors.dtype == np.int16
+    assert np.all((cp.colors >= 0) & (cp.colors < 4))
+
+    particles = cp.particles
+    assert np.array_equal(particles[:, :4], cp.state.T)
+    assert np.array_equal(particles[:, 4], cp.colors.astype(np.float32))
+
+    # The legacy layout is a read-only copy; changes are loaded by assignment
+    with pytest.raises(ValueError):
+        particles[:, 0] = 7.0
+    particles = particles.copy()
+    particles[:, 0] = 7.0
+    cp.particles = particles
+    assert np.all(cp.state[0] == 7.0)
+
+def test_set_interaction_matrix_caches_pair_influence():
+    """Test that the color-pair influence table is refreshed with the interaction matrix."""
+    cp = CreateParticle(num_colors=3)
+    matrix = np.array([[0.1, -0.2, 0.3], [0.4, 0.5, -0.6], [-0.7, 0.8, 0.9]], dtype=np.float32)
+    cp.set_interaction_matrix(matrix)
+    assert np.allclose(cp.pair_influence, matrix @ matrix, atol=1e-6)
+
+    cp.set_interaction_matrix(np.eye(3, dtype=np.float32))
+    assert np.allclose(cp.pair_influence, np.eye(3))
+
+def test_influence_map_covers_domain():
+    """Test that the influence map spans the whole domain and sums every contribution."""
+    rng = np.random.default_rng(2)
+    num_particles = 20000
+    x = rng.uniform(0, 1920, num_particles).astype(np.float32)
+    y = rng.uniform(0, 1080, num_particles).astype(np.float32)
+    influence_x = rng.uniform(-1, 1, num_particles).astype(np.float32)
+    influence_y = rng.uniform(-1, 1, num_particles).astype(np.float32)
+    scale = 2.25
+
+    influence_map = accumulate_influence_map(x, y, influence_x, influence_y, scale, 1920, 1080)
+
+    assert influence_map.shape == (int(1920 / scale) + 1, int(1080 / scale) + 1, 2)
+    expected = np.zeros(influence_map.shape, dtype=np.float64)
+    np.add.at(expected[..., 0], ((x / scale).astype(int), (y / scale).astype(int)), influence_x)
+    np.add.at(expected[..., 1], ((x / scale).astype(int), (y / scale).astype(int)), influence_y)
+    assert np.allclose(influence_map, expected, atol=1e-4)
+
+def test_compute_influence_map_far_from_origin():
+    """Test that pairs far from the top-left corner contribute to the influence map."""
+    x = np.array([1499.0, 1500.5], dtype=np.float32)
+    y = np.array([900.0, 900.0], dtype=np.float32)
+    colors = np.array([0, 0], dtype=np.int16)
+    pair_influence = np.ones((1, 1), dtype=np.float32)
+    neighbor_lists = np.array([[1, -1], [0, -1]], dtype=np.int32)
+
+    influence_map = compute_influence_map(x, y, colors, pair_influence, neighbor_lists, 3.0, 1920, 1080)
+
+    assert influence_map[499, 300, 0] == 1.0
+    assert influence_map[500, 300, 0] == -1.0
+    assert influence_map[500, 300, 1] == 0.0
+    assert influence_map[0, 0, 0] == 0.0
+
+def test_reorder_particles_keeps_particle_identity():
+    """Test that reordering permutes all particle data consistently along with the IDs."""
+    for order in ("morton", "cell"):
+        cp = CreateParticle(num_particles=3000, x_max=300, y_max=200, radius=4, num_colors=4, reorder_order=order)
+        cp.generate_particles()
+        before = cp.particles
+        version = cp.layout_version
+
+        cp.reorder_particles()
+        after = cp.particles
+        ids = cp.particle_ids
+
+        assert cp.layout_version == version + 1
+        assert np.array_equal(np.sort(ids), np.arange(3000))
+        assert np.array_equal(after, before[ids])
+
+def test_reorder_particles_sorts_by_morton_code():
+    """Test that Morton reordering leaves the particles sorted by their Z-order key."""
+    cp = CreateParticle(num_particles=2000, x_max=400, y_max=400, radius=4)
+    cp.generate_particles()
+    cp.reorder_particles()
+
+    cell_size = max(2.0 * cp.radius, 1.0)
+    keys = morton_keys(cp.state[0], cp.state[1], cp.x_max, cp.y_max, cell_size)
+    assert np.all(np.diff(keys) >= 0)
+
+def test_update_positions_reorders_every_interval():
+    """Test that periodic reordering does not change the simulated trajectories."""
+    kwargs = dict(num_particles=1500, x_max=200, y_max=150, radius=4, num_colors=3, fused=True)
+    matrix = np.array([[1, -1, 0], [0, 1, -1], [-1, 0, 1]], dtype=np.float32)
+    reference = CreateParticle(**kwargs)
+    reordered = CreateParticle(reorder_interval=2, **kwargs)
+    reference.generate_particles()
+    reordered.particles = reference.particles
+    for cp in (reference, reordered):
+        cp.set_interaction_matrix(matrix)
+
+    for _ in range(3):
+        reference.update_positions()
+        reordered.update_positions()
+
+    assert reordered.layout_version == 2  # particles setter + one reorder
+    by_id = np.empty_like(reordered.particles)
+    by_id[reordered.particle_ids] = reordered.particles
+    assert np.allclose(by_id, reference.particles, atol=1e-3)
+
+def test_build_verlet_list_matches_brute_force():
+    """Test that the Verlet list holds exactly the pairs closer than the cutoff."""
+    np.random.seed(3)
+    x = np.random.uniform(0, 120, 800).astype(np.float32)
+    y = np.random.uniform(0, 90, 800).astype(np.float32)
+    cutoff = 7.5
+
+    start, index = build_verlet_list(x, y, 120, 90, cutoff)
+
+    dist_sq = (x[:, None] - x[None, :]) ** 2 + (y[:, None] - y[None, :]) ** 2
+    np.fill_diagonal(dist_sq, np.inf)
+    for i in range(x.shape[0]):
+        expected = np.flatnonzero(dist_sq[i] < cutoff * cutoff)
+        assert np.array_equal(np.sort(index[start[i]:start[i + 1]]), expected)
+
+def test_verlet_list_matches_rebuild_every_step():
+    """Test that reusing a Verlet list gives the same trajectories as rebuilding every step."""
+    matrix = np.array([[1, -1, 0], [0, 1, -1], [-1, 0, 1]], dtype=np.float32)
+    # Slow particles on a jittered lattice away from the borders, so lists are reused
+    np.random.seed(5)
+    gx, gy = np.meshgrid(np.arange(20) * 6.5 + 40, np.arange(20) * 6.5 + 40)
+    particles = np.zeros((400, 5), dtype=np.float32)
+    particles[:, 0] = gx.ravel() + np.random.uniform(-0.5, 0.5, 400)
+    particles[:, 1] = gy.ravel() + np.random.uniform(-0.5, 0.5, 400)
+    particles[:, 2:4] = np.random.uniform(-0.2, 0.2, (400, 2))
+    particles[:, 4] = np.random.randint(0, 3, 400)
+
+    for fused in (False, True):
+        kwargs = dict(num_particles=400, x_max=240, y_max=240, radius=4, num_colors=3,
+                      max_speed=0.3, min_speed=0.0, interaction_strength=0.01, fused=fused)
+        reference = CreateParticle(**kwargs)
+        verlet = CreateParticle(skin=2.0, **kwargs)
+        for cp in (reference, verlet):
+            cp.particles = particles
+            cp.set_interaction_matrix(matrix)
+
+        for _ in range(10):
+            reference.update_positions()
+            verlet.update_positions()
+
+        assert verlet.verlet_builds < 10
+        assert np.array_equal(verlet.particles, reference.particles)
+
+def test_verlet_list_lifetimes_and_wrap_trigger():
+    """Test list lifetime bookkeeping and that wrapping around a border forces a rebuild."""
+    cp = CreateParticle(num_particles=1, x_max=100, y_max=100, radius=4, skin=4.0,
+                        speed_range=(0.0, 0.0), min_speed=0.0, max_speed=1.0)
+    cp.particles = np.array([[50.0, 50.0, 0.5, 0.0, 0.0]], dtype=np.float32)
+
+    for _ in range(5):
+        cp.update_positions()
+    # Moving 0.5 per step, the 2.0 half-skin is exceeded after the fifth step
+    assert cp.verlet_builds == 1
+    cp.update_positions()
+    assert cp.verlet_builds == 2
+    assert np.array_equal(cp.get_list_lifetimes(), [5])
+
+    cp.particles = np.array([[99.8, 50.0, 0.5, 0.0, 0.0]], dtype=np.float32)
+    cp.update_positions()
+    cp.update_positions()
+    assert cp.state[0, 0] < 1.0
+    assert cp.verlet_builds == 4
+    assert np.array_equal(cp.get_list_lifetimes(), [5, 1, 1])
+
+
+def test_warmup_keeps_random_stream():
+    """Checks that warming up compiles the kernels without touching the random generators."""
+    from particle_life_simulator.Class_Particle import warmup
+
+    p_set = CreateParticle(num_particles=50, x_max=60, y_max=60, num_colors=3, fused=True, skin=0.5)
+    np.random.seed(7)
+    expected = np.random.random(4)
+
+    np.random.seed(7)
+    assert warmup(p_set) > 0.0
+    assert np.array_equal(np.random.random(4), expected)
+    assert p_set.step_count == 0
+
+
+def test_stage_timing_records_only_when_enabled():
+    """Checks that update_positions records one row of stage times per timed step."""
+    from particle_life_simulator.Class_Particle import STAGES
+
+    p_set = CreateParticle(num_particles=500, x_max=100, y_max=100, num_colors=3)
+    p_set.generate_particles()
+    p_set.update_positions()
+    assert p_set.get_stage_times().shape == (0, len(STAGES))
+
+    p_set.set_timing(True)
+    p_set.update_positions()
+    p_set.update_positions()
+    p_set.set_timing(False)
+    p_set.update_positions()
+
+    times = p_set.get_stage_times()
+    assert times.shape == (2, len(STAGES))
+    assert np.all(times[:, :3] > 0.0)
+
+
+def test_balanced_chunks_equalize_clustered_costs():
+    """Checks that cost-balanced chunks give every thread the same work where equal-length chunks do not."""
+    costs = np.ones(1000, dtype=np.int64)
+    costs[:10] = 100
+    prefix = np.zeros(1001, dtype=np.int64)
+    prefix[1:] = np.cumsum(costs)
+
+    bounds = balanced_chunks(prefix, 4)
+    assert bounds[0] == 0 and bounds[-1] == 1000
+    assert np.all(np.diff(bounds) >= 0)
+
+    balanced = thread_loads(prefix, bounds, 4)
+    uniform = thread_loads(prefix, uniform_chunks(1000, 4), 4)
+    assert balanced.sum() == uniform.sum() == prefix[-1]
+    assert load_imbalance(balanced) < 1.02
+    assert load_imbalance(uniform) > 2.0
+
+
+def test_exclusive_prefix_in_place():
+    """Checks that the prefix sum may overwrite its own costs."""
+    buffer = np.array([3, 1, 4, 1, 5, -1], dtype=np.int64)
+    exclusive_prefix(buffer[:5], buffer)
+    assert buffer.tolist() == [0, 3, 4, 8, 9, 14]
+
+
+def test_thread_loads_follow_recorded_threads():
+    """Checks that recorded chunk threads replace the assumed contiguous assignment."""
+    prefix = np.arange(0, 1010, 10, dtype=np.int64)
+    prefix[1:] += 990
+    bounds = uniform_chunks(100, 4)
+
+    assumed = thread_loads(prefix, bounds, 2)
+    recorded = thread_loads(prefix, bounds, 2, np.array([1, 1, 1, 0], dtype=np.int64))
+
+    assert assumed.tolist() == [1490.0, 500.0]
+    assert recorded.tolist() == [250.0, 1740.0]
+
+
+def test_fused_cell_engine_measures_load():
+    """Checks that the cell-list fused engine records the same costs and loads as its balanced variant."""
+    rng = np.random.default_rng(5)
+    state = np.empty((4, 2000), dtype=np.float32)
+    state[:2] = rng.uniform(0, 30, (2, 2000))
+    state[2:] = rng.uniform(-1, 1, (2, 2000))
+
+    prefixes = []
+    for balance_load in (True, False):
+        p_set = CreateParticle(
+            num_particles=2000, x_max=200, y_max=200, num_colors=4, radius=3.0,
+            fused=True, balance_load=balance_load
+        )
+        p_set.state[:] = state
+        p_set.update_positions()
+        prefix = p_set.workspace.cost_prefix.copy()
+        assert prefix[-1] > 2000
+        assert p_set.workspace.thread_loads.sum() == prefix[-1]
+        prefixes.append(prefix)
+    assert np.array_equal(prefixes[0], prefixes[1])
+
+
+def test_balance_load_keeps_results_on_clustered_state():
+    """Checks that load balancing only changes the work split, not the result, in all engines."""
+    rng = np.random.default_rng(3)
+    state = np.empty((4, 3000), dtype=np.float32)
+    # Most particles crowd into one corner, the rest are spread out
+    state[0] = np.where(np.arange(3000) < 2000, rng.uniform(0, 20, 3000), rng.uniform(0, 200, 3000))
+    state[1] = np.where(np.arange(3000) < 2000, rng.uniform(0, 20, 3000), rng.uniform(0, 200, 3000))
+    state[2:] = rng.uniform(-1, 1, (2, 3000))
+    colors = rng.integers(0, 4, 3000).astype(np.int16)
+    matrix = rng.uniform(-1, 1, (4, 4)).astype(np.float32)
+
+    for fused, skin in ((False, 0.0), (True, 0.0), (True, 1.0)):
+        results = []
+        for balance_load in (True, False):
+            p_set = CreateParticle(
+                num_particles=3000, x_max=200, y_max=200, num_colors=4, radius=3.0,
+                fused=fused, skin=skin, balance_load=balance_load
+            )
+            p_set.state[:] = state
+            p_set.colors[:] = colors
+            p_set.set_interaction_matrix(matrix)
+            for _ in range(3):
+                p_set.update_positions()
+            assert all(value >= 1.0 for value in p_set.get_load_imbalance())
+            results.append(p_set.state.copy())
+        assert np.array_equal(results[0], results[1])
+
+
+def test_generate_seeded_is_reproducible_and_in_range():
+    """Checks that seeded worlds depend only on the seed, for both layouts."""
+    from numba import get_num_threads, set_num_threads
+
+    worlds = []
+    for layout in ("uniform", "clusters"):
+        p_set = CreateParticle(num_particles=5000, x_max=300, y_max=200, num_colors=4, speed_range=(-1.0, 1.0))
+        p_set.generate_seeded(42, layout)
+        assert np.all((p_set.state[0] >= 0) & (p_set.state[0] < 300))
+        assert np.all((p_set.state[1] >= 0) & (p_set.state[1] < 200))
+        assert np.all(np.abs(p_set.state[2:]) <= 1.0)
+        assert set(np.unique(p_set.colors)) == {0, 1, 2, 3}
+        worlds.append((p_set.state.copy(), p_set.colors.copy()))
+
+    threads = get_num_threads()
+    set_num_threads(1)
+    try:
+        p_set = CreateParticle(num_particles=5000, x_max=300, y_max=200, num_colors=4, speed_range=(-1.0, 1.0))
+        p_set.generate_seeded(42)
+    finally:
+        set_num_threads(threads)
+    assert np.array_equal(p_set.state, worlds[0][0])
+    assert np.array_equal(p_set.colors, worlds[0][1])
+
+    p_set.generate_seeded(43)
+    assert not np.array_equal(p_set.state, worlds[0][0])
+
+    # Clusters: every color stays close to its own mean
+    state, colors = worlds[1]
+    for c in range(4):
+        assert np.median(np.abs(state[0, colors == c] - np.median(state[0, colors == c]))) < 20
+
+
+def test_load_layout_copies_positions_and_seeds_velocities():
+    """Checks that loaded layouts keep the given positions and colors and resize the system."""
+    p_set = CreateParticle(num_particles=10, x_max=100, y_max=50, num_colors=3)
+    positions = np.array([[10.0, 120.0, -5.0], [5.0, 20.0, 60.0]], dtype=np.float32)
+    colors = np.array([0, 2, 1], dtype=np.int16)
+    p_set.load_layout(positions, colors, 7)
+
+    assert p_set.num_particles == 3
+    assert np.allclose(p_set.state[:2], [[10.0, 20.0, 95.0], [5.0, 20.0, 10.0]])
+    assert np.array_equal(p_set.colors, colors)
+
+    seeded = CreateParticle(num_particles=3, x_max=100, y_max=50, num_colors=3)
+    seeded.generate_seeded(7)
+    assert np.array_equal(p_set.state[2:], seeded.state[2:])
+    p_set.update_positions()
+
+    with pytest.raises(ValueError):
+        p_set.load_layout(positions, np.array([0, 3, 1], dtype=np.int16))
+
+
+@pytest.mark.parametrize("engine", [{}, {"fused": True}, {"fused": True, "skin": 1.0}, {"skin": 1.0}])
+def test_workspace_is_reused_across_steps(engine):
+    """Checks that steady-state steps reuse the scratch buffers and that they grow with the particle count."""
+    p_set = CreateParticle(num_particles=3000, x_max=200, y_max=100, num_colors=4, **engine)
+    p_set.generate_seeded(5)
+    p_set.set_interaction_matrix(np.eye(4, dtype=np.float32))
+    p_set.update_positions()
+
+    workspace = p_set.workspace
+    allocations = workspace.allocations
+    assert allocations > 0
+    for _ in range(5):
+        p_set.update_positions()
+    assert workspace.allocations == allocations
+
+    p_set.load_layout(p_set.state[:2, :1000].copy(), p_set.colors[:1000].copy())
+    p_set.update_positions()
+    assert workspace.allocations > allocations
+    assert workspace.cost_prefix.shape[0] == 1001
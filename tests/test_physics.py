@@ -0,0 +1,80 @@
+import threading
+import time
+import numpy as np
+import numba
+from particle_life_simulator.Class_Particle import CreateParticle, step_particles
+from particle_life_simulator.Class_Physics import THREADSAFE_LAYERS, PhysicsThread, TripleBuffer, select_threading_layer
+
+
+def test_triple_buffer_hands_over_latest_frame():
+    """Test that the consumer only sees completed frames and always the newest one."""
+    buffer = TripleBuffer()
+    assert buffer.acquire() is None
+
+    for step in (1, 2):
+        frame = buffer.write_frame()
+        frame.step = step
+        buffer.publish()
+
+    frame = buffer.acquire()
+    assert frame.step == 2
+    assert buffer.acquire() is None
+    assert buffer.write_frame() is not frame
+
+
+def test_step_particles_matches_method_and_releases_gil():
+    """Test that the nogil wrapper steps like update_positions and lets other threads run."""
+    kwargs = dict(num_particles=20000, x_max=400, y_max=300, num_colors=3)
+    a = CreateParticle(**kwargs)
+    a.generate_particles()
+    b = CreateParticle(**kwargs)
+    b.particles = a.particles
+    a.update_positions()
+    step_particles(b)
+    assert np.array_equal(a.particles, b.particles)
+
+    ticks = []
+    stop = threading.Event()
+
+    def count():
+        while not stop.is_set():
+            ticks.append(1)
+            time.sleep(0.001)
+
+    counter = threading.Thread(target=count)
+    counter.start()
+    time.sleep(0.01)
+    before = len(ticks)
+    step_particles(b, 20)
+    during = len(ticks) - before
+    stop.set()
+    counter.join()
+    assert during > 0
+
+
+def test_physics_thread_publishes_frames():
+    """Test that the physics thread steps the system and publishes its positions."""
+    cp = CreateParticle(num_particles=300, x_max=100, y_max=100, num_colors=3)
+    cp.generate_particles()
+    buffer = TripleBuffer()
+    physics = PhysicsThread(cp, buffer)
+    physics.start()
+
+    deadline = time.time() + 30
+    frame = None
+    while time.time() < deadline and frame is None:
+        frame = buffer.acquire()
+        time.sleep(0.01)
+    physics.stop(timeout=30)
+
+    assert physics.error is None
+    assert frame is not None and frame.step >= 1
+    assert frame.x.shape == (300,) and frame.colors.dtype == np.int16
+    assert np.array_equal(np.sort(frame.colors), np.sort(cp.colors))
+
+
+def test_select_threading_layer_reports_loaded_layer():
+    """Test that the selection loads a layer and reports whether it is thread-safe."""
+    safe = select_threading_layer()
+    assert safe == (numba.threading_layer() in THREADSAFE_LAYERS)
+    assert select_threading_layer() == safe
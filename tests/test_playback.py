@@ -0,0 +1,67 @@
+import time
+import numpy as np
+import pytest
+from particle_life_simulator.Class_Particle import CreateParticle
+from particle_life_simulator.Class_Playback import TrajectoryPlayer
+from particle_life_simulator.Class_Recorder import TrajectoryRecorder
+
+
+@pytest.fixture
+def recorded_run(tmp_path):
+    """Records ten frames of a small world and returns the path and the expected frames."""
+    path = str(tmp_path / "run.traj")
+    cp = CreateParticle(num_particles=200, x_max=100, y_max=80, num_colors=3)
+    cp.generate_particles()
+    cp.set_interaction_matrix(np.eye(3, dtype=np.float32))
+    expected = []
+    with TrajectoryRecorder(path, cp) as recorder:
+        for _ in range(10):
+            cp.update_positions()
+            recorder.step()
+            expected.append(cp.get_positions_and_colors())
+    return path, expected
+
+
+def test_player_plays_seeks_and_pauses(recorded_run):
+    """Test playback, seeking and pausing at the end of the recording."""
+    path, expected = recorded_run
+    with TrajectoryPlayer(path, prefetch=2) as player:
+        assert player.num_frames == 10
+        assert np.array_equal(player.get_positions_and_colors(), expected[0])
+
+        player.update_positions()
+        assert np.array_equal(player.get_positions_and_colors(), expected[1])
+
+        player.seek(7)
+        assert np.array_equal(player.get_positions_and_colors(), expected[7])
+
+        player.set_speed(2)
+        player.update_positions()
+        player.update_positions()
+        assert player.frame == 9
+        assert not player.playing
+        assert np.array_equal(player.get_positions_and_colors(), expected[9])
+
+
+def test_player_key_bindings_and_prefetch(recorded_run):
+    """Test the playback keys and that upcoming frames are prefetched."""
+    path, expected = recorded_run
+    with TrajectoryPlayer(path, prefetch=3) as player:
+        assert player.handle_key("Space")
+        assert not player.playing
+        player.handle_key("Up")
+        assert player.speed == 2
+        player.handle_key("R")
+        assert player.speed == -2
+        player.handle_key("End")
+        assert player.upcoming_frames() == [9, 7, 5, 3]
+
+        deadline = time.time() + 5
+        while time.time() < deadline and not all(f in player.cache for f in (7, 5, 3)):
+            time.sleep(0.01)
+        assert all(f in player.cache for f in (7, 5, 3))
+
+        player.handle_key("Space")
+        player.update_positions()
+        assert np.array_equal(player.get_positions_and_colors(), expected[7])
+        assert not player.handle_key("Q")
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from particle_life_simulator.Class_Headless import HeadlessSimulation
+from particle_life_simulator.Class_Particle import CreateParticle
+from particle_life_simulator.Class_Recorder import TrajectoryRecorder, open_trajectory
+
+
+def test_recorder_writes_frames_in_id_order(tmp_path):
+    """Test that recorded frames follow particle IDs through reordering and map back from disk."""
+    path = str(tmp_path / "run.traj")
+    cp = CreateParticle(num_particles=500, x_max=100, y_max=80, radius=4, num_colors=3,
+                        fused=True, reorder_interval=2)
+    cp.generate_particles()
+    cp.set_interaction_matrix(np.eye(3, dtype=np.float32))
+
+    expected = []
+    with TrajectoryRecorder(path, cp, interval=2, num_buffers=2) as recorder:
+        for _ in range(6):
+            cp.update_positions()
+            if recorder.steps_seen % 2 == 0:
+                by_id = np.empty_like(cp.particles)
+                by_id[cp.particle_ids] = cp.particles
+                expected.append(by_id.T)
+            recorder.step()
+
+    metadata, frames = open_trajectory(path)
+    assert metadata["num_particles"] == 500
+    assert metadata["interval"] == 2
+    assert isinstance(frames, np.memmap)
+    assert frames.shape == (3, 5, 500)
+    assert np.array_equal(frames, np.stack(expected))
+
+
+def test_recorder_selected_fields_and_headless_stage(tmp_path):
+    """Test recording a subset of fields from the headless step loop."""
+    path = str(tmp_path / "xy.traj")
+    cp = CreateParticle(num_particles=50, x_max=100, y_max=80, num_colors=3)
+    cp.generate_particles()
+    cp.set_interaction_matrix(np.eye(3, dtype=np.float32))
+
+    recorder = TrajectoryRecorder(path, cp, fields=("y", "x"))
+    HeadlessSimulation(cp, recorder=recorder).run(steps=4)
+    recorder.close()
+
+    _, frames = open_trajectory(path)
+    assert frames.shape == (4, 2, 50)
+    assert np.array_equal(frames[-1, 0], cp.state[1])
+    assert np.array_equal(frames[-1, 1], cp.state[0])
+
+    with pytest.raises(ValueError):
+        TrajectoryRecorder(path, cp, fields=("z",))
+    with pytest.raises(RuntimeError):
+        recorder.record()
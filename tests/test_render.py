@@ -0,0 +1,101 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+from particle_life_simulator.Class_Particle import CreateParticle
+from particle_life_simulator.Class_Render import (
+    DEFAULT_COLOR_LOOKUP,
+    FrameExporter,
+    FrameRenderer,
+    encode_png,
+)
+
+
+def decode_png(data):
+    """Decodes the unfiltered 8 bit RGB PNG files written by `encode_png`."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    offset = 8
+    chunks = {}
+    while offset < len(data):
+        (length,) = struct.unpack(">I", data[offset:offset + 4])
+        tag = data[offset + 4:offset + 8]
+        body = data[offset + 8:offset + 8 + length]
+        (crc,) = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])
+        assert zlib.crc32(tag + body) == crc
+        chunks[tag] = body
+        offset += 12 + length
+    width, height = struct.unpack(">II", chunks[b"IHDR"][:8])
+    scanlines = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(height, -1)
+    assert np.all(scanlines[:, 0] == 0)
+    return scanlines[:, 1:].reshape(height, width, 3)
+
+
+def test_renderer_draws_discs_with_palette_colors():
+    """Checks disc size, palette colors and that the world y-axis points up in the image."""
+    renderer = FrameRenderer(40, 20, x_max=80, y_max=40, particle_size=5)
+    particles = np.array([[20.0, 30.0, 1], [60.0, 10.0, 2], [0.2, 0.2, 9]], dtype=np.float32)
+    image = renderer.render(particles)
+
+    blue = np.array(DEFAULT_COLOR_LOOKUP[1]) * 255
+    green = np.array(DEFAULT_COLOR_LOOKUP[2]) * 255
+    # World (20, 30) is pixel (10, 5) from the top, world (60, 10) pixel (30, 15)
+    assert np.array_equal(image[5, 10], blue)
+    assert np.array_equal(image[15, 30], green)
+    assert np.all(np.all(image == blue, axis=2).sum(axis=1) <= 5)
+    assert np.all(image == blue, axis=2).sum() > 9
+    # Unknown colors are drawn white, the rest is background
+    assert np.array_equal(image[19, 0], [255, 255, 255])
+    assert np.array_equal(image[0, 39], [0, 0, 0])
+
+
+def test_renderer_small_particles_cover_their_pixel():
+    """Checks that particles smaller than a pixel still show up."""
+    renderer = FrameRenderer(100, 50, x_max=100, y_max=50, particle_size=0.3)
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 100, 200).astype(np.float32)
+    y = rng.uniform(0, 50, 200).astype(np.float32)
+    colors = np.zeros(200, dtype=np.int16)
+    image = renderer.render_state(x, y, colors)
+
+    rows = 49 - np.floor(y).astype(int)
+    columns = np.floor(x).astype(int)
+    assert np.all(image[rows, columns, 0] == 255)
+    assert np.count_nonzero(image[:, :, 0]) == len(set(zip(rows, columns)))
+
+
+def test_encode_png_round_trip():
+    """Checks that the PNG encoder writes a valid file with the exact pixels."""
+    image = np.random.default_rng(1).integers(0, 256, (7, 11, 3)).astype(np.uint8)
+    assert np.array_equal(decode_png(encode_png(image)), image)
+
+
+def test_exporter_writes_png_sequence_and_raw_video(tmp_path):
+    """Checks that the exporter renders every interval-th step to PNG files or one raw video."""
+    cp = CreateParticle(num_particles=300, x_max=64, y_max=48, num_colors=3)
+    cp.generate_particles()
+    cp.set_interaction_matrix(np.eye(3, dtype=np.float32))
+    renderer = FrameRenderer(32, 24, cp.x_max, cp.y_max)
+
+    pattern = str(tmp_path / "frame_{:04d}.png")
+    expected = []
+    with FrameExporter(pattern, cp, renderer, interval=2, num_workers=3, num_buffers=2) as exporter:
+        for _ in range(7):
+            cp.update_positions()
+            exporter.step()
+            if (exporter.steps_seen - 1) % 2 == 0:
+                expected.append(renderer.render(cp.get_positions_and_colors()))
+    assert exporter.frames_rendered == 4
+    for index, image in enumerate(expected):
+        with open(pattern.format(index), "rb") as file:
+            assert np.array_equal(decode_png(file.read()), image)
+
+    path = str(tmp_path / "run.rgb")
+    with FrameExporter(path, cp, renderer) as exporter:
+        for _ in range(3):
+            exporter.step()
+    video = np.fromfile(path, dtype=np.uint8).reshape(3, 24, 32, 3)
+    assert np.array_equal(video[2], renderer.render(cp.get_positions_and_colors()))
+
+    with pytest.raises(ValueError):
+        FrameExporter(str(tmp_path / "frame.png"), cp, renderer)
@@ -82,3 +82,67 @@ def test_simulation_benchmark_fps_avg(create_mocked_simulation, capsys):
     create_mocked_simulation.stop()  
 
     assert avg_fps_calculated == pytest.approx(40.00, rel=0.01) 
+
+
+def test_simulation_draws_state_views(create_mocked_simulation):
+    """Tests that systems exposing a state array are drawn from views of their rows."""
+    sim = create_mocked_simulation
+    state = np.zeros((4, 5), dtype=np.float32)
+    sim.particle_creator.state = state
+    sim.particle_creator.colors = np.zeros(5, dtype=np.int16)
+    sim.particle_creator.layout_version = 3
+
+    sim.on_timer(MagicMock())
+
+    x, y, colors, layout_version = sim.gui.draw_state.call_args[0]
+    assert np.shares_memory(x, state) and np.shares_memory(y, state)
+    assert layout_version == 3
+    sim.gui.draw_particles.assert_not_called()
+
+
+def test_simulation_threaded_draws_published_frames(create_mocked_simulation):
+    """Tests that threaded mode draws frames from the physics thread and reports both rates."""
+    sim = create_mocked_simulation
+    sim.threaded = True
+    sim.start()
+    try:
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline and not sim.gui.draw_state.called:
+            sim.on_timer(MagicMock())
+            time.sleep(0.01)
+        sim.last_time = time.perf_counter() - 1.1
+        sim.on_timer(MagicMock())
+    finally:
+        sim.stop()
+
+    assert sim.gui.draw_state.called
+    assert sim.particle_creator.update_positions.called
+    assert len(sim.gui.update_fps.call_args[0]) == 2
+    assert sim.physics is None
+
+
+def test_simulation_threaded_uses_serial_drawing_without_safe_layer(create_mocked_simulation):
+    """Checks that the GUI draws with serial kernels while the physics thread runs on an unsafe layer."""
+    sim = create_mocked_simulation
+    sim.threaded = True
+    with patch("particle_life_simulator.Class_simulation.select_threading_layer", return_value=False):
+        sim.start()
+        try:
+            assert sim.gui.serial_kernels is True
+        finally:
+            sim.stop()
+    assert sim.gui.serial_kernels is False
+
+
+def test_simulation_timing_toggles_particles_and_gui(create_mocked_simulation):
+    """Checks that the GUI timing key reaches the particle system and the overlay is fed."""
+    sim = create_mocked_simulation
+    sim.particle_creator.get_stage_times.return_value = np.zeros((1, 4))
+
+    sim.gui.timing_handler(True)
+    sim.particle_creator.set_timing.assert_called_once_with(True)
+    sim.gui.set_timing.assert_called_once_with(True)
+
+    sim.last_time = time.perf_counter() - 2.0
+    sim.report_rates()
+    sim.gui.update_stage_overlay.assert_called_once()
@@ -0,0 +1,120 @@
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from particle_life_simulator.Class_Particle import CreateParticle
+from particle_life_simulator.Class_Stream import (
+    QUANT_MAX,
+    StreamClient,
+    StreamServer,
+    decode_frame,
+    dequantize_positions,
+    encode_frame,
+    quantize_positions,
+)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError
+        time.sleep(0.01)
+
+
+def connect(server, world):
+    """Connects a client while stepping the server, which sends the handshake with the first frame."""
+    clients = []
+    thread = threading.Thread(target=lambda: clients.append(StreamClient(*server.address)))
+    thread.start()
+    while thread.is_alive():
+        if server.connections:
+            world.update_positions()
+            server.step()
+        time.sleep(0.01)
+    client = clients[0]
+    wait_for(lambda: client.frames_received > 0)
+    client.update_positions()
+    return client
+
+
+def test_frames_round_trip_against_keyframe():
+    """Checks that keyframes and deltas decode exactly, including moves across the wrap-around border."""
+    rng = np.random.default_rng(0)
+    keyframe = rng.integers(0, QUANT_MAX + 1, (2, 1000)).astype(np.uint16)
+    frame = (keyframe.astype(np.int64) + rng.integers(-300, 300, (2, 1000))) % (QUANT_MAX + 1)
+    frame = frame.astype(np.uint16)
+
+    assert np.array_equal(decode_frame(encode_frame(keyframe), None, 1000), keyframe)
+    delta = encode_frame(frame, keyframe)
+    assert np.array_equal(decode_frame(delta, keyframe, 1000), frame)
+    assert len(delta) < len(encode_frame(frame))
+    with pytest.raises(ValueError):
+        decode_frame(delta, keyframe, 999)
+
+
+def test_quantization_error_and_id_order():
+    """Checks the quantisation step and that frames are written in particle ID order."""
+    state = np.array([[0.0, 50.0, 99.99, 120.0], [0.0, 40.0, 79.99, -1.0]], dtype=np.float32)
+    particle_ids = np.array([3, 2, 1, 0], dtype=np.int32)
+    frame = np.empty((2, 4), dtype=np.uint16)
+    quantize_positions(state, particle_ids, 100, 80, frame)
+    positions = np.empty((2, 4), dtype=np.float32)
+    dequantize_positions(frame, 100.0, 80.0, positions)
+
+    assert np.allclose(positions[:, particle_ids[:3]], state[:, :3], atol=100 / QUANT_MAX)
+    assert np.array_equal(frame[:, 0], [QUANT_MAX, 0])
+
+
+def test_loopback_client_follows_simulation():
+    """Checks that a loopback client receives the colors once and then the positions of every step."""
+    cp = CreateParticle(num_particles=2000, x_max=200, y_max=100, num_colors=4)
+    cp.generate_particles()
+    cp.set_interaction_matrix(np.eye(4, dtype=np.float32))
+
+    with StreamServer(cp, keyframe_interval=4) as server:
+        with connect(server, cp) as client:
+            assert client.num_particles == 2000
+            assert np.array_equal(client.colors[cp.particle_ids], cp.colors)
+
+            for _ in range(10):
+                cp.update_positions()
+                server.step()
+                wait_for(lambda: client.latest is not None)
+                client.update_positions()
+                assert client.step_count == cp.step_count
+                shown = client.state[:, cp.particle_ids]
+                assert np.abs(shown[0] - cp.state[0]).max() <= 200 / QUANT_MAX
+                assert np.abs(shown[1] - cp.state[1]).max() <= 100 / QUANT_MAX
+
+            stats = server.stats()[0]
+            assert stats["frames_dropped"] == 0
+            assert stats["keyframes_sent"] >= 3
+
+
+def test_skip_grows_for_client_that_does_not_read():
+    """Checks that frames are dropped and the frame skip grows while a client does not keep up."""
+    rng = np.random.default_rng(1)
+    num_particles = 200000
+    world = SimpleNamespace(
+        num_particles=num_particles, x_max=1000, y_max=1000,
+        state=np.zeros((4, num_particles), dtype=np.float32),
+        colors=np.zeros(num_particles, dtype=np.int16),
+        particle_ids=np.arange(num_particles, dtype=np.int32),
+    )
+
+    with StreamServer(world, max_skip=8) as server:
+        sock = socket.create_connection(server.address)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        wait_for(lambda: server.connections)
+        for _ in range(200):
+            # Random positions do not compress, so the socket buffers fill up quickly
+            world.state[:2] = rng.uniform(0, 1000, (2, num_particles))
+            server.step()
+        stats = server.stats()[0]
+        assert stats["frames_dropped"] > 0
+        assert stats["skip"] == 8
+        sock.close()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from particle_life_simulator.Class_Timing import (
+    STAGE_HISTORY,
+    StageTimer,
+    export_stage_times,
+    ordered_history,
+    summarize_stage_times,
+)
+
+
+def test_stage_timer_ignores_frames_while_disabled():
+    """Checks that a disabled timer records nothing and an enabled one books every stage."""
+    timer = StageTimer(("a", "b"))
+    timer.start_frame()
+    timer.mark(0)
+    assert timer.get_times().shape == (0, 2)
+
+    timer.enabled = True
+    timer.start_frame()
+    timer.mark(0)
+    timer.mark(1)
+    times = timer.get_times()
+    assert times.shape == (1, 2)
+    assert np.all(times >= 0.0)
+
+
+def test_ordered_history_unrolls_ring_buffer():
+    """Checks that a wrapped ring buffer is returned oldest frame first."""
+    times = np.zeros((STAGE_HISTORY, 1))
+    for frame in range(STAGE_HISTORY + 3):
+        times[frame % STAGE_HISTORY, 0] = frame
+
+    history = ordered_history(times, STAGE_HISTORY + 3)
+
+    assert history.shape == (STAGE_HISTORY, 1)
+    assert history[0, 0] == 3 and history[-1, 0] == STAGE_HISTORY + 2
+
+
+def test_export_and_summarize_stage_times(tmp_path):
+    """Checks the CSV export and the millisecond summary of stage times."""
+    times = np.array([[0.001, 0.002], [0.003, 0.004]])
+    path = tmp_path / "stages.csv"
+
+    export_stage_times(path, times, ("neighbors", "draw"))
+
+    assert path.read_text().splitlines()[0] == "neighbors,draw"
+    assert np.allclose(np.loadtxt(path, delimiter=",", skiprows=1), times)
+    summary = summarize_stage_times(times, ("neighbors", "draw"))
+    assert summary["neighbors"] == 2.0 and summary["draw"] == 3.0
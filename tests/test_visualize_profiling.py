@@ -0,0 +1,66 @@
+import cProfile
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "profiling")))
+from visualize_profiling import diff_tables, format_report, load_profile, load_stage_times
+
+
+def profile_to(path, repeats):
+    """Profiles a function called `repeats` times and dumps the stats to `path`."""
+    def work():
+        return sum(range(20000))
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(repeats):
+        work()
+    profiler.disable()
+    profiler.dump_stats(path)
+
+
+def test_load_profile_keeps_every_entry(tmp_path):
+    """Checks that the binary dump is read completely, including built-ins."""
+    path = tmp_path / "run.prof"
+    profile_to(path, 3)
+
+    df = load_profile(str(path))
+
+    work = df[df["Function"].str.endswith("(work)")]
+    assert len(work) == 1 and work["Calls"].iloc[0] == 3
+    assert (df["Function"] == "<built-in method builtins.sum>").any()
+
+
+def test_diff_identifies_regressed_function(tmp_path):
+    """Checks that the diff report puts the slowed-down function first."""
+    profile_to(tmp_path / "before.prof", 2)
+    profile_to(tmp_path / "after.prof", 20)
+
+    diff = diff_tables(
+        load_profile(str(tmp_path / "before.prof")), load_profile(str(tmp_path / "after.prof")),
+        "Function", "Total Time",
+    )
+
+    regressed = diff["Function"].iloc[0]
+    assert regressed.endswith("(work)") or regressed == "<built-in method builtins.sum>"
+    assert diff["Absolute Change"].iloc[0] > 0
+    assert "REGRESSION" in format_report(diff, diff)
+
+
+def test_stage_table_and_diff(tmp_path):
+    """Checks the per-stage table of a stage timing export and its diff."""
+    pd.DataFrame({"neighbors": [0.001, 0.003], "integrate": [0.002, 0.002]}).to_csv(tmp_path / "a.csv", index=False)
+    pd.DataFrame({"neighbors": [0.001, 0.003], "integrate": [0.004, 0.004]}).to_csv(tmp_path / "b.csv", index=False)
+
+    before = load_stage_times(tmp_path / "a.csv")
+    after = load_stage_times(tmp_path / "b.csv")
+    diff = diff_tables(before, after, "Stage", "Mean (ms)")
+
+    assert before.set_index("Stage").loc["neighbors", "Mean (ms)"] == pytest.approx(2.0)
+    assert before["Share"].sum() == pytest.approx(1.0)
+    assert diff["Stage"].iloc[0] == "integrate"
+    assert diff["Relative Change"].iloc[0] == pytest.approx(1.0)